@@ -1,58 +1,230 @@
-from openai import OpenAI
-from config import ZHIPU_API_KEY, ZHIPU_BASE_URL, DEEPSEEK_API_KEY, DEEPSEEK_BASE_URL
+from config import (ZHIPU_API_KEY, ZHIPU_BASE_URL, DEEPSEEK_API_KEY, DEEPSEEK_BASE_URL,
+                    SUMMARY_CACHE_ENABLED, SUMMARY_PROMPT_VERSION, LLM_MAX_WORKERS, LLM_PROVIDER_CONCURRENCY,
+                    LLM_TIMEOUT, LLM_DEADLINE, LLM_HEDGE_PERCENTILE, LLM_HEDGE_DEFAULT_DELAY)
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime
-import random
+from provider_health import get_health
+from metrics import get_metrics
+from text_prep import prepare
+import threading
+import time
 
 def log(msg):
     print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {msg}")
 
-ZHIPU_CLIENT = OpenAI(api_key=ZHIPU_API_KEY, base_url=ZHIPU_BASE_URL)
-DEEPSEEK_CLIENT = OpenAI(api_key=DEEPSEEK_API_KEY, base_url=DEEPSEEK_BASE_URL)
+# 各服务商的客户端在第一次调用时才创建（openai 包导入较慢，没有摘要任务的运行不必付这个开销）
+_CLIENT_ARGS = {
+    "zhipu": {"api_key": ZHIPU_API_KEY, "base_url": ZHIPU_BASE_URL},
+    "deepseek": {"api_key": DEEPSEEK_API_KEY, "base_url": DEEPSEEK_BASE_URL},
+}
+_clients = {}
+_clients_lock = threading.Lock()
 
-def summarize_text(text: str, max_tokens: int = 400) -> str:
-    if not text or len(text.strip()) < 10:
-        log("  × 文本过短，跳过摘要")
-        return text
+
+def get_client(vendor: str):
+    """进程内共享的 OpenAI 客户端（连接池随客户端常驻）"""
+    with _clients_lock:
+        client = _clients.get(vendor)
+        if client is None:
+            from openai import OpenAI
+            client = _clients[vendor] = OpenAI(timeout=LLM_TIMEOUT, **_CLIENT_ARGS[vendor])
+        return client
+
+
+def __getattr__(name):
+    # 兼容旧的模块级客户端名称
+    if name == "ZHIPU_CLIENT":
+        return get_client("zhipu")
+    if name == "DEEPSEEK_CLIENT":
+        return get_client("deepseek")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+SYSTEM_PROMPT = "你是擅长提炼新闻要点并将其总结为200字左右摘要的AI新闻总结助手。"
+
+# 按顺序尝试的模型；vendor 用于按服务商限制并发
+PROVIDERS = [
+    {"label": "智谱免费模型", "vendor": "zhipu", "model": "glm-4-flash",
+     "params": {"top_p": 0.7, "temperature": 0.9}},
+    {"label": "智谱付费模型", "vendor": "zhipu", "model": "glm-4-flashx-250414",
+     "params": {"top_p": 0.7, "temperature": 0.9}},
+    {"label": "DeepSeek模型", "vendor": "deepseek", "model": "deepseek-chat",
+     "params": {"temperature": 0.7}},
+]
+
+# 每个服务商同时在途的请求数上限（所有线程共享）
+_VENDOR_SLOTS = {v: threading.BoundedSemaphore(n) for v, n in LLM_PROVIDER_CONCURRENCY.items()}
+
+# 对冲请求使用的线程池（主请求和对冲请求都在这里发出）
+_HEDGE_POOL = ThreadPoolExecutor(max_workers=LLM_MAX_WORKERS * len(PROVIDERS), thread_name_prefix="llm-hedge")
+
+
+def _prompt_version(max_tokens: int) -> str:
+    """缓存键中的提示词版本：提示词或输出长度变化时自动失效"""
+    return f"{SUMMARY_PROMPT_VERSION}:{max_tokens}"
+
+
+def _call_provider(p: dict, text: str, max_tokens: int, timeout: float = None) -> str:
+    """调用一个模型；timeout 同时限制排队等并发名额和 HTTP 请求本身"""
+    slot = _VENDOR_SLOTS.get(p["vendor"])
+    if slot is not None and not slot.acquire(timeout=timeout):
+        raise TimeoutError(f"{p['vendor']} 并发名额等待超时")
     try:
-        log("  → 尝试调用智谱免费模型 (glm-4-flash)")
-        resp = ZHIPU_CLIENT.chat.completions.create(
-            model="glm-4-flash",
+        client = get_client(p["vendor"])
+        if timeout is not None:
+            client = client.with_options(timeout=timeout)
+        resp = client.chat.completions.create(
+            model=p["model"],
             messages=[
-                {"role": "system", "content": "你是擅长提炼新闻要点并将其总结为200字左右摘要的AI新闻总结助手。"},
+                {"role": "system", "content": SYSTEM_PROMPT},
                 {"role": "user", "content": text}
             ],
-            top_p=0.7, temperature=0.9, max_tokens=max_tokens
+            max_tokens=max_tokens, **p["params"]
         )
-        return resp.choices[0].message.content.strip()
-    except Exception as e:
-        log(f"  × 智谱免费模型调用失败：{e}")
+    finally:
+        if slot is not None:
+            slot.release()
+    usage = getattr(resp, "usage", None)
+    if usage is not None:
+        metrics = get_metrics()
+        metrics.inc("news_llm_tokens_total", getattr(usage, "prompt_tokens", 0) or 0, model=p["model"], kind="prompt")
+        metrics.inc("news_llm_tokens_total", getattr(usage, "completion_tokens", 0) or 0, model=p["model"], kind="completion")
+    return resp.choices[0].message.content.strip()
 
+
+def _call_tracked(p: dict, text: str, max_tokens: int, timeout: float = None) -> str:
+    """调用模型并把结果和耗时记入健康度统计"""
+    health = get_health()
+    metrics = get_metrics()
+    t0 = time.monotonic()
     try:
-        log("  → 尝试调用智谱付费模型 (glm-4-flashx-250414)")
-        resp = ZHIPU_CLIENT.chat.completions.create(
-            model="glm-4-flashx-250414",
-            messages=[
-                {"role": "system", "content": "你是擅长提炼新闻要点并将其总结为200字左右摘要的AI新闻总结助手。"},
-                {"role": "user", "content": text}
-            ],
-            top_p=0.7, temperature=0.9, max_tokens=max_tokens
-        )
-        return resp.choices[0].message.content.strip()
-    except Exception as e:
-        log(f"  × 智谱付费模型调用失败：{e}")
+        summary = _call_provider(p, text, max_tokens, timeout)
+    except Exception:
+        health.record(p["model"], False, time.monotonic() - t0)
+        metrics.observe("news_llm_seconds", time.monotonic() - t0, model=p["model"], result="error")
+        raise
+    health.record(p["model"], True, time.monotonic() - t0)
+    metrics.observe("news_llm_seconds", time.monotonic() - t0, model=p["model"], result="ok")
+    return summary
+
+
+def _summarize_sequential(text: str, max_tokens: int):
+    """逐个尝试，返回 (model, summary)；全部失败返回 None"""
+    # 按健康度排序：熔断中的跳过，正常的按最近延迟从快到慢
+    for p in get_health().order(PROVIDERS):
+        try:
+            log(f"  → 尝试调用{p['label']} ({p['model']})")
+            return p["model"], _call_tracked(p, text, max_tokens)
+        except Exception as e:
+            log(f"  × {p['label']}调用失败：{e}")
+    return None
+
+
+def _hedge_delay(p: dict) -> float:
+    """该模型最近耗时的 LLM_HEDGE_PERCENTILE 分位，超过后向下一个模型发对冲请求"""
+    lat = get_health().latency_percentile(p["model"], LLM_HEDGE_PERCENTILE)
+    return lat if lat is not None else LLM_HEDGE_DEFAULT_DELAY
+
+
+def _summarize_hedged(text: str, max_tokens: int, deadline: float):
+    """
+    在 deadline 秒内完成：先调第一个模型，超过其延迟分位仍未返回（或已失败）
+    就并发调用下一个，谁先成功用谁。返回 (model, summary) 或 None。
+    还没开始的请求会被取消；已经发出的落败请求无法中止，会跑完（受各自 timeout 约束），结果丢弃。
+    """
+    order = get_health().order(PROVIDERS)
+    end = time.monotonic() + deadline
+    running = {}
+    next_idx = 0
+    next_at = time.monotonic()
+
+    def launch():
+        nonlocal next_idx, next_at
+        p = order[next_idx]
+        next_idx += 1
+        remaining = max(0.1, end - time.monotonic())
+        log(f"  → 尝试调用{p['label']} ({p['model']})，剩余 {remaining:.1f}s")
+        running[_HEDGE_POOL.submit(get_metrics().bind(_call_tracked), p, text, max_tokens, remaining)] = p
+        next_at = time.monotonic() + _hedge_delay(p)
 
     try:
-        log("  → 尝试调用 DeepSeek 模型")
-        resp = DEEPSEEK_CLIENT.chat.completions.create(
-            model="deepseek-chat",
-            messages=[
-                {"role": "system", "content": "你是擅长提炼新闻要点并将其总结为200字左右摘要的AI新闻总结助手。"},
-                {"role": "user", "content": text}
-            ],
-            temperature=0.7, max_tokens=max_tokens
-        )
-        return resp.choices[0].message.content.strip()
-    except Exception as e:
-        log(f"  × DeepSeek模型调用失败：{e}")
+        while True:
+            now = time.monotonic()
+            if now >= end:
+                log(f"  ! 摘要超过 {deadline:.0f}s 期限")
+                return None
+            if next_idx < len(order) and (not running or now >= next_at):
+                if running:
+                    log("  → 等待超过延迟分位，发出对冲请求")
+                launch()
+                continue
+            if not running:
+                return None
+            wake = end if next_idx >= len(order) else min(end, next_at)
+            done, _ = wait(list(running), timeout=max(0.0, wake - now), return_when=FIRST_COMPLETED)
+            for fut in done:
+                p = running.pop(fut)
+                try:
+                    return p["model"], fut.result()
+                except Exception as e:
+                    log(f"  × {p['label']}调用失败：{e}")
+    finally:
+        # 落败的请求：未开始的直接取消；已发出的无法中止，继续占用线程和并发名额直到返回或超时，结果丢弃
+        for fut in running:
+            fut.cancel()
+
+
+def summarize_text(text: str, max_tokens: int = 400, deadline: float = LLM_DEADLINE) -> str:
+    """
+    生成摘要。deadline（秒）不为空时使用限时对冲模式（见 config.LLM_DEADLINE，默认关闭），
+    期限内没有模型返回则退回文本截断。
+    """
+    metrics = get_metrics()
+    if not text or len(text.strip()) < 10:
+        log("  × 文本过短，跳过摘要")
+        metrics.inc("news_summaries_total", result="skipped")
+        return text
+    # 去模板、按 token 预算压缩，只用于模型调用和缓存键；跳过和兜底截断仍返回原文
+    prepared = prepare(text)
+    if len(prepared.strip()) < 10:
+        prepared = text     # 整篇都被当成模板去掉时，仍按原文摘要
+
+    cache = None
+    if SUMMARY_CACHE_ENABLED:
+        from summary_cache import get_cache
+        cache = get_cache()
+        hit = cache.get(prepared, [p["model"] for p in PROVIDERS], _prompt_version(max_tokens))
+        if hit is not None:
+            log(f"  ✓ 命中摘要缓存 ({hit[0]})")
+            metrics.inc("news_summaries_total", result="cache")
+            return hit[1]
+
+    if deadline:
+        result = _summarize_hedged(prepared, max_tokens, deadline)
+    else:
+        result = _summarize_sequential(prepared, max_tokens)
+    if result is not None:
+        model, summary = result
+        if cache is not None and summary:
+            cache.put(prepared, model, _prompt_version(max_tokens), summary)
+        metrics.inc("news_summaries_total", result="llm")
+        return summary
     log("  ! 所有模型调用失败，返回文本截断")
+    metrics.inc("news_summaries_total", result="fallback")
     return text[:500] + ("..." if len(text) > 500 else "")
+
+
+def summarize_many(texts: list, max_tokens: int = 400, max_workers: int = LLM_MAX_WORKERS) -> list:
+    """
+    并发摘要多段文本，结果与输入顺序一一对应。
+    完全相同的文本只调用一次；各服务商的在途请求数受 LLM_PROVIDER_CONCURRENCY 限制。
+    """
+    texts = list(texts)
+    unique = list(dict.fromkeys(texts))
+    if not unique:
+        return []
+    workers = max(1, min(max_workers, len(unique)))
+    log(f"  → 批量摘要 {len(texts)} 条（去重后 {len(unique)} 条，{workers} 线程）")
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="llm") as ex:
+        results = dict(zip(unique, ex.map(get_metrics().bind(lambda t: summarize_text(t, max_tokens)), unique)))
+    return [results[t] for t in texts]
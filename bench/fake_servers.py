@@ -0,0 +1,105 @@
+# bench/fake_servers.py
+"""
+基准测试用的本地假服务（只监听 127.0.0.1，端口自动分配）：
+  FakeOpenAIServer  兼容 OpenAI 的 /chat/completions，固定延迟后返回摘要和 usage
+  WebhookSink       接收飞书 webhook 推送，返回 {"code": 0}；可预设前几次的响应（5xx/429/限频错误码）
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Server:
+    handler = None
+
+    def __init__(self):
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                with server._lock:
+                    server.requests += 1
+                status, payload, *headers = server.handle(self.path, json.loads(body or b"{}"))
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                for name, value in (headers[0] if headers else {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                try:
+                    self.end_headers()
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass    # 客户端已超时断开
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def handle(self, path: str, body: dict):
+        """返回 (状态码, JSON 响应体) 或 (状态码, JSON 响应体, 额外响应头)"""
+        raise NotImplementedError
+
+
+class FakeOpenAIServer(_Server):
+    def __init__(self, latency: float = 0.05):
+        super().__init__()
+        self.latency = latency
+
+    def handle(self, path, body):
+        time.sleep(self.latency)
+        text = body["messages"][-1]["content"]
+        summary = text[:200]
+        prompt_tokens = sum(len(m["content"]) for m in body["messages"])
+        return 200, {
+            "id": "bench", "object": "chat.completion", "created": int(time.time()),
+            "model": body.get("model", ""),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": summary}}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(summary),
+                      "total_tokens": prompt_tokens + len(summary)},
+        }
+
+
+class WebhookSink(_Server):
+    def __init__(self, latency: float = 0.0, script=()):
+        super().__init__()
+        self.latency = latency
+        self.script = list(script)  # 前几次请求依次返回的 (状态码, 响应体[, 响应头])，用完后正常返回
+        self.messages = []
+        self.times = []             # 每次收到请求的 time.monotonic()
+
+    def handle(self, path, body):
+        with self._lock:
+            self.times.append(time.monotonic())
+            scripted = self.script.pop(0) if self.script else None
+        time.sleep(self.latency)
+        if scripted is not None:
+            return scripted
+        with self._lock:
+            self.messages.append(body)
+        return 200, {"code": 0, "msg": "success"}
@@ -0,0 +1,101 @@
+# bench/fixtures.py
+"""
+基准测试用的 HTML 页面。
+
+优先读取 bench/fixtures/<名称>.html（用 python -m bench.record 从线上录制），
+没有录制文件时按各站点的页面结构生成固定的合成页面（含大量无关节点，体积接近真实页面）。
+名称约定：<数据源模块名>_list / <数据源模块名>_detail
+"""
+import os
+import random
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def _noise(rng, blocks: int) -> str:
+    """导航、推荐位、脚本等与正文无关的节点"""
+    parts = []
+    for i in range(blocks):
+        words = "".join(rng.choice("的一是在不了有和人这中大为上个国我以要他时来用们生到作地于出就分对成会可主发年动同工也能下过子说产种面而方后多定行学法所民得经") for _ in range(40))
+        parts.append(f'<div class="side-item s{i}"><a href="/x/{i}"><img src="/i/{i}.jpg">'
+                     f'<span>{words}</span></a><script>var t{i}={i};</script></div>')
+    return "".join(parts)
+
+
+def _text(rng, n: int) -> str:
+    return "".join(rng.choice("人工智能大模型汽车新能源发布公司市场技术用户产品数据融资增长") for _ in range(n))
+
+
+def _page(body: str, rng, noise: int) -> str:
+    return (f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>bench</title></head><body>"
+            f"<nav>{_noise(rng, noise // 4)}</nav>{body}<aside>{_noise(rng, noise)}</aside></body></html>")
+
+
+def _aibot_list(rng):
+    body = []
+    for d in range(3):
+        body.append(f'<div class="news-date">6月{10 - d}日·周{d + 1}</div>')
+        for i in range(15):
+            body.append(f'<div class="news-item"><h2><a href="https://ai-bot.cn/news/{d}-{i}">{_text(rng, 20)}</a></h2>'
+                        f'<p class="text-muted text-sm">{_text(rng, 120)}'
+                        f'<span class="news-time text-xs">来源：{_text(rng, 4)}</span></p></div>')
+    return _page("".join(body), rng, 800)
+
+
+def _kr36_list(rng):
+    body = []
+    for i in range(30):
+        body.append(f'<div class="information-flow-item"><a class="article-item-title" href="/p/{3000000 + i}">'
+                    f'{_text(rng, 24)}</a><a class="article-item-description">{_text(rng, 80)}</a>'
+                    f'<a class="kr-flow-bar-author">{_text(rng, 4)}</a>'
+                    f'<span class="kr-flow-bar-time">{i + 1}小时前</span></div>')
+    return _page("".join(body), rng, 6000)
+
+
+def _kr36_detail(rng):
+    paras = "".join(f"<p>{_text(rng, 150)}</p>" for _ in range(25))
+    return _page(f'<div class="common-width content articleDetailContent kr-rich-text-wrapper">{paras}</div>',
+                 rng, 5000)
+
+
+def _autohome_list(rng):
+    body = "".join(f'<li data-artidanchor="{i}"><a href="//www.autohome.com.cn/news/2024/{1000 + i}.html">'
+                   f'<h3>{_text(rng, 20)}</h3></a><p>{_text(rng, 60)}</p></li>' for i in range(40))
+    return _page(f"<ul class='article'>{body}</ul>", rng, 2000)
+
+
+def _autohome_detail(rng):
+    paras = "".join(f'<p class="editor-paragraph">{_text(rng, 150)}</p>' for _ in range(20))
+    return _page(f'<span class="time">2024年06月10日 10:00</span><a class="name">{_text(rng, 4)}</a>'
+                 f'<div class="article-content">{paras}</div>', rng, 2000)
+
+
+SYNTHETIC = {
+    "aibot_list": _aibot_list,
+    "kr36_list": _kr36_list,
+    "kr36_detail": _kr36_detail,
+    "autohome_list": _autohome_list,
+    "autohome_detail": _autohome_detail,
+}
+
+
+def load(name: str) -> str:
+    """录制的页面优先，其次合成页面；都没有返回 None"""
+    path = os.path.join(FIXTURE_DIR, f"{name}.html")
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+    gen = SYNTHETIC.get(name)
+    return gen(random.Random(name)) if gen else None
+
+
+def is_recorded(name: str) -> bool:
+    return os.path.exists(os.path.join(FIXTURE_DIR, f"{name}.html"))
+
+
+def save(name: str, html: str) -> str:
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    path = os.path.join(FIXTURE_DIR, f"{name}.html")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(html)
+    return path
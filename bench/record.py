@@ -0,0 +1,42 @@
+# bench/record.py
+"""
+从线上录制基准测试用的页面，写入 bench/fixtures/。
+每个数据源录制列表页，以及列表中第一篇文章的详情页（有 fetch_detail 的源）。
+
+用法：python -m bench.record [数据源模块名 ...]
+"""
+import sys
+import data_manager
+from bench import fixtures
+
+
+def record(names=None):
+    for src in data_manager.load_data_sources():
+        mod = src.__name__.rsplit(".", 1)[-1]
+        if names and mod not in names:
+            continue
+        pages = []
+        real_fetch = src.fetch_html
+
+        def recording_fetch(url, render=None, expect=None):
+            html = real_fetch(url, render=render, expect=expect)
+            pages.append(html)
+            return html
+
+        src.fetch_html = recording_fetch
+        try:
+            items = src.fetch_items()
+            if pages:
+                print(f"{mod}_list → {fixtures.save(f'{mod}_list', pages[0])}")
+            detail = getattr(src, "fetch_detail", None)
+            if items and detail is not None:
+                del pages[:]
+                detail(items[0])
+                if pages:
+                    print(f"{mod}_detail → {fixtures.save(f'{mod}_detail', pages[-1])}")
+        finally:
+            src.fetch_html = real_fetch
+
+
+if __name__ == "__main__":
+    record(sys.argv[1:])
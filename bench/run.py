@@ -0,0 +1,316 @@
+# bench/run.py
+"""
+离线基准测试：不访问任何线上网站、LLM 接口或飞书。
+
+  - 列表解析：data_sources 下每个模块的 iter_items / fetch_items，页面来自 bench/fixtures
+  - 正文提取：有 fetch_detail 的模块解析详情页
+  - 摘要：summarize_text / summarize_many 调用本地假 OpenAI 服务（不走摘要缓存）
+  - 存储：SQLite 写入、读取，以及 load_excel / save_excel 兼容接口（需要 pandas）
+  - 推送：send_news 推送到本地 webhook 接收端
+每个阶段输出吞吐、单次耗时分位（p50/p90/p99）和峰值内存（tracemalloc），
+并与保存的基准结果比较，超出容差的记为退化（退出码 1）。
+
+用法：
+  python -m bench.run                       # 运行并与 bench/baseline.json 比较
+  python -m bench.run --save-baseline       # 运行并保存为新的基准
+  python -m bench.run --stages list,summarize --ops 50 --tolerance 0.3
+"""
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import config
+from bench import fixtures
+from bench.fake_servers import FakeOpenAIServer, WebhookSink
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+
+
+# —— 运行环境：所有文件写到临时目录，外部服务指向本地假服务 —— #
+def setup_env(workdir: str, llm_url: str, webhook_url: str):
+    """必须在导入其他项目模块之前调用（它们在导入时读取 config）"""
+    config.EXCEL_FILE = os.path.join(workdir, "news.xlsx")
+    config.DB_FILE = os.path.join(workdir, "news.db")
+    config.SUMMARY_CACHE_FILE = os.path.join(workdir, "summary_cache.db")
+    config.PROVIDER_HEALTH_FILE = os.path.join(workdir, "provider_health.json")
+    config.HTTP_CACHE_FILE = os.path.join(workdir, "http_cache.db")
+    config.EXTRACTOR_STRATEGY_FILE = os.path.join(workdir, "extractor_strategies.json")
+    config.DIAGNOSTICS_DIR = os.path.join(workdir, "diagnostics")
+    config.METRICS_PROM_FILE = os.path.join(workdir, "news_metrics.prom")
+    config.METRICS_REPORT_DIR = os.path.join(workdir, "reports")
+    config.ZHIPU_BASE_URL = llm_url
+    config.DEEPSEEK_BASE_URL = llm_url
+    config.WEBHOOK = webhook_url
+    config.WEBHOOK_RATE_PER_SEC = 0
+    config.DOMAIN_RATE_LIMITS = {"*": {"interval": 0}}
+    config.SUMMARY_CACHE_ENABLED = False
+    config.EXPORT_EXCEL = False
+
+
+# —— 统计 —— #
+def percentile(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = (len(values) - 1) * q
+    lo = int(k)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+class Stage:
+    """op() 执行一次被测操作；units 为每次操作处理的条目数（用于计算吞吐），可以是函数（运行时取值）"""
+
+    def __init__(self, name: str, op, ops: int, units: int = 1, note: str = ""):
+        self.name = name
+        self.op = op
+        self.ops = ops
+        self.units = units
+        self.note = note
+
+    def run(self, quiet: bool = True) -> dict:
+        out = io.StringIO() if quiet else sys.stdout
+        with contextlib.redirect_stdout(out):
+            self.op()                           # 预热（导入、建连接、学习提取策略等）
+            latencies = []
+            start = time.perf_counter()
+            for _ in range(self.ops):
+                t0 = time.perf_counter()
+                self.op()
+                latencies.append(time.perf_counter() - t0)
+            total = time.perf_counter() - start
+            units = self.units() if callable(self.units) else self.units
+
+            # 峰值内存单独测一遍：tracemalloc 本身会拖慢执行，不混进耗时统计
+            tracemalloc.start()
+            try:
+                for _ in range(min(self.ops, 3)):
+                    self.op()
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+        return {
+            "ops": self.ops,
+            "units_per_sec": round(self.ops * units / total, 2) if total else 0.0,
+            "p50_ms": round(percentile(latencies, 0.5) * 1000, 2),
+            "p90_ms": round(percentile(latencies, 0.9) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+            "peak_kb": round(peak / 1024, 1),
+            "note": self.note,
+        }
+
+
+# —— 各阶段 —— #
+def _serve_fixtures(src, mod: str, detail_urls=()):
+    """让数据源的 fetch_html 返回录制/合成页面：详情 URL 给详情页，其余给列表页"""
+    list_html = fixtures.load(f"{mod}_list")
+    detail_html = fixtures.load(f"{mod}_detail")
+    detail_urls = set(detail_urls)
+    src.fetch_html = lambda url, render=None, expect=None: detail_html if url in detail_urls else list_html
+
+
+def _note(name: str) -> str:
+    return "录制页面" if fixtures.is_recorded(name) else "合成页面"
+
+
+def list_stages(n_ops: int) -> list:
+    import data_manager
+    stages = []
+    for src in data_manager.load_data_sources():
+        mod = src.__name__.rsplit(".", 1)[-1]
+        if fixtures.load(f"{mod}_list") is None:
+            print(f"  跳过 {mod}：没有 {mod}_list 页面（python -m bench.record {mod}）", file=sys.stderr)
+            continue
+        _serve_fixtures(src, mod)
+        items = list(data_manager.iter_source(src))
+        stages.append(Stage(f"list:{mod}", lambda src=src: list(data_manager.iter_source(src)),
+                            n_ops, max(1, len(items)), _note(f"{mod}_list")))
+
+        detail = getattr(src, "fetch_detail", None)
+        if detail is not None and items and fixtures.load(f"{mod}_detail") is not None:
+            item = dict(items[0])
+            _serve_fixtures(src, mod, [item["url"]])
+            stages.append(Stage(f"extract:{mod}", lambda detail=detail, item=item: detail(dict(item)),
+                                n_ops, 1, _note(f"{mod}_detail")))
+    return stages
+
+
+_texts = itertools.count()
+
+
+def _article(i: int) -> str:
+    return f"第{i}篇。" + "新能源汽车企业发布季度财报，营收同比增长，研发投入持续加大。" * 30
+
+
+def summarize_stages(n_ops: int, batch: int) -> list:
+    import ai_api
+    return [
+        Stage("summarize_text", lambda: ai_api.summarize_text(_article(next(_texts))), n_ops),
+        Stage("summarize_many", lambda: ai_api.summarize_many([_article(next(_texts)) for _ in range(batch)]),
+              max(1, n_ops // batch), batch),
+    ]
+
+
+_urls = itertools.count()
+
+
+def _record(send_status: str = "") -> dict:
+    i = next(_urls)
+    return {"title": f"标题{i}", "source": "bench", "date_str": "2024-06-10", "url": f"https://bench.local/{i}",
+            "author": "bench", "content": _article(i)[:300], "need_render": "False",
+            "ai_status": "AI处理完成", "send_status": send_status, "send_attempts": "0"}
+
+
+def storage_stages(n_ops: int, batch: int) -> list:
+    from storage import get_store
+    store = get_store()
+
+    def insert_batch():
+        with store.transaction():
+            for _ in range(batch):
+                store.insert(_record("已发送"))
+
+    def load():
+        store.seen_urls()
+        store.pending()
+        store.rows()
+
+    stages = [Stage("storage_insert", insert_batch, n_ops, batch),
+              Stage("storage_load", load, n_ops, store.count)]
+    try:
+        import pandas  # noqa: F401
+        import data_manager
+        df = {}
+
+        def excel_roundtrip():
+            df["v"] = data_manager.load_excel()
+            data_manager.save_excel(df["v"])
+
+        stages.append(Stage("storage_excel_compat", excel_roundtrip, max(1, n_ops // 5)))
+    except ImportError:
+        print("  跳过 storage_excel_compat：未安装 pandas", file=sys.stderr)
+    return stages
+
+
+def send_stages(n_ops: int, batch: int) -> list:
+    from storage import get_store
+    from send_manager import send_news
+    store = get_store()
+
+    def send():
+        with store.transaction():
+            for _ in range(batch):
+                store.insert(_record())
+        if not send_news():
+            raise RuntimeError("send_news 失败")
+
+    return [Stage("send_news", send, n_ops, batch)]
+
+
+STAGES = ["list", "summarize", "storage", "send"]
+
+
+# —— 基准比较 —— #
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """返回退化项 [(阶段, 指标, 基准值, 当前值)]；耗时/内存的绝对变化很小时不算"""
+    regressions = []
+    for name, cur in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if base["units_per_sec"] and cur["units_per_sec"] < base["units_per_sec"] * (1 - tolerance):
+            regressions.append((name, "units_per_sec", base["units_per_sec"], cur["units_per_sec"]))
+        for key, floor in (("p90_ms", 1.0), ("peak_kb", 256.0)):
+            if cur[key] > base[key] * (1 + tolerance) and cur[key] - base[key] > floor:
+                regressions.append((name, key, base[key], cur[key]))
+    return regressions
+
+
+def print_table(results: dict, baseline: dict):
+    print(f"\n{'阶段':<24}{'吞吐/s':>12}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'峰值 KB':>12}  对比基准")
+    for name, r in results.items():
+        base = baseline.get(name)
+        delta = ""
+        if base and base["units_per_sec"]:
+            delta = f"吞吐 {r['units_per_sec'] / base['units_per_sec'] - 1:+.0%}"
+        print(f"{name:<24}{r['units_per_sec']:>12}{r['p50_ms']:>10}{r['p90_ms']:>10}{r['p99_ms']:>10}"
+              f"{r['peak_kb']:>12}  {delta} {r['note']}")
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="离线基准测试")
+    ap.add_argument("--stages", default=",".join(STAGES), help=f"逗号分隔，可选 {','.join(STAGES)}")
+    ap.add_argument("--ops", type=int, default=20, help="每个阶段的计时次数")
+    ap.add_argument("--batch", type=int, default=10, help="批量阶段每次处理的条数")
+    ap.add_argument("--llm-latency", type=float, default=0.05, help="假 LLM 服务每次请求的延迟（秒）")
+    ap.add_argument("--baseline", default=DEFAULT_BASELINE)
+    ap.add_argument("--save-baseline", action="store_true")
+    ap.add_argument("--tolerance", type=float, default=0.2, help="允许的相对退化比例")
+    ap.add_argument("--json", help="把本次结果写入该文件")
+    ap.add_argument("--verbose", action="store_true", help="显示被测代码的日志")
+    args = ap.parse_args(argv)
+    wanted = [s.strip() for s in args.stages.split(",") if s.strip()]
+
+    llm = FakeOpenAIServer(latency=args.llm_latency).start()
+    sink = WebhookSink().start()
+    workdir = tempfile.mkdtemp(prefix="news-bench-")
+    setup_env(workdir, llm.url, sink.url)
+    print(f"工作目录: {workdir}\n假 LLM: {llm.url}  webhook 接收端: {sink.url}")
+
+    builders = {
+        "list": lambda: list_stages(args.ops),
+        "summarize": lambda: summarize_stages(args.ops, args.batch),
+        "storage": lambda: storage_stages(args.ops, args.batch * 10),
+        "send": lambda: send_stages(max(1, args.ops // 4), args.batch),
+    }
+    stages = []
+    for name in wanted:
+        if name not in builders:
+            print(f"未知阶段: {name}")
+            return 2
+        with contextlib.redirect_stdout(sys.stdout if args.verbose else io.StringIO()):
+            stages.extend(builders[name]())
+
+    results = {}
+    for stage in stages:
+        print(f"  运行 {stage.name} …")
+        results[stage.name] = stage.run(quiet=not args.verbose)
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_table(results, baseline)
+    print(f"\n假 LLM 共收到 {llm.requests} 次请求，webhook 接收端共收到 {len(sink.messages)} 条消息")
+    llm.stop()
+    sink.stop()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=1)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=1)
+        print(f"已保存基准: {args.baseline}")
+        return 0
+    if not baseline:
+        print("没有基准结果，使用 --save-baseline 保存本次结果作为基准")
+        return 0
+    regressions = compare(results, baseline, args.tolerance)
+    for name, key, base, cur in regressions:
+        print(f"  × 退化: {name} {key} {base} → {cur}")
+    if not regressions:
+        print(f"✓ 与基准相比无超过 {args.tolerance:.0%} 的退化")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
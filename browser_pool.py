@@ -0,0 +1,255 @@
+# browser_pool.py
+"""
+进程级共享的 Playwright 浏览器池。
+
+整个进程只启动一次 Chromium：后台线程跑一个 asyncio 事件循环，
+持有 N 个浏览器、若干 context 和受信号量限制的并发 page。
+任何线程都可以通过 run(job) 租用一个 page 执行 async job(page)，
+context 用满 N 次或崩溃后自动回收重建，进程退出时统一关闭。
+"""
+import asyncio
+import atexit
+import random
+import threading
+from datetime import datetime
+from metrics import get_metrics
+from config import (BROWSER_POOL_BROWSERS, BROWSER_POOL_CONTEXTS, BROWSER_POOL_PAGES,
+                    BROWSER_CONTEXT_MAX_USES, BROWSER_LAUNCH_ARGS, USER_AGENTS)
+
+
+def log(msg):
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {msg}")
+
+
+class _ContextSlot:
+    """一个 BrowserContext 及其空闲 page、使用计数"""
+
+    def __init__(self, key, browser, context):
+        self.key = key
+        self.browser = browser
+        self.context = context
+        self.idle_pages = []
+        self.uses = 0
+        self.in_use = 0
+        self.retired = False
+        self.last_used = 0.0
+
+
+class BrowserPool:
+    def __init__(self, browsers: int = BROWSER_POOL_BROWSERS, contexts: int = BROWSER_POOL_CONTEXTS,
+                 pages: int = BROWSER_POOL_PAGES, context_max_uses: int = BROWSER_CONTEXT_MAX_USES):
+        self.max_browsers = max(1, browsers)
+        self.max_contexts = max(1, contexts)
+        self.max_pages = max(1, pages)
+        self.context_max_uses = max(1, context_max_uses)
+
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._playwright = None
+        self._browsers = []
+        self._slots = {}        # key -> 当前可分配的 _ContextSlot
+        self._retired = []      # 已退役但还有 page 在用的 slot
+        self._page_sem = None
+        self._slot_lock = None
+        self._rr = 0
+        self.launches = 0
+
+    # —— 生命周期 —— #
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            ready = threading.Event()
+
+            def _loop_main():
+                self._loop = asyncio.new_event_loop()
+                asyncio.set_event_loop(self._loop)
+                self._page_sem = asyncio.Semaphore(self.max_pages)
+                self._slot_lock = asyncio.Lock()
+                ready.set()
+                self._loop.run_forever()
+
+            self._thread = threading.Thread(target=_loop_main, name="browser-pool", daemon=True)
+            self._thread.start()
+            ready.wait()
+
+    def shutdown(self):
+        """关闭所有 context、浏览器和 Playwright，结束后台线程"""
+        with self._lock:
+            if self._thread is None:
+                return
+            try:
+                asyncio.run_coroutine_threadsafe(self._close_all(), self._loop).result(timeout=30)
+            except Exception as e:
+                log(f"  × 浏览器池关闭异常: {e}")
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=10)
+            self._thread = None
+            self._loop = None
+
+    def warm(self, timeout: float = 60):
+        """提前启动 Playwright 和一个 Chromium（常驻进程用，第一次渲染不必等浏览器启动）"""
+        self._ensure_started()
+        asyncio.run_coroutine_threadsafe(self._warm(), self._loop).result(timeout)
+
+    async def _warm(self):
+        async with self._slot_lock:
+            if not any(b.is_connected() for b in self._browsers):
+                await self._get_browser()
+
+    def stats(self) -> dict:
+        return {"running": self._thread is not None, "browsers": len(self._browsers),
+                "contexts": len(self._slots), "launches": self.launches}
+
+    async def _close_all(self):
+        for slot in list(self._slots.values()) + self._retired:
+            await self._close_slot(slot)
+        self._slots.clear()
+        self._retired.clear()
+        for b in self._browsers:
+            try:
+                await b.close()
+            except Exception:
+                pass
+        self._browsers.clear()
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+        if self.launches:
+            log(f"浏览器池已关闭（本进程共启动 Chromium {self.launches} 次）")
+
+    # —— 浏览器 / context 管理 —— #
+    async def _get_browser(self):
+        self._browsers = [b for b in self._browsers if b.is_connected()]
+        if len(self._browsers) < self.max_browsers:
+            if self._playwright is None:
+                from playwright.async_api import async_playwright
+                self._playwright = await async_playwright().start()
+            t0 = self._loop.time()
+            browser = await self._playwright.chromium.launch(headless=True, args=BROWSER_LAUNCH_ARGS)
+            get_metrics().observe("news_browser_launch_seconds", self._loop.time() - t0)
+            self.launches += 1
+            log(f"  → 启动 Chromium（池内第 {len(self._browsers) + 1}/{self.max_browsers} 个）")
+            self._browsers.append(browser)
+            return browser
+        self._rr = (self._rr + 1) % len(self._browsers)
+        return self._browsers[self._rr]
+
+    async def _acquire_slot(self, key, options, route):
+        async with self._slot_lock:
+            slot = self._slots.get(key)
+            if slot is not None and (slot.retired or not slot.browser.is_connected()):
+                await self._retire(slot)
+                slot = None
+            if slot is None:
+                # context 数量达到上限时，回收最久未用的
+                while len(self._slots) >= self.max_contexts:
+                    lru = min(self._slots.values(), key=lambda s: s.last_used)
+                    await self._retire(lru)
+                browser = await self._get_browser()
+                opts = dict(options or {})
+                opts.setdefault("user_agent", random.choice(USER_AGENTS))
+                context = await browser.new_context(**opts)
+                if route is not None:
+                    await context.route("**/*", route)
+                slot = _ContextSlot(key, browser, context)
+                self._slots[key] = slot
+            slot.uses += 1
+            slot.in_use += 1
+            slot.last_used = self._loop.time()
+            if slot.uses >= self.context_max_uses:
+                # 用满次数：不再分配给新调用，当前 page 归还后关闭
+                self._slots.pop(key, None)
+                slot.retired = True
+                self._retired.append(slot)
+            return slot
+
+    async def _retire(self, slot):
+        if self._slots.get(slot.key) is slot:
+            self._slots.pop(slot.key)
+        slot.retired = True
+        if slot.in_use:
+            if slot not in self._retired:
+                self._retired.append(slot)
+        else:
+            await self._close_slot(slot)
+
+    async def _close_slot(self, slot):
+        if slot in self._retired:
+            self._retired.remove(slot)
+        try:
+            await slot.context.close()
+        except Exception:
+            pass
+
+    async def _release(self, slot, page, ok):
+        async with self._slot_lock:
+            slot.in_use -= 1
+            if ok and not slot.retired and not page.is_closed() and len(slot.idle_pages) < self.max_pages:
+                slot.idle_pages.append(page)
+            else:
+                try:
+                    await page.close()
+                except Exception:
+                    pass
+            if not ok and not slot.retired:
+                # page 崩溃 / 浏览器断开：整个 context 重建
+                if page.is_closed() or not slot.browser.is_connected():
+                    log("  ! 浏览器 context 异常，已回收")
+                    await self._retire(slot)
+            if slot.retired and slot.in_use == 0:
+                await self._close_slot(slot)
+
+    async def _run(self, job, options, route, key=None):
+        key = repr((key, tuple(sorted((options or {}).items(), key=lambda kv: kv[0])),
+                    getattr(route, "__qualname__", None)))
+        async with self._page_sem:
+            slot = await self._acquire_slot(key, options, route)
+            page = None
+            ok = False
+            try:
+                page = slot.idle_pages.pop() if slot.idle_pages else await slot.context.new_page()
+                result = await job(page)
+                ok = True
+                return result
+            finally:
+                if page is not None:
+                    await self._release(slot, page, ok)
+                else:
+                    async with self._slot_lock:
+                        slot.in_use -= 1
+                        await self._retire(slot)
+
+    # —— 对外接口 —— #
+    def run(self, job, context_options: dict = None, route=None, timeout: float = None,
+            context_key: str = None):
+        """
+        租用一个 page 执行 job(page)（async 函数），返回其结果。
+        context_key（如渲染配置名）和 context_options 都相同的调用共享同一个 context；
+        未指定 user_agent 时随机选一个。
+        """
+        self._ensure_started()
+        fut = asyncio.run_coroutine_threadsafe(self._run(job, context_options, route, context_key),
+                                               self._loop)
+        return fut.result(timeout)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> BrowserPool:
+    """进程内共享的浏览器池（首次调用时创建，退出时自动关闭）"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BrowserPool()
+            atexit.register(_pool.shutdown)
+        return _pool
+
+
+def shutdown_pool():
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
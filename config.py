@@ -6,8 +6,77 @@ ZHIPU_BASE_URL = "https://open.bigmodel.cn/api/paas/v4/"
 DEEPSEEK_API_KEY = "mykey2"
 DEEPSEEK_BASE_URL = "https://api.deepseek.com"
 
+# 摘要缓存：相同正文（规范化后哈希）+ 模型 + 提示词版本 直接复用，不再调用 LLM
+SUMMARY_CACHE_ENABLED = True
+SUMMARY_PROMPT_VERSION = "v1"    # 修改系统提示词时递增，旧缓存自动失效
+SUMMARY_CACHE_MAX_ENTRIES = 20000
+SUMMARY_CACHE_MAX_AGE_DAYS = 30
+
+# 并发摘要：summarize_many 的线程数，以及每个服务商同时在途的请求上限
+LLM_MAX_WORKERS = 8
+LLM_PROVIDER_CONCURRENCY = {"zhipu": 4, "deepseek": 4}
+
+# 模型熔断：最近 window 次调用中错误率 >= error_rate（且样本数 >= min_samples），
+# 或连续失败 consecutive_failures 次，则跳过该模型 cooldown 秒；试探失败时冷却翻倍，最多 max_cooldown 秒
+LLM_BREAKER = {
+    "window": 20,
+    "min_samples": 4,
+    "error_rate": 0.5,
+    "consecutive_failures": 3,
+    "cooldown": 300,
+    "max_cooldown": 3600,
+}
+LLM_ADAPTIVE_ORDER = True    # 正常的模型按最近延迟从快到慢尝试；False 则保持 PROVIDERS 顺序
+
+# 单次 LLM 请求超时（秒）
+LLM_TIMEOUT = 60
+# 限时对冲模式（默认关闭）：summarize_text 的总期限（秒），None 为逐个尝试的旧行为。
+# 当前模型耗时超过其最近耗时的 LLM_HEDGE_PERCENTILE 分位仍未返回，就同时请求下一个模型；
+# 没有历史数据时等待 LLM_HEDGE_DEFAULT_DELAY 秒。
+# 注意：已发出的落败请求不会被取消，会继续跑完（占用线程和服务商并发名额，照常计费），
+# 对冲多出的请求是用费用换尾延迟，开启前先确认可以接受。
+LLM_DEADLINE = None
+LLM_HEDGE_PERCENTILE = 0.9
+LLM_HEDGE_DEFAULT_DELAY = 10
+
+# 摘要输入预处理：去掉模板段落，正文超过 LLM_INPUT_TOKEN_BUDGET（本地估算的 token 数）时
+# 按句子打分挑选压缩到预算以内（保留原文顺序）。0 = 不限长度，只去模板。
+TEXT_PREP_ENABLED = True
+LLM_INPUT_TOKEN_BUDGET = 1500
+# 模板段落：不超过 TEXT_PREP_DROP_MAX_CHARS 个字符、且整段完全匹配（fullmatch）任一正则的段落删除。
+# 只写整段都是模板的形式，不要用会命中正文句子的片段（如“未经授权使用”）。
+TEXT_PREP_DROP_MAX_CHARS = 150
+TEXT_PREP_DROP = [
+    r"(本文|文章)?(来源|来自|转载自|原文链接|原文地址|原标题|责任编辑|编辑|作者|撰文|题图|图片来源|封面来源)\s*[:：|].*",
+    r"[【\[]?(免责声明|版权声明|特别声明|风险提示)[】\]]?\s*[:：].*",
+    r"(©|[Cc]opyright).*|.{0,40}版权所有[。.]?",
+    r".{0,40}(不得|禁止|严禁|谢绝|请勿)(转载|复制|摘编)[。.!！]?|.{0,30}转载请(注明|联系|保留).{0,20}",
+    r"(扫码|长按|点击|识别).{0,20}(关注|下载|订阅|二维码).{0,30}",
+    r"(本文)?(不构成|仅代表).{0,10}(投资建议|观点|立场).{0,30}",
+]
+# 段落（不在开头）匹配任一正则时，丢弃它及其后的全部内容（相关文章列表、推荐阅读等）
+TEXT_PREP_CUTOFF = [
+    r"^[【\[]?(相关(阅读|文章|推荐|新闻|链接)|推荐阅读|延伸阅读|热门(文章|推荐)|往期(回顾|推荐)|更多精彩)[】\]]?\s*[:：]?\s*$",
+]
+
 # Webhook & 抓取目标
 WEBHOOK = "mywebhookurl"
+# 推送方式："single"（默认，每条一个自定义字段 text 消息，与现有 webhook 接收端兼容）
+# 或 "digest"（多条打包成一条飞书富文本 post 消息，消息格式不同，需接收端支持后再开启）
+SEND_MODE = "single"
+DIGEST_MAX_ITEMS = 10            # 每条合集最多包含的新闻数
+DIGEST_LINGER = 5                # 流水线中攒批最多等待秒数
+FEISHU_MAX_PAYLOAD_BYTES = 18000  # 飞书自定义机器人请求体上限约 20KB，留出余量
+
+# 异步推送：每秒最多发出的请求数、同时在途请求数；5xx/429/超时按指数退避重试，
+# 遵守 Retry-After。发送失败的条目下次运行自动重试，累计 SEND_MAX_ATTEMPTS 次后放弃
+WEBHOOK_TIMEOUT = 10
+WEBHOOK_RATE_PER_SEC = 2
+WEBHOOK_CONCURRENCY = 4
+WEBHOOK_MAX_RETRIES = 4
+WEBHOOK_BACKOFF_BASE = 1
+WEBHOOK_BACKOFF_MAX = 30
+SEND_MAX_ATTEMPTS = 5
 AI_BOT_URL = "https://ai-bot.cn/daily-ai-news/"
 KR_URLS = {
     "36kr-AI": "https://www.36kr.com/information/AI/",
@@ -17,13 +86,152 @@ KR_URLS = {
 # 文件路径
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 EXCEL_FILE = os.path.join(SCRIPT_DIR, "news.xlsx")
+DB_FILE = os.path.join(SCRIPT_DIR, "news.db")
+SUMMARY_CACHE_FILE = os.path.join(SCRIPT_DIR, "summary_cache.db")
+PROVIDER_HEALTH_FILE = os.path.join(SCRIPT_DIR, "provider_health.json")
+HTTP_CACHE_FILE = os.path.join(SCRIPT_DIR, "http_cache.db")
+EXTRACTOR_STRATEGY_FILE = os.path.join(SCRIPT_DIR, "extractor_strategies.json")  # 各类页面上次成功的正文提取策略
+
+# 存储后端："sqlite"（默认，按行写入）或 "excel"（旧行为，每次重写整个文件）
+STORAGE_BACKEND = "sqlite"
+# 每次运行结束后是否额外导出一份 news.xlsx
+EXPORT_EXCEL = False
 
 # 其他配置
 COLUMNS = ["标题", "来源", "日期", "URL", "作者", "内容", "需要渲染", "发送状态", "更新时间"]
 MAX_ARTICLES_PER_SOURCE = 5
+KNOWN_RUN_STOP = 3   # 列表中连续遇到这么多条已入库的 URL 就停止扫描（0 = 不提前停止）
+
+# 数据源执行方式："concurrent"（每个源一个线程）或 "sequential"（逐个执行），决定流水线列表阶段的线程数
+FETCH_MODE = "concurrent"
+FETCH_CONCURRENCY = 3
+
+# 流水线：列表 → 详情渲染 → 摘要 → 入库(单线程) → 推送，各阶段线程数与队列长度
+PIPELINE_WORKERS = {
+    "list": FETCH_CONCURRENCY if FETCH_MODE == "concurrent" else 1,
+    "render": 2,
+    # 每个线程同一时刻只有一个在途请求（按顺序换服务商），线程多于服务商的并发名额只会排队等名额
+    "summarize": max(LLM_PROVIDER_CONCURRENCY.values()),
+    "deliver": 2,
+}
+PIPELINE_QUEUE_SIZE = 10
 MIN_DELAY_BETWEEN_DETAILS = 5
 MAX_DELAY_BETWEEN_DETAILS = 10
 
+# 按域名限速：同一域名两次请求之间至少间隔 interval 秒，再加 0~jitter 秒随机抖动；
+# burst 为允许的突发请求数。"*" 为未列出域名的默认值。
+DOMAIN_RATE_LIMITS = {
+    "www.36kr.com": {"interval": MIN_DELAY_BETWEEN_DETAILS,
+                     "jitter": MAX_DELAY_BETWEEN_DETAILS - MIN_DELAY_BETWEEN_DETAILS},
+    "www.autohome.com.cn": {"interval": 1, "jitter": 1},
+    "ai-bot.cn": {"interval": 1, "jitter": 1},
+    "*": {"interval": 1, "jitter": 1},
+}
+
+# 浏览器池：整个进程共享，Chromium 只启动一次
+BROWSER_POOL_BROWSERS = 1        # Chromium 进程数
+BROWSER_POOL_CONTEXTS = 6        # 同时保留的 BrowserContext 数（按渲染配置区分）
+BROWSER_POOL_PAGES = 4           # 同时打开的 page 数上限
+BROWSER_CONTEXT_MAX_USES = 30    # 每个 context 使用多少次后回收重建
+BROWSER_LAUNCH_ARGS = ['--disable-blink-features=AutomationControlled']
+
+# 渲染配置（按数据源 / 页面类型）：
+#   block          屏蔽的资源类型（image / media / font / stylesheet ...）
+#   block_domains  URL 含这些关键字的请求（广告、埋点）直接中止
+#   wait_for       等待出现的目标选择器，代替 networkidle 和固定 sleep
+#   wait_timeout   等待选择器的最长毫秒数
+#   scroll         最多滚动次数；min_count 为目标元素够数后不再滚动
+#   timeout        页面导航超时（毫秒）
+RENDER_BLOCK_TYPES = ["image", "media", "font"]
+RENDER_BLOCK_DOMAINS = [
+    "doubleclick.net", "googlesyndication", "google-analytics", "googletagmanager",
+    "adpush", "hm.baidu.com", "cnzz.com", "growingio", "sensorsdata",
+]
+RENDER_PROFILES = {
+    "default": {"block": RENDER_BLOCK_TYPES, "block_domains": RENDER_BLOCK_DOMAINS},
+    "detail": {"block": RENDER_BLOCK_TYPES, "block_domains": RENDER_BLOCK_DOMAINS, "scroll": 3},
+    "aibot": {"block": RENDER_BLOCK_TYPES + ["stylesheet"], "block_domains": RENDER_BLOCK_DOMAINS,
+              "wait_for": "div.news-item"},
+    "autohome_list": {"block": RENDER_BLOCK_TYPES, "block_domains": RENDER_BLOCK_DOMAINS,
+                      "wait_for": "li[data-artidanchor]"},
+    "autohome_detail": {"block": RENDER_BLOCK_TYPES + ["stylesheet"], "block_domains": RENDER_BLOCK_DOMAINS,
+                        "wait_for": "p.editor-paragraph"},
+    "36kr_list": {"block": RENDER_BLOCK_TYPES, "block_domains": RENDER_BLOCK_DOMAINS,
+                  "wait_for": "div.information-flow-item", "scroll": 3,
+                  "min_count": MAX_ARTICLES_PER_SOURCE},
+    "36kr_detail": {"block": RENDER_BLOCK_TYPES, "block_domains": RENDER_BLOCK_DOMAINS,
+                    "wait_for": "div.articleDetailContent, div.article-content, "
+                                "div[data-test='article-content'], div.kr-article-content",
+                    "wait_timeout": 15000},
+}
+
+# 页面获取方式（按 URL 正则匹配，先匹配先用）：
+#   "auto"    先用 HTTP 条件请求（ETag/Last-Modified），内容检查不通过再用浏览器渲染
+#   "browser" 始终用浏览器渲染
+# 未匹配的 URL 默认 "browser"
+FETCH_RULES = [
+    (r"^https?://ai-bot\.cn/", "auto"),
+    (r"^https?://www\.autohome\.com\.cn/", "auto"),
+    (r"^https?://www\.36kr\.com/", "browser"),
+]
+HTTP_TIMEOUT = 15
+
+# HTML 解析后端："auto"（selectolax > lxml > html.parser，按已安装的选）/ "selectolax" / "lxml" / "html.parser"
+HTML_PARSER = "auto"
+
+# 诊断现场（原始 HTML + 调试信息，gzip 压缩）：
+#   "off" 不保存 / "failure" 只在正文提取失败时保存 / "sample" 另外按比例抽样保存成功的页面
+DIAGNOSTICS_MODE = "failure"
+DIAGNOSTICS_SAMPLE_RATE = 0.02
+DIAGNOSTICS_DIR = os.path.join(SCRIPT_DIR, "diagnostics")
+DIAGNOSTICS_MAX_BYTES = 50 * 1024 * 1024   # 目录总大小上限，超出时删除最旧的
+
+# 运行指标：每次流水线结束写 Prometheus textfile 和本次运行的 JSON 报告
+METRICS_ENABLED = True
+METRICS_PROM_FILE = os.path.join(SCRIPT_DIR, "news_metrics.prom")
+METRICS_REPORT_DIR = os.path.join(SCRIPT_DIR, "reports")
+METRICS_REPORT_KEEP = 48   # 保留最近多少份运行报告
+
+# 按数据源自适应调度（main.py 常驻运行时）：
+#   每个源有自己的抓取间隔（秒），有新条目时乘以 speedup 缩短，没有新条目时乘以 backoff 延长，
+#   限制在 [min, max] 之间；coalesce 秒内将到期的源合并到同一次运行，共用浏览器和各阶段线程数，
+#   同一时间只运行一个流水线。SCHEDULE_SOURCES 可按数据源模块名覆盖上述任一项。
+SCHEDULE = {"base": 3600, "min": 900, "max": 4 * 3600, "speedup": 0.5, "backoff": 1.5, "coalesce": 120}
+SCHEDULE_SOURCES = {
+    # "kr36": {"min": 1800},
+}
+SCHEDULE_STATE_FILE = os.path.join(SCRIPT_DIR, "schedule_state.json")
+
+# 数据源隔离（默认关闭）：每个源在独立子进程中抓取列表和详情页，超过墙钟期限（秒）或
+# 进程树常驻内存上限（MB，含 Chromium）时整组杀掉，已送回的条目照常处理。0 = 不限制。
+# 代价：详情页在子进程内逐条串行抓取，每个子进程各自启动 Chromium，
+# 不再使用流水线的 render 线程池和共享浏览器池，吞吐明显下降；页面经常卡死或浏览器泄漏时再开启。
+SOURCE_ISOLATION = False
+SOURCE_LIMITS = {"deadline": 900, "rss_mb": 1536}
+SOURCE_LIMITS_SOURCES = {
+    # "kr36": {"deadline": 1800},
+}
+
+# 常驻模式（python daemon.py）：URL 索引、存储连接、浏览器池、LLM / webhook 连接在各次运行之间保留。
+# 控制接口为本地 Unix socket（不支持 AF_UNIX 的平台改用 127.0.0.1:DAEMON_PORT）。
+# DAEMON_ISOLATION 为 True 时仍按数据源起子进程（每次冷启动浏览器，换取超时/内存隔离）。
+DAEMON_SOCKET = os.path.join(SCRIPT_DIR, "news_daemon.sock")
+DAEMON_PORT = 8765
+DAEMON_ISOLATION = False
+
+# main-once.py 启动时先做快速检查：各数据源列表页（HTTP 条件请求）都没有变化、也没有待发送的条目时直接退出
+QUICK_CHECK_ENABLED = True
+QUICK_CHECK_FILE = os.path.join(SCRIPT_DIR, "quick_check.json")
+
+# 跨数据源近似重复检测（标题的 SimHash；各源摘要差异大，不参与比较）：与最近 DEDUPE_WINDOW_DAYS 天
+# 成功处理的条目海明距离不超过 DEDUPE_MAX_DISTANCE（64 位中）即视为重复，只入库记录所属组，不再推送。
+# 阈值按实际标题校准：同题（标点、空格、末尾个别字不同）为 0~4，不同新闻的相似标题在 13 以上。
+# 归一化后不足 DEDUPE_MIN_CHARS 个字符的标题不参与去重。
+DEDUPE_ENABLED = True
+DEDUPE_MAX_DISTANCE = 4
+DEDUPE_WINDOW_DAYS = 7
+DEDUPE_MIN_CHARS = 8
+
 USER_AGENTS = [
     # ...（省略，拷贝原代码中的 User Agent 列表）...
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36",
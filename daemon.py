@@ -0,0 +1,198 @@
+# daemon.py
+"""
+常驻模式：一个进程长期运行，各次运行之间保留
+  - URL 索引（不再每次从存储加载全部历史）
+  - 存储连接（SQLite 连接 / 摘要缓存）
+  - 预热的浏览器池（Chromium 只启动一次）
+  - LLM 客户端和 webhook 会话的 keep-alive 连接
+定时运行由自适应调度器负责；另外开一个本地控制 socket，一行一条命令，返回一行 JSON：
+  run            立即运行全部数据源
+  run <数据源>   只运行指定数据源（模块名，如 kr36）
+  status         调度状态、最近一次运行、浏览器池和索引大小
+  stop           退出
+
+用法：
+  python daemon.py                启动常驻进程
+  python daemon.py status         向已启动的常驻进程发送命令
+  python daemon.py run kr36
+"""
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+from datetime import datetime
+from config import DAEMON_SOCKET, DAEMON_PORT, DAEMON_ISOLATION
+from storage import get_store
+from scheduler import AdaptiveScheduler
+
+_HAS_UNIX = hasattr(socket, "AF_UNIX")
+
+
+def log(msg):
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {msg}")
+
+
+def address_in_use(address) -> bool:
+    """控制地址上是否已有常驻进程在应答；连接被拒绝 / socket 文件不存在时返回 False"""
+    family = socket.AF_UNIX if _HAS_UNIX else socket.AF_INET
+    with socket.socket(family, socket.SOCK_STREAM) as s:
+        s.settimeout(2)
+        try:
+            s.connect(address)
+        except (ConnectionRefusedError, FileNotFoundError):
+            return False
+        except OSError as e:
+            log(f"  ! 检查控制接口失败，按已占用处理: {e}")
+            return True
+    return True
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline().decode("utf-8", "replace").strip()
+        try:
+            reply = self.server.daemon.handle(line)
+        except Exception as e:
+            reply = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        self.wfile.write((json.dumps(reply, ensure_ascii=False) + "\n").encode("utf-8"))
+
+
+if _HAS_UNIX:
+    class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+else:
+    class _Server(socketserver.ThreadingMixIn, socketserver.TCPServer):
+        daemon_threads = True
+        allow_reuse_address = True
+
+
+class NewsDaemon:
+    def __init__(self, address=None, isolate: bool = DAEMON_ISOLATION):
+        self.address = address or (DAEMON_SOCKET if _HAS_UNIX else ("127.0.0.1", DAEMON_PORT))
+        self.isolate = isolate
+        self.started = time.time()
+        self.store = get_store()
+        t0 = time.monotonic()
+        self.scheduler = AdaptiveScheduler(isolate=isolate, seen=self.store.seen_urls())
+        log(f"URL 索引已加载（{len(self.scheduler.seen)} 条，{time.monotonic() - t0:.2f}s）")
+        self._server = None
+
+    # —— 预热 —— #
+    def warm(self):
+        """提前建立各项常驻资源，第一次运行不再付启动开销"""
+        from ai_api import PROVIDERS, get_client
+        from webhook_sender import get_sender
+        for vendor in {p["vendor"] for p in PROVIDERS}:
+            get_client(vendor)          # LLM 客户端及其连接池常驻
+        get_sender()
+        if not self.isolate:
+            from browser_pool import get_pool
+            t0 = time.monotonic()
+            try:
+                get_pool().warm()
+                log(f"浏览器池已预热（{time.monotonic() - t0:.1f}s）")
+            except Exception as e:
+                log(f"  ! 浏览器预热失败，首次渲染时再启动: {e}")
+        log(f"已就绪：{len(self.scheduler.sources)} 个数据源，{len(PROVIDERS)} 个模型")
+
+    # —— 控制命令 —— #
+    def handle(self, line: str) -> dict:
+        cmd, *args = line.split() or [""]
+        if cmd == "run":
+            unknown = [a for a in args if a not in self.scheduler.sources]
+            if unknown:
+                return {"ok": False, "error": f"未知数据源: {', '.join(unknown)}",
+                        "sources": sorted(self.scheduler.sources)}
+            ok = self.scheduler.run_due(args or list(self.scheduler.sources))
+            return {"ok": ok, "last_run": self.scheduler.last_run}
+        if cmd == "status":
+            return {"ok": True, **self.status()}
+        if cmd == "stop":
+            threading.Thread(target=self.stop, daemon=True).start()
+            return {"ok": True}
+        return {"ok": False, "error": f"未知命令: {line!r}（可用: run [数据源] / status / stop）"}
+
+    def status(self) -> dict:
+        from browser_pool import get_pool
+        return {
+            "pid": os.getpid(),
+            "uptime_seconds": round(time.time() - self.started),
+            "running": self.scheduler.running,
+            "last_run": self.scheduler.last_run,
+            "schedule": self.scheduler.status(),
+            "url_index": len(self.scheduler.seen),
+            "browser_pool": get_pool().stats(),
+            "isolation": self.isolate,
+        }
+
+    # —— 生命周期 —— #
+    def _bind(self):
+        # 只清理无人应答的残留 socket 文件（上次异常退出留下的）
+        if _HAS_UNIX and os.path.exists(self.address) and not address_in_use(self.address):
+            os.remove(self.address)
+        self._server = _Server(self.address, _Handler)
+        self._server.daemon = self
+        log(f"控制接口: {self.address}")
+
+    def serve_forever(self) -> bool:
+        """运行到收到 stop；控制地址已被占用或无法绑定时不启动，返回 False"""
+        if address_in_use(self.address):
+            log(f"× 已有常驻进程在运行（{self.address}），本进程退出")
+            return False
+        # 在主线程绑定：失败时直接退出，而不是只有控制线程悄悄死掉、调度照常运行
+        try:
+            self._bind()
+        except OSError as e:
+            log(f"× 控制接口绑定失败（{self.address}）: {e}，本进程退出")
+            return False
+        self.warm()
+        threading.Thread(target=self._server.serve_forever, name="daemon-control", daemon=True).start()
+        try:
+            self.scheduler.run_forever()
+        finally:
+            self.close()
+        return True
+
+    def stop(self):
+        log("===== 收到停止命令 =====")
+        self.scheduler.stop()
+
+    def close(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            if _HAS_UNIX and os.path.exists(self.address):
+                os.remove(self.address)
+        from browser_pool import shutdown_pool
+        shutdown_pool()
+        log("===== 常驻进程已退出 =====")
+
+
+def send_command(command: str, address=None, timeout: float = None) -> dict:
+    """向运行中的常驻进程发送一条命令并返回结果；run 命令会等到运行结束"""
+    address = address or (DAEMON_SOCKET if _HAS_UNIX else ("127.0.0.1", DAEMON_PORT))
+    family = socket.AF_UNIX if _HAS_UNIX else socket.AF_INET
+    with socket.socket(family, socket.SOCK_STREAM) as s:
+        s.settimeout(timeout)
+        s.connect(address)
+        s.sendall((command.strip() + "\n").encode("utf-8"))
+        with s.makefile("rb") as f:
+            return json.loads(f.readline().decode("utf-8"))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        try:
+            print(json.dumps(send_command(" ".join(sys.argv[1:])), ensure_ascii=False, indent=1))
+        except OSError as e:
+            print(f"无法连接常驻进程: {e}")
+            sys.exit(1)
+    else:
+        try:
+            if not NewsDaemon().serve_forever():
+                sys.exit(1)
+        except KeyboardInterrupt:
+            print("程序被用户手动中断")
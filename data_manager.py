@@ -1,7 +1,12 @@
-import os, pandas as pd, pkgutil, importlib, random, time
+import pkgutil, importlib, inspect, time
+from typing import TYPE_CHECKING
 from datetime import datetime
-from config import EXCEL_FILE, COLUMNS, MIN_DELAY_BETWEEN_DETAILS, MAX_DELAY_BETWEEN_DETAILS, USER_AGENTS
-from ai_api import summarize_text
+from config import COLUMNS, EXPORT_EXCEL, KNOWN_RUN_STOP
+from storage import get_store, export_excel, records_from_frame, FIELD_TO_COL, FIELD_NAMES
+from metrics import get_metrics
+
+if TYPE_CHECKING:
+    import pandas as pd     # 只有 Excel 兼容接口用到，运行时按需导入
 
 
 # —— 共用函数 —— #
@@ -9,37 +14,79 @@ def log(msg):
     print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {msg}")
 
 
-# Playwright 渲染
-from playwright.sync_api import sync_playwright
-
-
-def render_html(url: str, timeout: int = 60000, is_detail_page: bool = False) -> str:
-    log(f"  → 渲染页面: {url}")
-    user_agent = random.choice(USER_AGENTS)
+# Playwright 渲染（共享浏览器池，按 config.RENDER_PROFILES 屏蔽资源、等待目标元素）
+from renderer import render_page
+
+
+def render_html(url: str, timeout: int = 60000, is_detail_page: bool = False, profile: str = None) -> str:
+    return render_page(url, profile or ("detail" if is_detail_page else "default"), context_options={
+        "viewport": {'width': 1280, 'height': 800},
+        "locale": 'zh-CN',
+        "timezone_id": 'Asia/Shanghai',
+    }, timeout=timeout)
+
+
+# —— 数据源内去重 —— #
+class SeenFilter:
+    """
+    数据源内部按 URL 去重：已知 URL 直接跳过（不渲染详情、不做摘要），
+    列表按时间倒序时连续遇到 stop_after 条已知 URL 即可停止扫描
+    """
+
+    def __init__(self, seen=None, stop_after: int = KNOWN_RUN_STOP):
+        self.seen = seen
+        self.stop_after = stop_after
+        self.run = 0
+        self.skipped = 0
+
+    def known(self, url: str) -> bool:
+        if self.seen is None or url not in self.seen:
+            self.run = 0
+            return False
+        self.run += 1
+        self.skipped += 1
+        return True
+
+    @property
+    def exhausted(self) -> bool:
+        return bool(self.stop_after) and self.run >= self.stop_after
+
+
+def iter_source(src, seen=None):
+    """
+    调用数据源的 iter_items / fetch_items；支持 seen 参数的源会在内部跳过已知 URL。
+    只统计数据源自身的耗时（不含下游处理条目的时间）和产出条数。
+    """
+    fn = getattr(src, "iter_items", None) or src.fetch_items
+    name = src.__name__.rsplit(".", 1)[-1]
+    metrics = get_metrics()
+    t0 = time.perf_counter()
+    items = iter(fn(seen=seen) if "seen" in inspect.signature(fn).parameters else fn())
+    busy = time.perf_counter() - t0
     try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True,
-                                        args=['--disable-blink-features=AutomationControlled'])
-            ctx = browser.new_context(user_agent=user_agent,
-                                      viewport={'width': 1280, 'height': 800}, locale='zh-CN',
-                                      timezone_id='Asia/Shanghai')
-            page = ctx.new_page()
-            page.goto(url, timeout=timeout, wait_until='domcontentloaded')
-            # 深度渲染
-            if is_detail_page:
-                for _ in range(3):
-                    page.mouse.wheel(0, random.randint(200, 600))
-                    time.sleep(random.uniform(1, 2))
-            html = page.content()
-            browser.close()
-            return html
-    except Exception as e:
-        log(f"  × 渲染失败: {e}")
-        return ""
-
-
-# 从 kr36.py 导入更完善的函数
-from data_sources.kr36 import fetch_36kr_content
+        while True:
+            t0 = time.perf_counter()
+            try:
+                item = next(items)
+            except StopIteration:
+                break
+            finally:
+                busy += time.perf_counter() - t0
+            metrics.inc("news_source_items_total", source=name)
+            yield item
+    finally:
+        metrics.observe("news_source_seconds", busy, source=name)
+
+
+def __getattr__(name):
+    # 兼容旧接口：data_manager.fetch_36kr_content / summarize_text 在第一次访问时才导入
+    if name == "fetch_36kr_content":
+        from data_sources.kr36 import fetch_36kr_content
+        return fetch_36kr_content
+    if name == "summarize_text":
+        from ai_api import summarize_text
+        return summarize_text
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # —— 动态加载所有 data_sources 下的模块 —— #
@@ -51,102 +98,34 @@ def load_data_sources():
             yield mod
 
 
-# —— Excel 操作 —— #
-def load_excel() -> pd.DataFrame:
-    if os.path.exists(EXCEL_FILE):
-        df = pd.read_excel(EXCEL_FILE, dtype=str)
-        # 确保发送状态列存在
-        if '发送状态' not in df.columns:
-            df['发送状态'] = ''
-        log(f"已加载 {len(df)} 条历史")
-        return df
-    else:
+# —— 存储（兼容旧 Excel 接口） —— #
+def load_excel() -> "pd.DataFrame":
+    """兼容接口：返回全部历史的 DataFrame（数据来自存储后端）"""
+    import pandas as pd
+    with get_metrics().timer("news_storage_seconds", op="load_excel"):
+        rows = get_store().rows()
+    if not rows:
         log("无历史，新建空表")
         return pd.DataFrame(columns=COLUMNS)
+    df = pd.DataFrame([{FIELD_TO_COL[f]: r[f] for f in FIELD_NAMES} for r in rows])
+    log(f"已加载 {len(df)} 条历史")
+    return df
 
 
-def save_excel(df: pd.DataFrame):
-    df.to_excel(EXCEL_FILE, index=False)
-    sz = os.path.getsize(EXCEL_FILE)
-    log(f"已保存 {EXCEL_FILE} ({sz} 字节)")
+def save_excel(df: "pd.DataFrame"):
+    """兼容接口：整表写回存储后端（事务内完成）"""
+    with get_metrics().timer("news_storage_seconds", op="save_excel"):
+        get_store().replace_all(records_from_frame(df))
+    log(f"已保存 {len(df)} 条到存储")
+    if EXPORT_EXCEL:
+        export_excel()
 
 
 # —— 主流程：抓取 + 写入 —— #
 def fetch_and_save_news():
+    """只跑流水线的抓取/摘要/入库阶段，不推送（推送由 send_news 完成）"""
+    from pipeline import run_pipeline
     log("===== 开始获取新闻 =====")
-    success = True
-
-    try:
-        # 1. 读历史
-        df = load_excel()
-        seen_urls = set(df["URL"].dropna())
-
-        # 2. 抓取所有源
-        all_items = []
-        for src in load_data_sources():
-            try:
-                items = src.fetch_items()
-                all_items.extend(items)
-            except Exception as e:
-                log(f"× 数据源 {src.__name__} 抓取失败: {e}")
-                success = False
-
-        # 3. 筛新
-        new_items = [it for it in all_items if it["url"] not in seen_urls]
-        if not new_items:
-            log("无新内容")
-            return success
-
-        log(f"发现 {len(new_items)} 条新新闻，开始处理...")
-
-        # 4. 逐条处理并写入
-        for idx, item in enumerate(new_items, 1):
-            log(f"处理第 {idx}/{len(new_items)} 条: {item['title']}")
-            # 并发/多次防重
-            cur = load_excel()
-            if item["url"] in set(cur["URL"].dropna()):
-                log(f"  ! 跳过重复URL: {item['url']}")
-                continue
-
-            try:
-                # 4.1 AI 生成摘要
-                if item.get("need_render"):
-                    full = fetch_36kr_content(item["url"])
-                    summary = summarize_text(full or item.get("abstract", ""))
-                else:
-                    summary = item.get("abstract", "")
-
-                # 4.2 AI 处理状态
-                ai_status = "AI处理完成" if summary and summary.strip() else "AI处理失败"
-
-                # 4.3 构建新行
-                new_record = pd.DataFrame([{
-                    "标题":           item["title"],
-                    "来源":           item["source"],
-                    "日期":           item["date_str"],
-                    "URL":            item["url"],
-                    "作者":           item["author"],
-                    "内容":           summary,
-                    "需要渲染":       str(item.get("need_render", False)),
-                    "AI处理状态":     ai_status,
-                    "发送状态":       "",    # 空 = 待发送
-                    "更新时间":       datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                }])
-
-                # 4.4 追加并保存
-                df = pd.concat([df, new_record], ignore_index=True)
-                save_excel(df)
-                log(f"  ✓ 已保存: {item['title']}")
-
-            except Exception as e:
-                log(f"  × 处理失败: {item['title']} - {e}")
-                success = False
-
-        log(f"===== 新闻获取完成，共处理 {len(new_items)} 条 =====")
-
-    except Exception as e:
-        log(f"× 获取新闻过程出错: {e}")
-        success = False
-
+    success = run_pipeline(deliver=False)
+    log("===== 新闻获取完成 =====")
     return success
-
@@ -1,10 +1,14 @@
 # aibot.py
-from bs4 import BeautifulSoup
+from html_parser import parse
 import re
 from datetime import datetime
-from data_manager import render_html, log
+from data_manager import render_html, log, SeenFilter
+from http_fetch import fetch_html
 from config import AI_BOT_URL
 
+# 快速检查：列表页里的文章链接集合不变就认为没有新内容
+QUICK_CHECK = {"urls": [AI_BOT_URL], "pattern": r'<h2[^>]*>\s*<a[^>]+href="([^"]+)"'}
+
 def parse_date(raw_date: str) -> str:
     """
     将类似 “6月5日”、“6月5·周四”、“6月5” 等格式，
@@ -23,18 +27,20 @@ def parse_date(raw_date: str) -> str:
     else:
         return raw_date
 
-def fetch_items():
+def iter_items(seen=None):
     """
-    返回列表，每项 dict 包含：
+    逐条产出，每项 dict 包含：
       title, source, date_str, url, abstract, author, need_render=False
+    seen 中已有的 URL 跳过；连续遇到若干条已知 URL 后停止
     """
     log("→ [AI-BOT] 抓列表…")
-    html = render_html(AI_BOT_URL)
+    # 静态页面：HTTP 优先，拿不到 news-item 时再用浏览器渲染
+    html = fetch_html(AI_BOT_URL, render=lambda u: render_html(u, profile="aibot"), expect="news-item")
     if not html:
         log("  × AI-BOT 页面渲染失败")
-        return []
+        return
 
-    soup = BeautifulSoup(html, "html.parser")
+    soup = parse(html, "div.news-date, div.news-item")
     blocks = []
     for el in soup.select("div.news-date, div.news-item"):
         cls = el.get("class", [])
@@ -43,16 +49,24 @@ def fetch_items():
         elif "news-item" in cls and blocks:
             blocks[-1]["items"].append(el)
 
-    out = []
+    count = 0
+    known = SeenFilter(seen)
     for blk in blocks[:2]:
+        if known.exhausted:
+            break
         # 把原始日期传给 parse_date
         date_str = parse_date(blk["date"])
         for it in blk["items"]:
             a = it.find("h2").find("a")
+            if known.known(a["href"]):
+                if known.exhausted:
+                    break
+                continue
             abstract = it.find("p", class_="text-muted text-sm")
             author_tag = abstract.find("span", class_="news-time text-xs") if abstract else None
             author = author_tag.text.replace("来源：", "").strip() if author_tag else "AI-BOT 编辑部"
-            out.append({
+            count += 1
+            yield {
                 "title":      a.text.strip(),
                 "source":     "AI-BOT",
                 "date_str":   date_str,
@@ -60,7 +74,10 @@ def fetch_items():
                 "abstract":   abstract.get_text(strip=True) if abstract else "",
                 "author":     author,
                 "need_render": False
-            })
+            }
+
+    log(f"→ [AI-BOT] 抓到 {count} 条新条目（跳过已知 {known.skipped} 条）")
+
 
-    log(f"→ [AI-BOT] 抓到 {len(out)} 条")
-    return out
+def fetch_items(seen=None):
+    return list(iter_items(seen))
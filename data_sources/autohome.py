@@ -1,48 +1,37 @@
 # -autohome.py
-import time
-import random
 from datetime import datetime
-from bs4 import BeautifulSoup
-from ai_api import summarize_text
+from html_parser import parse
 from config import MAX_ARTICLES_PER_SOURCE
-from data_manager import log
+from data_manager import log, SeenFilter
 
-# Playwright 相关
-from playwright.sync_api import sync_playwright
+# Playwright 相关（共享浏览器池，渲染配置见 config.RENDER_PROFILES）
+from renderer import render_page
+from http_fetch import fetch_html
 
 AUTOME_URL = "https://www.autohome.com.cn/news"
 
+# 快速检查：列表页里的文章链接集合不变就认为没有新内容
+QUICK_CHECK = {"urls": [AUTOME_URL], "pattern": r'autohome\.com\.cn/news/\d+/(\d+)\.html'}
+
 
 class AutoHomeFetcher:
     def __init__(self):
-        # 启动 Playwright
-        self.play = sync_playwright().start()
-        # 复用同一个浏览器实例和 Context
-        self.browser = self.play.chromium.launch(headless=True)
-        self.context = self.browser.new_context(
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
-                       "(KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36",
-            viewport={"width": 1280, "height": 800},
-        )
-        # 可在此处拦截广告/埋点请求，减少 networkidle 挂起
-        self.context.route("**/*", self._route_handler)
-        self.page = self.context.new_page()
-
-    def _route_handler(self, route, request):
-        url = request.url
-        # 简单屏蔽常见广告/埋点域名
-        if any(k in url for k in ("doubleclick.net", "adpush", "googlesyndication")):
-            return route.abort()
-        return route.continue_()
+        # 浏览器由进程级浏览器池统一管理，这里只保留 context 参数
+        self.context_options = {
+            "user_agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                          "(KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36",
+            "viewport": {"width": 1280, "height": 800},
+        }
+
+    def _render(self, url: str, profile: str) -> str:
+        return render_page(url, profile, context_options=self.context_options)
 
     def fetch_list_items(self, list_url: str):
         """加载列表页，返回 BeautifulSoup 找到的 li 节点列表"""
-        self.page.goto(list_url,
-                       timeout=60000,              # 最长等 60s
-                       wait_until="domcontentloaded"  # 只等 DOMContentLoaded
-                       )
-        html = self.page.content()
-        soup = BeautifulSoup(html, "html.parser")
+        # HTTP 优先；拿不到文章列表时用浏览器渲染，等到文章 li 出现即返回
+        html = fetch_html(list_url, render=lambda u: self._render(u, "autohome_list"),
+                          expect="data-artidanchor")
+        soup = parse(html, "li[data-artidanchor]")
         return soup.find_all('li', attrs={'data-artidanchor': True})
 
     def fetch_detail(self, url: str) -> dict:
@@ -51,18 +40,14 @@ class AutoHomeFetcher:
         如果加载或解析失败，返回空字段，但脚本继续跑
         """
         try:
-            # 关掉超时，等 DOMContentLoaded
-            self.page.goto(url,
-                           timeout=0,
-                           wait_until="domcontentloaded")
-            # 如果需要，也可在此加 wait_for_selector
-            time.sleep(0.5)
-            html = self.page.content()
+            # HTTP 优先；渲染时等到正文段落出现即返回（导航超时见渲染配置）
+            html = fetch_html(url, render=lambda u: self._render(u, "autohome_detail"),
+                              expect="editor-paragraph")
         except Exception as e:
             log(f"  ⚠️ AutoHome 详情页加载失败: {url}\n    {e}")
             return {"time": "", "author": "", "content": ""}
 
-        soup = BeautifulSoup(html, "html.parser")
+        soup = parse(html, "span.time, a.name, p.editor-paragraph")
         # 提取时间
         time_tag = soup.find('span', class_='time')
         date_str = ""
@@ -85,61 +70,64 @@ class AutoHomeFetcher:
         return {"time": date_str, "author": author, "content": content}
 
     def close(self):
-        """关闭浏览器和 Playwright"""
-        try:
-            self.browser.close()
-            self.play.stop()
-        except Exception:
-            pass
+        """浏览器由浏览器池统一关闭，这里无需处理"""
+        pass
 
 
-def fetch_items():
+def iter_items(seen=None):
     """
-    返回 list[dict]，每条至少包含：
-      title, source, date_str, url, abstract, author, need_render=False
+    逐条产出列表条目，每条至少包含：
+      title, source, date_str, url, abstract, author, need_render=True
+    正文和摘要由流水线的详情/摘要阶段通过 fetch_detail 完成；
+    seen 中已有的 URL 直接跳过，连续遇到若干条已知 URL 后停止
     """
     log("→ [AutoHome] 抓列表…")
     fetcher = AutoHomeFetcher()
-    out = []
-    try:
-        lis = fetcher.fetch_list_items(AUTOME_URL)
-        # 限制条数
-        for li in lis[:MAX_ARTICLES_PER_SOURCE]:
-            # 标题 & 链接
-            h3 = li.find('h3')
-            a_tag = li.find('a', href=True)
-            title = h3.get_text(strip=True) if h3 else ""
-            url = a_tag['href'] if a_tag else ""
-            if url.startswith("//"):
-                url = "https:" + url
-            if not title or not url:
-                continue
-
-            # 抓详情
-            detail = fetcher.fetch_detail(url)
-            date_str = detail.get("time") or datetime.now().strftime("%Y-%m-%d")
-            author = detail.get("author") or "汽车之家编辑部"
-            full_txt = detail.get("content", "")
-
-            # 调用 AI 做摘要
-            summary = summarize_text(full_txt) if full_txt else ""
-            out.append({
-                "title": title,
-                "source": "汽车之家",
-                "date_str": date_str,
-                "url": url,
-                "abstract": summary,
-                "author": author,
-                "need_render": False,
-            })
-
-            # 随机 sleep，降低被屏蔽风险
-            time.sleep(random.uniform(1, 2))
-    finally:
-        fetcher.close()
-
-    log(f"→ [AutoHome] 共抓到 {len(out)} 条")
-    return out
+    count = 0
+    known = SeenFilter(seen)
+    lis = fetcher.fetch_list_items(AUTOME_URL)
+    # 限制条数
+    for li in lis[:MAX_ARTICLES_PER_SOURCE]:
+        # 标题 & 链接
+        h3 = li.find('h3')
+        a_tag = li.find('a', href=True)
+        title = h3.get_text(strip=True) if h3 else ""
+        url = a_tag['href'] if a_tag else ""
+        if url.startswith("//"):
+            url = "https:" + url
+        if not title or not url:
+            continue
+        if known.known(url):
+            if known.exhausted:
+                break
+            continue
+
+        count += 1
+        yield {
+            "title": title,
+            "source": "汽车之家",
+            "date_str": datetime.now().strftime("%Y-%m-%d"),
+            "url": url,
+            "abstract": "",
+            "author": "汽车之家编辑部",
+            "need_render": True,
+        }
+
+    log(f"→ [AutoHome] 共抓到 {count} 条新条目（跳过已知 {known.skipped} 条）")
+
+
+def fetch_items(seen=None):
+    return list(iter_items(seen))
+
+
+def fetch_detail(item: dict) -> str:
+    """抓详情页：补全日期/作者，返回正文全文"""
+    detail = AutoHomeFetcher().fetch_detail(item["url"])
+    if detail.get("time"):
+        item["date_str"] = detail["time"]
+    if detail.get("author"):
+        item["author"] = detail["author"]
+    return detail.get("content", "")
 
 
 if __name__ == "__main__":
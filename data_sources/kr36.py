@@ -1,10 +1,33 @@
 ## -*- coding: utf-8 -*-
-from bs4 import BeautifulSoup
-import re, time, random, os
+from html_parser import parse
+import re
 from datetime import datetime, timedelta
-from data_manager import log
-from config import KR_URLS, MAX_ARTICLES_PER_SOURCE, MIN_DELAY_BETWEEN_DETAILS, MAX_DELAY_BETWEEN_DETAILS
-from playwright.sync_api import sync_playwright
+from data_manager import log, SeenFilter
+from config import KR_URLS, MAX_ARTICLES_PER_SOURCE
+from renderer import render_page
+from http_fetch import fetch_html
+from diagnostics import get_diagnostics
+from extractor import get_extractor
+
+# 详情页正文容器的候选选择器（按优先级）
+ARTICLE_SELECTORS = [
+    "div[data-test='article-content']",
+    "div.article-content",
+    "div.main-article",
+    "div.content",
+    "div.articleDetail-content",
+    "section.textblock",
+    "div.kr-article-content",
+    "div.article-text",
+    "div#article-content",
+    "div.article"
+]
+
+# 快速检查：页面（含服务端渲染的初始数据）里的文章 ID 集合不变就认为没有新内容；
+# 取不到 ID 时视为有变化，照常用浏览器抓取
+QUICK_CHECK = {"urls": list(KR_URLS.values()), "pattern": r'(?:/p/|"itemId":)(\d{6,})'}
+
+KR_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
 
 
 def parse_36kr_time(s: str) -> str:
@@ -30,95 +53,61 @@ def parse_36kr_time(s: str) -> str:
 
 
 def render_html_36kr(url: str, timeout: int = 60000) -> str:
-    """专门为36Kr优化的页面渲染函数"""
-    log(f"  → 渲染36Kr页面: {url}")
-
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        try:
-            context = browser.new_context(
-                user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
-                viewport={'width': 1280, 'height': 800}
-            )
-            page = context.new_page()
-            page.goto(url, timeout=timeout)
-
-            # 等待页面加载完成（网络空闲）
-            page.wait_for_load_state("networkidle", timeout=timeout)
-
-            # 向下滚动以确保动态内容加载
-            page.evaluate("window.scrollTo(0, document.body.scrollHeight * 0.5)")
-            time.sleep(2)  # 短暂等待以确保内容加载
-
-            html = page.content()
-            log(f"    页面渲染完成，HTML长度: {len(html)} 字符")
-            return html
-        except Exception as e:
-            log(f"    × 渲染36Kr页面失败: {e}")
-            return ""
-        finally:
-            browser.close()
+    """36Kr 详情页渲染：等到正文容器出现即返回（配置 "36kr_detail"）"""
+    html = render_page(url, "36kr_detail", context_options={
+        "user_agent": KR_USER_AGENT,
+        "viewport": {'width': 1280, 'height': 800}
+    }, timeout=timeout)
+    if html:
+        log(f"    页面渲染完成，HTML长度: {len(html)} 字符")
+    return html
 
 
 # 为了保持兼容性，也需要修改原来的render_html函数导入
 def render_html_list(url: str, timeout: int = 60000) -> str:
-    """用于列表页面的渲染函数"""
-    log(f"  → 渲染页面: {url}")
-
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True,
-                                    args=['--disable-blink-features=AutomationControlled'])
-        try:
-            context = browser.new_context(
-                user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
-                viewport={'width': 1280, 'height': 800},
-                locale='zh-CN',
-                timezone_id='Asia/Shanghai'
-            )
-            page = context.new_page()
-            page.goto(url, timeout=timeout, wait_until='domcontentloaded')
-
-            # 简单滚动
-            for _ in range(3):
-                page.mouse.wheel(0, random.randint(200, 600))
-                time.sleep(random.uniform(1, 2))
-
-            html = page.content()
-            return html
-        except Exception as e:
-            log(f"  × 渲染失败: {e}")
-            return ""
-        finally:
-            browser.close()
-
-
-def fetch_items():
-    out = []
+    """36Kr 列表页渲染：滚动到文章数够用为止（配置 "36kr_list"）"""
+    return render_page(url, "36kr_list", context_options={
+        "user_agent": KR_USER_AGENT,
+        "viewport": {'width': 1280, 'height': 800},
+        "locale": 'zh-CN',
+        "timezone_id": 'Asia/Shanghai'
+    }, timeout=timeout)
+
+
+def iter_items(seen=None):
+    """逐个频道抓列表，边抓边产出条目；seen 中已有的 URL 跳过，连续遇到若干条已知 URL 后换下一个频道"""
+    total = 0
     for src, url in KR_URLS.items():
         log(f"→ [36Kr] 源 {src} 抓列表…")
-        time.sleep(random.uniform(5, 8))
-        html = render_html_list(url)
+        html = fetch_html(url, render=render_html_list, expect="information-flow-item")
         if not html:
             log(f"  × {src} 列表渲染失败")
             continue
 
-        soup = BeautifulSoup(html, "html.parser")
+        soup = parse(html, "div.information-flow-item")
         count = 0
+        scanned = 0
+        known = SeenFilter(seen)
         for art in soup.select("div.information-flow-item"):
-            if count >= MAX_ARTICLES_PER_SOURCE:
+            if scanned >= MAX_ARTICLES_PER_SOURCE:
                 break
             a = art.select_one("a.article-item-title")
             if not a: continue
+            scanned += 1
+            href = a["href"]
+            if not href.startswith("http"):
+                href = "https://www.36kr.com" + href
+            if known.known(href):
+                if known.exhausted:
+                    break
+                continue
             tm = art.select_one("span.kr-flow-bar-time")
             desc = art.select_one("a.article-item-description")
             author_tag = art.select_one("a.kr-flow-bar-author")
             author = author_tag.get_text(strip=True) if author_tag else "36Kr 编辑部"
             date_str = parse_36kr_time(tm.text) if tm else ""
-            href = a["href"]
-            if not href.startswith("http"):
-                href = "https://www.36kr.com" + href
 
-            out.append({
+            yield {
                 "title": a.get_text(strip=True),
                 "source": src,
                 "date_str": date_str,
@@ -126,43 +115,45 @@ def fetch_items():
                 "abstract": desc.get_text(strip=True) if desc else "",
                 "author": author,
                 "need_render": True
-            })
+            }
             count += 1
-        log(f"→ [36Kr] 从 {src} 抓到 {count} 条")
-    log(f"→ [36Kr] 总共 {len(out)} 条")
-    return out
+        total += count
+        log(f"→ [36Kr] 从 {src} 抓到 {count} 条新条目（跳过已知 {known.skipped} 条）")
+    log(f"→ [36Kr] 总共 {total} 条")
 
 
-def debug_selectors(soup):
-    """调试页面上的各种选择器"""
-    log("    正在检查页面上的主要容器元素...")
+def fetch_items(seen=None):
+    return list(iter_items(seen))
+
+
+def fetch_detail(item: dict) -> str:
+    """流水线详情阶段调用：返回正文全文"""
+    return fetch_36kr_content(item["url"])
 
-    # 检查所有可能的文章容器选择器
-    selectors = [
-        "div[data-test='article-content']",
-        "div.article-content",
-        "div.main-article",
-        "div.content",
-        "div.articleDetail-content",
-        "section.textblock",
-        "div.kr-article-content",
-        "div.article-text",
-        "div#article-content",
-        "div.article"
-    ]
 
+def debug_selectors(soup) -> list:
+    """调试页面上的各种选择器（只在需要保存诊断现场时调用），返回输出的调试信息"""
+    notes = []
+
+    def note(msg):
+        notes.append(msg.strip())
+        log(msg)
+
+    note("    正在检查页面上的主要容器元素...")
+
+    # 检查所有可能的文章容器选择器
     found_any = False
-    for selector in selectors:
+    for selector in ARTICLE_SELECTORS:
         elements = soup.select(selector)
         if elements:
             found_any = True
-            log(f"    - 选择器 '{selector}' 找到 {len(elements)} 个元素")
+            note(f"    - 选择器 '{selector}' 找到 {len(elements)} 个元素")
             for i, elem in enumerate(elements[:1]):  # 只显示第一个
                 text_length = len(elem.get_text(strip=True))
-                log(f"      元素 {i + 1}: 包含文本长度 {text_length} 字符")
+                note(f"      元素 {i + 1}: 包含文本长度 {text_length} 字符")
 
     if not found_any:
-        log("    ! 所有预定义选择器都未找到元素")
+        note("    ! 所有预定义选择器都未找到元素")
         # 查找所有具有class的div，寻找可能的容器
         all_divs = soup.find_all("div", class_=True)
         class_counts = {}
@@ -177,90 +168,43 @@ def debug_selectors(soup):
                     class_counts[classes]["max_text_len"] = max(class_counts[classes]["max_text_len"], text_len)
 
         if class_counts:
-            log("    可能与文章相关的DIV类:")
+            note("    可能与文章相关的DIV类:")
             for cls, info in sorted(class_counts.items(), key=lambda x: x[1]["max_text_len"], reverse=True)[:5]:
-                log(f"      class='{cls}': {info['count']}个, 最大文本长度={info['max_text_len']}")
+                note(f"      class='{cls}': {info['count']}个, 最大文本长度={info['max_text_len']}")
+    return notes
+
+
+def _diagnose(url: str, html: str, soup, reason: str, extracted: str = ""):
+    """保存诊断现场：失败时总是保存，成功时按抽样率保存（见 config.DIAGNOSTICS_MODE）"""
+    diag = get_diagnostics()
+    if not diag.should_capture(failed=not extracted):
+        return
+    notes = debug_selectors(soup) if not extracted else []
+    diag.capture("36kr", url, html, reason=reason, extracted=extracted, notes=notes)
 
 
 def fetch_36kr_content(url: str) -> str:
     """基于您的测试代码优化的36Kr内容抓取函数"""
-    # 添加随机延迟
-    delay = random.uniform(MIN_DELAY_BETWEEN_DETAILS, MAX_DELAY_BETWEEN_DETAILS)
-    log(f"    等待 {delay:.1f}s 再抓详情：{url}")
-    time.sleep(delay)
+    log(f"    抓详情：{url}")
 
-    # 渲染页面
-    html = render_html_36kr(url, timeout=60000)
+    # 渲染页面（按域名限速，见 config.DOMAIN_RATE_LIMITS）
+    html = fetch_html(url, render=render_html_36kr)
     if not html:
         log("    × 页面渲染失败")
         return ""
 
-    # 保存原始HTML以便调试
-    debug_basename = f"debug_36kr_{int(time.time())}"
-    debug_file = f"{debug_basename}.html"
-    with open(debug_file, "w", encoding="utf-8") as f:
-        f.write(html)
-    log(f"    ! 已保存原始HTML: {debug_file} (长度: {len(html)}字符)")
-
-    # 解析HTML
-    soup = BeautifulSoup(html, "html.parser")
-
-    # 输出调试信息
-    debug_selectors(soup)
-
-    # 依次尝试多种容器选择器（基于您的测试代码）
-    div = (
-            soup.select_one("div[data-test='article-content']") or
-            soup.select_one("div.article-content") or
-            soup.select_one("div.main-article") or
-            soup.select_one("div.content") or
-            soup.select_one("div.articleDetail-content") or
-            soup.select_one("section.textblock") or
-            soup.select_one("div.kr-article-content") or
-            soup.select_one("div.article-text") or
-            soup.select_one("div#article-content") or
-            soup.select_one("div.article")
-    )
-
-    if not div:
-        log("    × 未找到文章内容容器")
-        # 尝试查找包含最多段落的div
-        log("    尝试查找包含最多段落的容器...")
-        best_div = None
-        max_paragraphs = 0
-
-        for d in soup.find_all("div"):
-            paragraphs = d.find_all("p")
-            if len(paragraphs) > max_paragraphs:
-                text_content = d.get_text(strip=True)
-                if len(text_content) > 200:  # 至少200字符
-                    max_paragraphs = len(paragraphs)
-                    best_div = d
-
-        if best_div:
-            log(f"    找到候选容器，包含 {max_paragraphs} 个段落")
-            div = best_div
-        else:
-            log("    × 无法找到合适的内容容器")
-            return ""
-
-    # 提取正文文本
-    paragraphs = [p.get_text(strip=True) for p in div.find_all("p") if p.get_text(strip=True)]
-
-    if not paragraphs:
-        log("    × 找到了容器但没有段落内容，尝试获取全部文本")
-        full_text = div.get_text(strip=True)
-        if len(full_text) < 100:
-            log("    × 文本内容太少")
-            return ""
-    else:
-        full_text = "\n".join(paragraphs)
-
-    log(f"    ✓ 成功提取正文: {len(full_text)} 字符, {len(paragraphs)} 个段落")
-
-    # 保存提取的内容
-    with open(f"{debug_basename}_extracted.txt", "w", encoding="utf-8") as f:
-        f.write(full_text)
+    # 提取正文：先用该类页面上次成功的策略，失效后依次尝试候选选择器，最后按文本密度兜底
+    result = get_extractor().extract(url, html, ARTICLE_SELECTORS)
+    soup, full_text = result.soup, result.text
+    if not full_text:
+        log("    × 无法找到合适的内容容器")
+        _diagnose(url, html, soup, "未找到正文")
+        return ""
+
+    log(f"    ✓ 成功提取正文: {len(full_text)} 字符（策略: {result.strategy}）")
+
+    # 按抽样率保存成功页面的现场（默认不保存）
+    _diagnose(url, html, soup, "抽样", full_text)
 
     # 输出部分内容预览，帮助确认质量
     preview = full_text[:150] + "..." if len(full_text) > 150 else full_text
@@ -0,0 +1,191 @@
+# dedupe.py
+"""
+跨数据源近似重复检测。
+
+同一条新闻常在 36Kr、AI-BOT、汽车之家以不同 URL 出现，各家的摘要往往不同（汽车之家没有摘要），
+但标题基本一致。对归一化后的标题计算 64 位 SimHash（字符 3-gram 特征），与最近
+DEDUPE_WINDOW_DAYS 天内已成功处理的条目比较，海明距离不超过 DEDUPE_MAX_DISTANCE 即视为重复，
+归入最早那条所在的组。
+
+查找用 LSH 分段索引：64 位切成 DEDUPE_MAX_DISTANCE+1 段，距离不超过阈值的两个指纹
+至少有一段完全相同（抽屉原理），所以只需比较任一段相同的候选，不会漏判。
+索引常驻内存（查找在亚毫秒级），同时逐条写入 SQLite（与新闻表同库），跨次运行保留；
+登记新条目时顺带清掉窗口外的旧条目，常驻进程的内存不会无限增长。
+只有原文成功摘要入库后才登记（add），原文处理失败时后来的同题条目仍按新内容处理。
+"""
+import hashlib
+import operator
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from datetime import datetime
+from config import DB_FILE, DEDUPE_MAX_DISTANCE, DEDUPE_WINDOW_DAYS, DEDUPE_MIN_CHARS
+
+_BITS = 64
+_SHINGLE = 3
+_PUNCT = re.compile(r"[\W_]+", re.UNICODE)
+
+
+def log(msg):
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {msg}")
+
+
+def normalize(text: str) -> str:
+    """全半角统一、小写、去掉标点和空白"""
+    return _PUNCT.sub("", unicodedata.normalize("NFKC", text or "").lower())
+
+
+def simhash(text: str) -> int:
+    """已归一化文本的 64 位 SimHash；每个 3-gram 特征按 64 位哈希的各位投票"""
+    grams = {text[i:i + _SHINGLE] for i in range(max(1, len(text) - _SHINGLE + 1))}
+    counts = [0] * _BITS
+    for g in grams:
+        h = int.from_bytes(hashlib.blake2b(g.encode("utf-8"), digest_size=8).digest(), "big")
+        # 按位累加放在 C 层完成：b"0"/b"1" 的字节值相加，最后统一减掉偏移
+        counts = list(map(operator.add, counts, format(h, "064b").encode()))
+    half = len(grams) * (ord("0") * 2 + 1) / 2
+    value = 0
+    for c in counts:
+        value = (value << 1) | (c > half)
+    return value
+
+
+def distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class NearDupIndex:
+    def __init__(self, path: str = DB_FILE, max_distance: int = DEDUPE_MAX_DISTANCE,
+                 window_days: float = DEDUPE_WINDOW_DAYS, clock=time.time):
+        self.max_distance = max_distance
+        self.clock = clock      # 墙钟（测试时注入）
+        self.window = window_days * 86400
+        self.bands = max_distance + 1
+        self._width = _BITS // self.bands
+        self._lock = threading.Lock()
+        self._entries = {}      # url -> (simhash, 组 URL, 时间)，按登记时间先后排列
+        self._buckets = [{} for _ in range(self.bands)]   # 段号 -> {段值: [url, ...]}
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS near_dup (
+                url        TEXT PRIMARY KEY,
+                simhash    TEXT NOT NULL,
+                group_url  TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )""")
+        self._load()
+
+    def _band_keys(self, h: int):
+        mask = (1 << self._width) - 1
+        return [(h >> (i * self._width)) & mask for i in range(self.bands)]
+
+    def _index(self, url: str, h: int, group: str, ts: float):
+        self._entries[url] = (h, group, ts)
+        for bucket, key in zip(self._buckets, self._band_keys(h)):
+            bucket.setdefault(key, []).append(url)
+
+    def _load(self):
+        cutoff = self.clock() - self.window
+        with self._lock:
+            self._conn.execute("DELETE FROM near_dup WHERE created_at < ?", (cutoff,))
+            for url, h, group, ts in self._conn.execute(
+                    "SELECT url, simhash, group_url, created_at FROM near_dup ORDER BY created_at"):
+                self._index(url, int(h, 16), group, ts)
+
+    def _prune(self, now: float):
+        """从最早登记的条目开始，移除窗口外的条目（内存和 SQLite）"""
+        cutoff = now - self.window
+        expired = []
+        for url, (h, _, ts) in self._entries.items():
+            if ts >= cutoff:
+                break
+            expired.append((url, h))
+        if not expired:
+            return
+        for url, h in expired:
+            del self._entries[url]
+            for bucket, key in zip(self._buckets, self._band_keys(h)):
+                urls = bucket[key]
+                urls.remove(url)
+                if not urls:
+                    del bucket[key]
+        self._conn.execute("DELETE FROM near_dup WHERE created_at < ?", (cutoff,))
+
+    # —— 查找 —— #
+    def _nearest(self, h: int, now: float):
+        """窗口内距离最近的已有条目 (url, 距离)；没有返回 None"""
+        best = None
+        cutoff = now - self.window
+        seen = set()
+        for bucket, key in zip(self._buckets, self._band_keys(h)):
+            for url in bucket.get(key, ()):
+                if url in seen:
+                    continue
+                seen.add(url)
+                other, _, ts = self._entries[url]
+                if ts < cutoff:
+                    continue
+                d = distance(h, other)
+                if d <= self.max_distance and (best is None or d < best[1]):
+                    best = (url, d)
+        return best
+
+    def fingerprint(self, title: str):
+        """归一化标题的 SimHash；标题太短（不足 DEDUPE_MIN_CHARS 个字符）返回 None，不参与去重"""
+        text = normalize(title)
+        if len(text) < DEDUPE_MIN_CHARS:
+            return None
+        return simhash(text)
+
+    def match(self, url: str, title: str):
+        """与已登记条目近似重复时返回所属组的首条 URL，否则返回 None；不修改索引"""
+        h = self.fingerprint(title)
+        if h is None:
+            return None
+        with self._lock:
+            if url in self._entries:
+                group = self._entries[url][1]
+                return group if group != url else None
+            hit = self._nearest(h, self.clock())
+            return self._entries[hit[0]][1] if hit else None
+
+    def add(self, url: str, title: str, group: str = None):
+        """登记已成功处理的条目；group 为空时本条作为新组的首条"""
+        h = self.fingerprint(title)
+        if h is None:
+            return
+        now = self.clock()
+        with self._lock:
+            if url in self._entries:
+                return
+            self._prune(now)
+            group = group or url
+            self._index(url, h, group, now)
+            self._conn.execute("INSERT OR REPLACE INTO near_dup VALUES (?, ?, ?, ?)",
+                               (url, format(h, "016x"), group, now))
+
+    def group(self, url: str) -> list:
+        """与 url 同组的全部条目（含自身）"""
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None:
+                return []
+            return [u for u, (_, g, _) in self._entries.items() if g == entry[1]]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_dedupe() -> NearDupIndex:
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = NearDupIndex()
+        return _index
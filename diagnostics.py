@@ -0,0 +1,95 @@
+# diagnostics.py
+"""
+诊断现场抓取（替代每次都写 debug_*.html 的做法）。
+
+DIAGNOSTICS_MODE：
+  "off"      不保存
+  "failure"  只在正文提取失败时保存（默认）
+  "sample"   失败时保存，成功的页面按 DIAGNOSTICS_SAMPLE_RATE 抽样保存
+每次保存一个 gzip 压缩的 JSON（URL、原因、调试信息、提取结果、原始 HTML），
+写入 DIAGNOSTICS_DIR；目录总大小超过 DIAGNOSTICS_MAX_BYTES 时从最旧的文件开始删除。
+查看：python -c "import gzip,json,sys; print(json.load(gzip.open(sys.argv[1]))['html'])" 文件
+"""
+import gzip
+import hashlib
+import json
+import os
+import random
+import threading
+from datetime import datetime
+from config import DIAGNOSTICS_MODE, DIAGNOSTICS_SAMPLE_RATE, DIAGNOSTICS_DIR, DIAGNOSTICS_MAX_BYTES
+
+
+def log(msg):
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {msg}")
+
+
+class DiagnosticsCapture:
+    def __init__(self, mode: str = DIAGNOSTICS_MODE, sample_rate: float = DIAGNOSTICS_SAMPLE_RATE,
+                 directory: str = DIAGNOSTICS_DIR, max_bytes: int = DIAGNOSTICS_MAX_BYTES):
+        self.mode = mode
+        self.sample_rate = sample_rate
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def should_capture(self, failed: bool) -> bool:
+        """是否需要保存这一次的现场（调用方据此决定要不要做额外的调试扫描）"""
+        if self.mode == "off":
+            return False
+        if failed:
+            return True
+        return self.mode == "sample" and random.random() < self.sample_rate
+
+    def capture(self, source: str, url: str, html: str, reason: str = "",
+                extracted: str = "", notes: list = None) -> str:
+        """保存一次现场，返回文件路径；写入失败只记日志，不影响抓取"""
+        now = datetime.now()
+        name = f"{now.strftime('%Y%m%d_%H%M%S')}_{source}_{hashlib.sha1(url.encode('utf-8')).hexdigest()[:8]}.json.gz"
+        record = {
+            "time": now.strftime("%Y-%m-%d %H:%M:%S"),
+            "source": source,
+            "url": url,
+            "reason": reason,
+            "notes": notes or [],
+            "extracted": extracted,
+            "html": html,
+        }
+        with self._lock:
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                path = os.path.join(self.directory, name)
+                with gzip.open(path, "wt", encoding="utf-8") as f:
+                    json.dump(record, f, ensure_ascii=False)
+                self._rotate()
+            except OSError as e:
+                log(f"    × 诊断现场保存失败: {e}")
+                return ""
+        log(f"    ! 已保存诊断现场: {path}（{reason or '抽样'}）")
+        return path
+
+    def _rotate(self):
+        """目录总大小超过上限时，从最旧的文件开始删除"""
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith(".json.gz"):
+                st = entry.stat()
+                files.append((st.st_mtime, st.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+
+
+_diagnostics = None
+_diagnostics_lock = threading.Lock()
+
+
+def get_diagnostics() -> DiagnosticsCapture:
+    global _diagnostics
+    with _diagnostics_lock:
+        if _diagnostics is None:
+            _diagnostics = DiagnosticsCapture()
+        return _diagnostics
@@ -0,0 +1,202 @@
+# extractor.py
+"""
+正文提取，带按域名 + URL 模式记忆的策略缓存。
+
+策略是一个正文容器的 CSS 选择器，或 "density"（文本密度算法）。
+每个 URL 模式（如 www.36kr.com/p/{n}）记住上次成功的策略，下次先试它，
+只解析该容器；它不再产出正文时立即失效，按候选顺序重新尝试。
+所有选择器都失败时用文本密度算法兜底：每个 <p> 的有效文字（去掉链接文字）
+计入父节点、一半计入祖父节点，取得分最高的容器，整体线性时间。
+策略写入 JSON 文件，跨次运行保留：策略变化时立即写入，命中次数等统计最多每 _SAVE_INTERVAL 秒写一次，
+进程退出时补写。
+"""
+import atexit
+import json
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from urllib.parse import urlsplit
+from config import EXTRACTOR_STRATEGY_FILE
+from html_parser import parse
+
+DENSITY = "density"
+_SAVE_INTERVAL = 60
+
+
+def log(msg):
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {msg}")
+
+
+def url_pattern(url: str) -> str:
+    """www.36kr.com/p/2345678 → www.36kr.com/p/{n}（只保留前两级路径）"""
+    parts = urlsplit(url)
+    segs = [re.sub(r"\d+", "{n}", s) for s in parts.path.split("/") if s][:2]
+    return (parts.hostname or "") + "/" + "/".join(segs)
+
+
+def node_text(node, min_chars: int = 100) -> str:
+    """容器正文：优先拼接 <p> 段落，没有段落时取全部文本（太短视为失败）"""
+    if node is None:
+        return ""
+    paragraphs = [t for t in (p.get_text(strip=True) for p in node.find_all("p")) if t]
+    if paragraphs:
+        return "\n".join(paragraphs)
+    text = node.get_text(strip=True)
+    return text if len(text) >= min_chars else ""
+
+
+def densest_node(soup, min_chars: int = 200):
+    """文本密度兜底：线性时间找出正文段落最集中的容器"""
+    scores = defaultdict(float)
+    nodes = {}
+    for p in soup.find_all("p"):
+        text_len = len(p.get_text(strip=True))
+        if text_len < 10:
+            continue
+        link_len = sum(len(a.get_text(strip=True)) for a in p.find_all("a"))
+        score = text_len - link_len
+        parent = p.parent
+        if parent is None:
+            continue
+        nodes[id(parent)] = parent
+        scores[id(parent)] += score
+        grand = parent.parent
+        if grand is not None:
+            nodes[id(grand)] = grand
+            scores[id(grand)] += score / 2
+    if not scores:
+        return None
+    best = max(scores, key=scores.get)
+    node = nodes[best]
+    return node if len(node.get_text(strip=True)) >= min_chars else None
+
+
+class ExtractResult:
+    def __init__(self, text: str, strategy: str, soup):
+        self.text = text
+        self.strategy = strategy    # 命中的选择器 / "density" / ""（失败）
+        self.soup = soup            # 最后一次解析得到的树（失败时为整页），供诊断使用
+
+
+class StrategyCache:
+    """URL 模式 → 上次成功的策略"""
+
+    def __init__(self, path: str = EXTRACTOR_STRATEGY_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._data = {}
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        self._load()
+        atexit.register(self.flush)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self._data = json.load(f)
+        except Exception as e:
+            log(f"  ! 读取正文提取策略失败，已忽略: {e}")
+
+    def _save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._data, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.path)
+        self._dirty = False
+        self._saved_at = time.monotonic()
+
+    def flush(self):
+        """把未写入的统计写入文件"""
+        with self._lock:
+            if self._dirty:
+                self._save()
+
+    def get(self, key: str) -> str:
+        with self._lock:
+            entry = self._data.get(key)
+            return entry["strategy"] if entry else None
+
+    def record(self, key: str, strategy: str):
+        with self._lock:
+            entry = self._data.get(key)
+            changed = not entry or entry["strategy"] != strategy
+            if changed:
+                entry = self._data[key] = {"strategy": strategy, "hits": 1}
+            else:
+                entry["hits"] += 1
+            entry["updated_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            self._dirty = True
+            # 策略没变时只更新内存中的统计，按间隔写入
+            if changed or time.monotonic() - self._saved_at >= _SAVE_INTERVAL:
+                self._save()
+
+    def invalidate(self, key: str):
+        with self._lock:
+            if self._data.pop(key, None) is not None:
+                self._save()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return json.loads(json.dumps(self._data))
+
+
+class Extractor:
+    def __init__(self, cache: StrategyCache = None):
+        self.cache = cache or StrategyCache()
+
+    def _try(self, soup, strategy: str) -> str:
+        if strategy == DENSITY:
+            return node_text(densest_node(soup))
+        return node_text(soup.select_one(strategy))
+
+    def extract(self, url: str, html: str, selectors: list) -> ExtractResult:
+        """按 [记住的策略] → 候选选择器 → 文本密度 的顺序提取正文"""
+        key = url_pattern(url)
+        cached = self.cache.get(key)
+        soup = None
+
+        if cached:
+            soup = parse(html, None if cached == DENSITY else cached)
+            text = self._try(soup, cached)
+            if text:
+                self.cache.record(key, cached)
+                return ExtractResult(text, cached, soup)
+            log(f"    ! 提取策略失效（{key}: {cached}），重新尝试")
+            self.cache.invalidate(key)
+
+        # 只解析候选容器；都找不到时 parse 自动整页解析
+        candidates = [s for s in selectors if s != cached]
+        if candidates:
+            soup = parse(html, ", ".join(candidates))
+            for sel in candidates:
+                text = self._try(soup, sel)
+                if text:
+                    self.cache.record(key, sel)
+                    return ExtractResult(text, sel, soup)
+
+        # 兜底：整页文本密度（候选都没匹配时上面已经是整页，直接复用）
+        if soup is None or not candidates or soup.select_one(", ".join(candidates)) is not None:
+            soup = parse(html)
+        text = self._try(soup, DENSITY)
+        if text:
+            log(f"    候选选择器均未命中，按文本密度找到正文（{key}）")
+            self.cache.record(key, DENSITY)
+            return ExtractResult(text, DENSITY, soup)
+        return ExtractResult("", "", soup)
+
+
+_extractor = None
+_extractor_lock = threading.Lock()
+
+
+def get_extractor() -> Extractor:
+    global _extractor
+    with _extractor_lock:
+        if _extractor is None:
+            _extractor = Extractor()
+        return _extractor
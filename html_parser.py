@@ -0,0 +1,190 @@
+# html_parser.py
+"""
+HTML 解析后端。
+
+parse(html, scope) 总是返回 BeautifulSoup，原有的 select / find 写法不变；
+scope 为 CSS 选择器时只把需要的容器交给 BeautifulSoup（类似 SoupStrainer 的作用域解析）：
+  - 装了 selectolax：用它（C 实现）在整页里找出容器
+  - 否则装了 lxml：简单选择器（tag.class / tag#id / tag[attr] / tag[attr='v']，可逗号并列）
+    转成 XPath，由 lxml 找出容器
+  - 都没有：html.parser 整页解析
+BeautifulSoup 的解析器优先用 lxml，没有时退回 html.parser。
+（实测 SoupStrainer 的 parse_only 在 bs4 里并不比整页解析快，所以不用它。）
+作用域内没有匹配时退回整页解析，调用方的兜底逻辑不受影响。
+逗号并列的选择器，各后端都按文档顺序返回容器。
+
+直接运行本文件可对录制的页面做解析耗时对比：
+  python html_parser.py [页面.html ...]   （不带参数时使用 HTTP 缓存中的页面）
+"""
+import importlib.util
+import re
+from bs4 import BeautifulSoup
+from config import HTML_PARSER
+from metrics import get_metrics
+
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+HAS_LXML = _installed("lxml")
+HAS_SELECTOLAX = _installed("selectolax")
+
+
+def bs4_features(backend: str = HTML_PARSER) -> str:
+    """BeautifulSoup 使用的解析器名"""
+    if backend == "html.parser" or not HAS_LXML:
+        return "html.parser"
+    return "lxml"
+
+
+# —— 简单选择器 → XPath —— #
+_SIMPLE = re.compile(r"""^([a-zA-Z][\w-]*)?
+    (?: \.([\w-]+)
+      | \#([\w-]+)
+      | \[([\w-]+)(?:=['"]?([^'"\]]+)['"]?)?\]
+    )?$""", re.X)
+
+
+def _xpath(scope: str):
+    """把逗号并列的简单选择器（tag.class / tag#id / tag[attr] / tag[attr='v']）转成 XPath；无法表示时返回 None"""
+    paths = []
+    for part in (p.strip() for p in scope.split(",")):
+        m = _SIMPLE.match(part)
+        if not part or not m:
+            return None
+        tag, cls, id_, attr, val = m.groups()
+        if cls:
+            cond = f"[contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')]"
+        elif id_:
+            cond = f"[@id='{id_}']"
+        elif attr:
+            cond = f"[@{attr}='{val}']" if val else f"[@{attr}]"
+        else:
+            cond = ""
+        paths.append(f"//{tag or '*'}{cond}")
+    return " | ".join(paths)
+
+
+def _outermost(nodes, ancestors) -> list:
+    """嵌套命中只保留最外层，避免重复"""
+    kept, ids = [], set()
+    for node in nodes:
+        if not any(id(a) in ids for a in ancestors(node)):
+            ids.add(id(node))
+            kept.append(node)
+    return kept
+
+
+# —— 预筛：用 C 实现的解析器找出容器，只把容器片段交给 BeautifulSoup —— #
+def _selectolax_fragment(html: str, scope: str) -> str:
+    try:
+        from selectolax.lexbor import LexborHTMLParser as HTMLParser
+    except ImportError:
+        from selectolax.parser import HTMLParser
+    tree = HTMLParser(html)
+    nodes = tree.css(scope)
+    if "," in scope and len(nodes) > 1:
+        # 并列选择器的结果顺序没有保证：按文档顺序重排（调用方依赖先后顺序，如日期标题 + 其后的条目）
+        wanted = {n.mem_id for n in nodes}
+        nodes = [n for n in tree.root.traverse() if n.mem_id in wanted]
+    by_id = {n.mem_id: n for n in nodes}
+
+    def ancestors(node):
+        parent = node.parent
+        while parent is not None:
+            yield by_id.get(parent.mem_id, parent)
+            parent = parent.parent
+
+    return "".join(n.html for n in _outermost(nodes, ancestors))
+
+
+def _lxml_fragment(html: str, scope: str) -> str:
+    xpath = _xpath(scope)
+    if xpath is None:
+        return ""
+    import lxml.html
+    try:
+        root = lxml.html.fromstring(html)
+    except (ValueError, lxml.etree.ParserError):
+        return ""
+    nodes = _outermost(root.xpath(xpath), lambda n: n.iterancestors())
+    return "".join(lxml.html.tostring(n, encoding="unicode", with_tail=False) for n in nodes)
+
+
+def parse(html: str, scope: str = None, backend: str = HTML_PARSER) -> BeautifulSoup:
+    """
+    解析 HTML，返回 BeautifulSoup。
+    scope：只需要的容器的 CSS 选择器（如 "div.information-flow-item"），None 为整页。
+    backend："auto"（selectolax > lxml > html.parser）/ "selectolax" / "lxml" / "html.parser"
+    """
+    features = bs4_features(backend)
+    with get_metrics().timer("news_parse_seconds", mode="full") as labels:
+        if scope and html:
+            fragment = ""
+            if HAS_SELECTOLAX and backend in ("auto", "selectolax"):
+                fragment = _selectolax_fragment(html, scope)
+            elif features == "lxml":
+                fragment = _lxml_fragment(html, scope)
+            if fragment:
+                labels["mode"] = "scoped"
+                return BeautifulSoup(fragment, features)
+        return BeautifulSoup(html or "", features)
+
+
+# —— 解析耗时对比 —— #
+def _recorded_pages(limit: int = 20) -> list:
+    import sqlite3
+    import zlib
+    from config import HTTP_CACHE_FILE
+    conn = sqlite3.connect(HTTP_CACHE_FILE)
+    try:
+        rows = conn.execute("SELECT url, body FROM http_cache ORDER BY fetched_at DESC LIMIT ?", (limit,))
+        return [(url, zlib.decompress(body).decode("utf-8")) for url, body in rows]
+    except sqlite3.Error:
+        return []
+    finally:
+        conn.close()
+
+
+def _benchmark(pages: list, repeat: int = 5):
+    import time
+    # 各页面对应的作用域（与数据源中的写法一致）；按 URL 或文件名匹配
+    scopes = {
+        r"36kr\.com.information": "div.information-flow-item",
+        r"36kr\.com.p.": "div.articleDetailContent, div.article-content, div.kr-article-content",
+        r"autohome\.com\.cn.news": "li[data-artidanchor]",
+        r"autohome\.com\.cn": "span.time, a.name, p.editor-paragraph",
+        r"ai-bot\.cn": "div.news-date, div.news-item",
+    }
+    variants = [("html.parser 整页", "html.parser", False)]
+    if HAS_LXML:
+        variants += [("lxml 整页", "lxml", False), ("lxml 预筛", "lxml", True)]
+    if HAS_SELECTOLAX:
+        variants.append(("selectolax 预筛", "selectolax", True))
+
+    for name, html in pages:
+        scope = next((s for k, s in scopes.items() if re.search(k, name)), None)
+        print(f"\n{name}  ({len(html) / 1024:.0f} KB, 作用域: {scope or '无'})")
+        base = None
+        for label, backend, scoped in variants:
+            best = float("inf")
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                parse(html, scope if scoped else None, backend=backend)
+                best = min(best, time.perf_counter() - t0)
+            base = base or best
+            print(f"  {label:<28} {best * 1000:8.1f} ms   x{base / best:5.1f}")
+
+
+if __name__ == "__main__":
+    import sys
+    if sys.argv[1:]:
+        pages = [(p, open(p, encoding="utf-8").read()) for p in sys.argv[1:]]
+    else:
+        pages = _recorded_pages()
+    if not pages:
+        print("没有可用的页面：请传入 HTML 文件，或先运行一次抓取以填充 HTTP 缓存")
+        sys.exit(1)
+    print(f"后端: lxml={'有' if HAS_LXML else '无'}, selectolax={'有' if HAS_SELECTOLAX else '无'}")
+    _benchmark(pages)
@@ -0,0 +1,165 @@
+# http_fetch.py
+"""
+HTTP 优先的页面获取层。
+
+先用连接池化的 requests 会话直接请求，带上本地缓存的 ETag / Last-Modified
+做条件请求：304 时直接返回缓存正文，几毫秒完成。只有按 config.FETCH_RULES
+指定走浏览器的 URL，或 HTTP 结果没有通过内容检查时，才退回 Playwright 渲染。
+"""
+import re
+import sqlite3
+import threading
+import time
+import random
+import zlib
+import requests
+from requests.adapters import HTTPAdapter
+from datetime import datetime
+from urllib.parse import urlsplit
+from config import HTTP_CACHE_FILE, FETCH_RULES, HTTP_TIMEOUT, USER_AGENTS
+from rate_limiter import polite_wait
+from metrics import get_metrics
+
+
+def log(msg):
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {msg}")
+
+
+class FetchResult:
+    def __init__(self, html: str, via: str, status: int = 0, unchanged: bool = False):
+        self.html = html
+        self.via = via              # "http" / "cache" / "browser"
+        self.status = status
+        self.unchanged = unchanged  # 服务端返回 304：与上次相同
+
+
+class ValidatorCache:
+    """url -> (ETag, Last-Modified, 正文)，用于条件请求"""
+
+    def __init__(self, path: str = HTTP_CACHE_FILE):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS http_cache (
+                url           TEXT PRIMARY KEY,
+                etag          TEXT NOT NULL DEFAULT '',
+                last_modified TEXT NOT NULL DEFAULT '',
+                body          BLOB NOT NULL,
+                fetched_at    REAL NOT NULL
+            )""")
+
+    def get(self, url: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, body FROM http_cache WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        return row[0], row[1], zlib.decompress(row[2]).decode("utf-8")
+
+    def put(self, url: str, etag: str, last_modified: str, body: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO http_cache VALUES (?, ?, ?, ?, ?)",
+                (url, etag or "", last_modified or "", zlib.compress(body.encode("utf-8")), time.time()))
+
+    def touch(self, url: str):
+        with self._lock:
+            self._conn.execute("UPDATE http_cache SET fetched_at = ? WHERE url = ?", (time.time(), url))
+
+
+_session = requests.Session()
+_session.headers.update({
+    "User-Agent": random.choice(USER_AGENTS),
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
+})
+_adapter = HTTPAdapter(pool_connections=8, pool_maxsize=8)
+_session.mount("https://", _adapter)
+_session.mount("http://", _adapter)
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def _get_cache() -> ValidatorCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ValidatorCache()
+        return _cache
+
+
+def fetch_mode(url: str) -> str:
+    """按 FETCH_RULES 决定 URL 的获取方式："auto"（HTTP 优先）或 "browser" """
+    for pattern, mode in FETCH_RULES:
+        if re.search(pattern, url):
+            return mode
+    return "browser"
+
+
+def _passes(html: str, expect) -> bool:
+    if not html:
+        return False
+    if expect is None:
+        return True
+    if callable(expect):
+        return bool(expect(html))
+    return expect in html
+
+
+def http_get(url: str) -> FetchResult:
+    """条件 GET；304 时返回缓存正文，失败返回空正文"""
+    cache = _get_cache()
+    cached = cache.get(url)
+    headers = {}
+    if cached:
+        etag, last_modified, _ = cached
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+    polite_wait(url)
+    try:
+        resp = _session.get(url, headers=headers, timeout=HTTP_TIMEOUT)
+    except Exception as e:
+        log(f"  × HTTP 请求失败: {url} - {e}")
+        return FetchResult("", "http")
+    if resp.status_code == 304 and cached:
+        cache.touch(url)
+        log(f"  → 页面未变化 (304): {url}")
+        return FetchResult(cached[2], "cache", 304, unchanged=True)
+    if resp.status_code != 200:
+        log(f"  × HTTP {resp.status_code}: {url}")
+        return FetchResult("", "http", resp.status_code)
+    if "charset" not in resp.headers.get("Content-Type", "").lower():
+        resp.encoding = resp.apparent_encoding
+    html = resp.text
+    if resp.headers.get("ETag") or resp.headers.get("Last-Modified"):
+        cache.put(url, resp.headers.get("ETag", ""), resp.headers.get("Last-Modified", ""), html)
+    return FetchResult(html, "http", 200)
+
+
+def fetch(url: str, render=None, expect=None) -> FetchResult:
+    """
+    获取页面：规则为 "auto" 时先走 HTTP，正文不含 expect（字符串标记或判断函数）
+    再调用 render(url) 用浏览器渲染；规则为 "browser" 时直接渲染。
+    """
+    metrics = get_metrics()
+    if render is None or fetch_mode(url) == "auto":
+        with metrics.timer("news_fetch_seconds", via="http") as labels:
+            res = http_get(url)
+            labels["via"] = res.via
+        metrics.inc("news_fetch_bytes_total", len(res.html), via=res.via)
+        if _passes(res.html, expect) or render is None:
+            return res
+        log(f"  ! HTTP 结果未通过内容检查，改用浏览器渲染: {url}")
+        metrics.inc("news_fetch_fallback_total", domain=urlsplit(url).hostname or "")
+    with metrics.timer("news_fetch_seconds", via="browser"):
+        html = render(url) or ""
+    metrics.inc("news_fetch_bytes_total", len(html), via="browser")
+    return FetchResult(html, "browser")
+
+
+def fetch_html(url: str, render=None, expect=None) -> str:
+    return fetch(url, render, expect).html
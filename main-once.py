@@ -1,18 +1,31 @@
-from data_manager import fetch_and_save_news
-from send_manager import send_news
 from datetime import datetime
+from config import QUICK_CHECK_ENABLED
 
 def main():
     print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ===== 脚本启动 =====")
     try:
-        fetch_success = fetch_and_save_news()
-        if not fetch_success:
-            print("获取新闻过程中出现错误，但将继续尝试发送已有新闻")
-        send_success = send_news()
-        if not send_success:
-            print("发送新闻过程中出现错误")
+        # 快速检查：列表页都没变、也没有待发送的条目时直接结束，不导入流水线（pandas / openai / Playwright）
+        check, sources = None, None
+        if QUICK_CHECK_ENABLED:
+            from data_manager import load_data_sources
+            from quick_check import QuickCheck, has_backlog
+            check = QuickCheck()
+            sources = check.changed(load_data_sources())
+            if not sources and not has_backlog():
+                print("===== 没有新内容，也没有待发送的新闻，本次跳过 =====")
+                return True
+
+        # 抓取 → 渲染 → 摘要 → 入库 → 推送 流式进行，上次未发送的也会一并推送
+        from pipeline import NewsPipeline
+        pipeline = NewsPipeline(sources=sources)
+        success = pipeline.run()
+        if check is not None:
+            # 只提交完全成功的源：列表或任一条目（渲染/摘要/入库）失败的源下次照常抓取重试
+            check.commit([name for name, res in pipeline.by_source.items() if not res["failed"]])
+        if not success:
+            print("运行过程中出现错误，详见上方日志")
         print("===== 脚本执行完成 =====")
-        return fetch_success and send_success
+        return success
     except Exception as e:
         print(f"脚本执行出错: {e}")
         return False
@@ -1,42 +1,26 @@
-from data_manager import fetch_and_save_news
-from send_manager import send_news
-import schedule
-import time as schedule_time
-from datetime import datetime, timedelta
-
-def log_next_run():
-    next_run = datetime.now().replace(microsecond=0, second=0, minute=0) + timedelta(hours=1)
-    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 下一次计划运行时间: {next_run.strftime('%Y-%m-%d %H:%M:%S')}")
+from pipeline import run_pipeline
+from scheduler import AdaptiveScheduler
+from datetime import datetime
 
 def main():
     print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ===== 脚本启动 =====")
     try:
-        fetch_success = fetch_and_save_news()
-        if not fetch_success:
-            print("获取新闻过程中出现错误，但将继续尝试发送已有新闻")
-        send_success = send_news()
-        if not send_success:
-            print("发送新闻过程中出现错误")
+        # 抓取 → 渲染 → 摘要 → 入库 → 推送 流式进行，上次未发送的也会一并推送
+        success = run_pipeline()
+        if not success:
+            print("运行过程中出现错误，详见上方日志")
         print("===== 脚本执行完成 =====")
-        return fetch_success and send_success
+        return success
     except Exception as e:
         print(f"脚本执行出错: {e}")
         return False
 
 if __name__ == "__main__":
+    scheduler = AdaptiveScheduler()
     try:
-        main()
-        schedule.every().hour.do(main)
-        log_next_run()
-        print("===== 已设置每小时自动运行 =====\n程序将保持运行状态，等待定时执行...")
-        while True:
-            schedule.run_pending()
-            schedule_time.sleep(60)
+        # 各数据源按自己的间隔运行：有新内容的源抓得更勤，长期没有更新的源逐渐放慢
+        scheduler.run_forever()
     except KeyboardInterrupt:
         print("程序被用户手动中断")
     except Exception as e:
         print(f"脚本执行出错: {e}")
-
-
-
-
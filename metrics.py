@@ -0,0 +1,240 @@
+# metrics.py
+"""
+进程内指标：计数器和耗时直方图。
+
+各环节（渲染、抓取、解析、LLM、存储、推送、限速等待）调用 inc / observe / timer 记录，
+带 source 作用域（source("kr36") 内记录的值同时计入该数据源的汇总）。
+每次流水线运行结束时：
+  - 写 Prometheus textfile（METRICS_PROM_FILE，供 node_exporter textfile collector 采集）
+  - 写本次运行的 JSON 报告（METRICS_REPORT_DIR/run_时间.json），含各数据源 / 各阶段的
+    条目数、字节数、LLM token 数和耗时
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from config import METRICS_ENABLED, METRICS_PROM_FILE, METRICS_REPORT_DIR, METRICS_REPORT_KEEP
+
+_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def log(msg):
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {msg}")
+
+
+class _Histogram:
+    def __init__(self):
+        self.counts = [0] * len(_BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.sum += value
+        self.count += 1
+        for i, b in enumerate(_BUCKETS):
+            if value <= b:
+                self.counts[i] += 1
+                break
+
+
+def _key(name: str, labels: dict):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _fmt_labels(labels, extra=()) -> str:
+    items = list(labels) + list(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+                          for k, v in items) + "}"
+
+
+class Metrics:
+    def __init__(self, enabled: bool = METRICS_ENABLED):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._counters = {}
+        self._hists = {}
+        self._by_source = {}
+        self._run_start = None
+        self._run_base = None
+
+    # —— 数据源作用域 —— #
+    @contextmanager
+    def source(self, name: str):
+        """块内记录的指标同时计入数据源 name 的汇总（线程内有效）"""
+        prev = getattr(self._local, "source", None)
+        self._local.source = name
+        try:
+            yield
+        finally:
+            self._local.source = prev
+
+    def bind(self, fn):
+        """把当前数据源作用域带到其他线程（提交给线程池的函数用）"""
+        name = getattr(self._local, "source", None)
+        if name is None:
+            return fn
+
+        def wrapper(*args, **kwargs):
+            with self.source(name):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    def _add_source(self, name: str, value: float):
+        src = getattr(self._local, "source", None)
+        if src is not None:
+            agg = self._by_source.setdefault(src, {})
+            agg[name] = agg.get(name, 0) + value
+
+    # —— 记录 —— #
+    def inc(self, name: str, value: float = 1, **labels):
+        if not self.enabled:
+            return
+        with self._lock:
+            k = _key(name, labels)
+            self._counters[k] = self._counters.get(k, 0) + value
+            self._add_source(name, value)
+
+    def observe(self, name: str, seconds: float, **labels):
+        if not self.enabled:
+            return
+        with self._lock:
+            k = _key(name, labels)
+            h = self._hists.get(k)
+            if h is None:
+                h = self._hists[k] = _Histogram()
+            h.observe(seconds)
+            self._add_source(name, seconds)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """计时；块内可修改 labels（如按结果改 result 标签）"""
+        t0 = time.perf_counter()
+        try:
+            yield labels
+        finally:
+            self.observe(name, time.perf_counter() - t0, **labels)
+
+    # —— 跨进程合并（隔离子进程把自己的指标带回主进程） —— #
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"counters": dict(self._counters),
+                    "hists": {k: (list(h.counts), h.sum, h.count) for k, h in self._hists.items()},
+                    "by_source": {s: dict(agg) for s, agg in self._by_source.items()}}
+
+    def merge(self, snap: dict):
+        if not self.enabled or not snap:
+            return
+        with self._lock:
+            for k, v in snap.get("counters", {}).items():
+                self._counters[k] = self._counters.get(k, 0) + v
+            for k, (counts, total, n) in snap.get("hists", {}).items():
+                h = self._hists.get(k)
+                if h is None:
+                    h = self._hists[k] = _Histogram()
+                h.counts = [a + b for a, b in zip(h.counts, counts)]
+                h.sum += total
+                h.count += n
+            for src, agg in snap.get("by_source", {}).items():
+                mine = self._by_source.setdefault(src, {})
+                for name, v in agg.items():
+                    mine[name] = mine.get(name, 0) + v
+
+    # —— 每次运行 —— #
+    def _totals(self) -> dict:
+        out = {}
+        for (name, labels), v in self._counters.items():
+            out[(name, labels)] = v
+        for (name, labels), h in self._hists.items():
+            out[(name + "_count", labels)] = h.count
+            out[(name + "_sum", labels)] = h.sum
+        return out
+
+    def begin_run(self):
+        with self._lock:
+            self._run_start = time.time()
+            self._run_base = self._totals()
+            self._by_source = {}
+
+    def run_report(self, extra: dict = None) -> dict:
+        """本次运行（begin_run 以来）的指标增量"""
+        with self._lock:
+            base = self._run_base or {}
+            delta = {}
+            for (name, labels), v in self._totals().items():
+                d = v - base.get((name, labels), 0)
+                if d:
+                    label_str = ",".join(f"{k}={val}" for k, val in labels)
+                    delta.setdefault(name, {})[label_str or "total"] = round(d, 4)
+            by_source = {s: {k: round(v, 4) for k, v in agg.items()} for s, agg in self._by_source.items()}
+            started = self._run_start or time.time()
+        report = {
+            "started_at": datetime.fromtimestamp(started).strftime("%Y-%m-%d %H:%M:%S"),
+            "wall_seconds": round(time.time() - started, 3),
+            "sources": by_source,
+            "metrics": delta,
+        }
+        report.update(extra or {})
+        return report
+
+    # —— 输出 —— #
+    def prometheus_text(self) -> str:
+        lines = []
+        with self._lock:
+            typed = set()
+            for (name, labels), v in sorted(self._counters.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {name} counter")
+                    typed.add(name)
+                lines.append(f"{name}{_fmt_labels(labels)} {v}")
+            for (name, labels), h in sorted(self._hists.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {name} histogram")
+                    typed.add(name)
+                cum = 0
+                for b, c in zip(_BUCKETS, h.counts):
+                    cum += c
+                    lines.append(f"{name}_bucket{_fmt_labels(labels, [('le', b)])} {cum}")
+                lines.append(f"{name}_bucket{_fmt_labels(labels, [('le', '+Inf')])} {h.count}")
+                lines.append(f"{name}_sum{_fmt_labels(labels)} {h.sum}")
+                lines.append(f"{name}_count{_fmt_labels(labels)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str = METRICS_PROM_FILE):
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp, path)
+
+    def write_report(self, extra: dict = None, directory: str = METRICS_REPORT_DIR) -> str:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"run_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.run_report(extra), f, ensure_ascii=False, indent=1)
+        # 只保留最近 METRICS_REPORT_KEEP 份
+        reports = sorted(n for n in os.listdir(directory) if n.startswith("run_") and n.endswith(".json"))
+        for name in reports[:max(0, len(reports) - METRICS_REPORT_KEEP)]:
+            os.remove(os.path.join(directory, name))
+        return path
+
+    def export_run(self, extra: dict = None):
+        """运行结束时调用：写 textfile 和 JSON 报告，失败只记日志"""
+        if not self.enabled:
+            return
+        try:
+            self.write_prometheus()
+            path = self.write_report(extra)
+            log(f"  运行报告: {path}")
+        except OSError as e:
+            log(f"  × 指标输出失败: {e}")
+
+
+_metrics = Metrics()
+
+
+def get_metrics() -> Metrics:
+    return _metrics
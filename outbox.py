@@ -0,0 +1,107 @@
+# outbox.py
+"""
+推送发件箱：记录每次 webhook 推送的尝试，保证中断后不会重复推送。
+
+流程：claim（先持久化“发送中”）→ 推送 → finish（记录成功/失败）。
+进程在推送途中崩溃时，发件箱里会留下“发送中”的记录；下次启动 recover()
+会把这些条目标记为“发送状态未知”而不是重发（宁可漏发，不可重复）。
+发件箱只追加/按行更新，不重写新闻数据。
+"""
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from config import DB_FILE
+
+SENDING = "发送中"
+SENT = "已发送"
+FAILED = "发送失败"
+UNKNOWN = "发送状态未知"
+
+
+def _now() -> str:
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def log(msg):
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {msg}")
+
+
+class Outbox:
+    def __init__(self, path: str = DB_FILE):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                id         INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind       TEXT NOT NULL,
+                urls       TEXT NOT NULL,
+                status     TEXT NOT NULL,
+                error      TEXT NOT NULL DEFAULT '',
+                applied    INTEGER NOT NULL DEFAULT 0,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            )""")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_pending ON outbox(applied, status)")
+
+    def claim(self, urls: list, kind: str) -> int:
+        """推送前调用：持久化一条“发送中”记录，返回其 id"""
+        now = _now()
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT INTO outbox (kind, urls, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (kind, json.dumps(urls, ensure_ascii=False), SENDING, now, now))
+            return cur.lastrowid
+
+    def finish(self, entry_id: int, ok, error: str = ""):
+        """记录推送结果；ok 为 None 表示请求可能已送达但没拿到响应"""
+        status = SENT if ok else (UNKNOWN if ok is None else FAILED)
+        with self._lock:
+            self._conn.execute(
+                "UPDATE outbox SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+                (status, error, _now(), entry_id))
+
+    def mark_applied(self, entry_id: int):
+        """新闻表的发送状态已同步"""
+        with self._lock:
+            self._conn.execute("UPDATE outbox SET applied = 1 WHERE id = ?", (entry_id,))
+
+    def unapplied(self) -> int:
+        """尚未同步到新闻表的记录数（即下次 recover() 要处理的）"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM outbox WHERE applied = 0").fetchone()[0]
+
+    def recover(self, store) -> int:
+        """
+        启动时调用：把上次中断时仍“发送中”的记录标记为未知（不重发），
+        并把已有结果但未同步到新闻表的记录补写过去。返回处理的记录数。
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, urls, status FROM outbox WHERE applied = 0 ORDER BY id").fetchall()
+        for entry_id, urls, status in rows:
+            urls = json.loads(urls)
+            if status == SENDING:
+                log(f"  ! 发件箱记录 #{entry_id} 上次推送中断，{len(urls)} 条标记为“{UNKNOWN}”，不自动重发")
+                status = UNKNOWN
+                with self._lock:
+                    self._conn.execute("UPDATE outbox SET status = ?, updated_at = ? WHERE id = ?",
+                                       (UNKNOWN, _now(), entry_id))
+            with store.transaction():
+                for url in urls:
+                    store.update(url, send_status=status)
+            self.mark_applied(entry_id)
+        return len(rows)
+
+
+_outbox = None
+_outbox_lock = threading.Lock()
+
+
+def get_outbox() -> Outbox:
+    global _outbox
+    with _outbox_lock:
+        if _outbox is None:
+            _outbox = Outbox()
+        return _outbox
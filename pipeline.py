@@ -0,0 +1,335 @@
+# pipeline.py
+"""
+流式分段流水线：列表 → 详情渲染 → 摘要 → 入库 → 推送。
+
+各阶段之间用有界队列连接，每个阶段有独立的线程数（见 config.PIPELINE_WORKERS），
+条目处理完一个就往下游送一个：第一条新闻不必等最后一条摘要完成就能推送，
+队列满时上游自动阻塞，内存占用有上限。
+"""
+import queue
+import threading
+import time
+from datetime import datetime
+from config import (PIPELINE_WORKERS, PIPELINE_QUEUE_SIZE, EXPORT_EXCEL, SUMMARY_CACHE_ENABLED,
+                    SEND_MODE, DIGEST_MAX_ITEMS, DIGEST_LINGER, SOURCE_ISOLATION, DEDUPE_ENABLED)
+from data_manager import log, load_data_sources, iter_source
+from storage import get_store, export_excel
+from rate_limiter import get_limiter
+from summary_cache import get_cache
+from ai_api import summarize_text
+from send_manager import deliver_row, deliver_batch, pack_digests, recover_outbox
+from metrics import get_metrics
+from supervisor import iter_isolated
+from dedupe import get_dedupe
+
+_DONE = object()
+
+
+class _Stage:
+    """一个阶段：从 inbox 取条目，fn(条目) 返回下游条目列表，写入下一阶段的 inbox"""
+
+    def __init__(self, name, fn, workers, maxsize=PIPELINE_QUEUE_SIZE, flush=None, linger=None, on_error=None):
+        self.name = name
+        self.fn = fn
+        self.on_error = on_error    # on_error(条目)：条目处理失败时调用
+        self.flush = flush      # 空闲 linger 秒或输入结束时调用（用于攒批的阶段）
+        self.linger = linger
+        self.workers = max(1, workers)
+        self.inbox = queue.Queue(maxsize=maxsize)
+        self.next = None
+        self.errors = 0
+        self.items = 0
+        self.busy = 0.0         # 处理耗时（不含等待上下游队列的时间）
+        self._alive = self.workers
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def start(self):
+        for i in range(self.workers):
+            t = threading.Thread(target=self._work, name=f"{self.name}-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def _call(self, fn, *args):
+        t0 = time.perf_counter()
+        blocked = 0.0
+        try:
+            for out in fn(*args) or ():
+                if self.next is not None:
+                    tb = time.perf_counter()
+                    self.next.inbox.put(out)
+                    blocked += time.perf_counter() - tb
+        except Exception as e:
+            log(f"  × [{self.name}] 处理失败: {e}")
+            with self._lock:
+                self.errors += 1
+            if args and self.on_error is not None:
+                self.on_error(args[0])
+        busy = time.perf_counter() - t0 - blocked
+        metrics = get_metrics()
+        metrics.observe("news_stage_seconds", busy, stage=self.name)
+        with self._lock:
+            self.busy += busy
+            if args:
+                self.items += 1
+        if args:
+            metrics.inc("news_stage_items_total", stage=self.name)
+
+    def _work(self):
+        while True:
+            try:
+                item = self.inbox.get(timeout=self.linger if self.flush else None)
+            except queue.Empty:
+                self._call(self.flush)
+                continue
+            if item is _DONE:
+                if self.flush:
+                    self._call(self.flush)
+                break
+            self._call(self.fn, item)
+        with self._lock:
+            self._alive -= 1
+            last = self._alive == 0
+        # 本阶段最后一个线程退出时，通知下游结束
+        if last and self.next is not None:
+            for _ in range(self.next.workers):
+                self.next.inbox.put(_DONE)
+
+    def close_input(self):
+        for _ in range(self.workers):
+            self.inbox.put(_DONE)
+
+    def join(self):
+        for t in self._threads:
+            t.join()
+
+
+class NewsPipeline:
+    def __init__(self, deliver: bool = True, sources=None, isolate: bool = SOURCE_ISOLATION, seen: set = None):
+        self.deliver = deliver
+        self.sources = sources
+        self.isolate = isolate
+        self.store = get_store()
+        self._index = seen      # 常驻进程传入的 URL 索引：直接沿用并就地更新，不再每次查库
+        self.dedupe = get_dedupe() if DEDUPE_ENABLED else None
+        self.seen = set()
+        self._seen_lock = threading.Lock()
+        self.stats = {"listed": 0, "new": 0, "duplicate": 0, "saved": 0, "sent": 0, "send_failed": 0,
+                      "source_failed": 0}
+        self.by_source = {}     # 数据源模块名 → {"new": 新条目数, "failed": 列表或任一条目处理失败}（调度器据此调整间隔）
+        self._stats_lock = threading.Lock()
+        self._batch = []
+        self._batch_lock = threading.Lock()
+
+    def _count(self, key, n=1):
+        with self._stats_lock:
+            self.stats[key] += n
+
+    # —— 各阶段 —— #
+    @staticmethod
+    def _src_name(src) -> str:
+        return src.__name__.rsplit(".", 1)[-1]
+
+    def _list(self, src):
+        """运行一个数据源，逐条送出未见过的新条目"""
+        with get_metrics().source(self._src_name(src)):
+            yield from self._list_source(src)
+
+    def _list_source(self, src):
+        result = {"new": 0, "failed": False}
+        with self._stats_lock:
+            self.by_source[self._src_name(src)] = result
+        try:
+            # 源内部先按已知 URL 过滤，已入库的文章不会被渲染或摘要
+            if self.isolate:
+                # 子进程抓取列表和详情（正文放在 "_full"），超时/超内存时被杀，已送回的照常处理
+                with self._seen_lock:
+                    seen = set(self.seen)
+                items = iter_isolated(src, seen)
+            else:
+                items = iter_source(src, self.seen)
+            for item in items:
+                self._count("listed")
+                with self._seen_lock:
+                    if item["url"] in self.seen:
+                        continue
+                    self.seen.add(item["url"])
+                self._count("new")
+                with self._stats_lock:
+                    result["new"] += 1
+                item["_src"] = self._src_name(src)
+                # 与已成功处理的新闻同题：不再摘要和推送（隔离模式下子进程已跳过详情抓取）
+                if self.dedupe is not None:
+                    group = self.dedupe.match(item["url"], item["title"])
+                    if group is not None:
+                        item["_dup_of"] = group
+                        item.pop("_full", None)
+                yield src, item
+        except Exception as e:
+            # 单个源失败不影响其他源，已送出的条目照常处理
+            log(f"× 数据源 {src.__name__} 抓取失败: {e}")
+            self._count("source_failed")
+            result["failed"] = True
+
+    def _item_failed(self, job):
+        """条目在渲染/摘要/入库阶段出错：记为所属数据源失败（main-once 不提交该源的快速检查指纹）"""
+        for part in job if isinstance(job, tuple) else (job,):
+            if isinstance(part, dict) and "_src" in part:
+                with self._stats_lock:
+                    self.by_source.setdefault(part["_src"], {"new": 0, "failed": False})["failed"] = True
+                return
+
+    def _render(self, job):
+        """需要渲染的条目抓取正文"""
+        src, item = job
+        full = ""
+        if "_dup_of" in item:
+            pass
+        elif "_full" in item:
+            full = item.pop("_full")
+        elif item.get("need_render") and hasattr(src, "fetch_detail"):
+            with get_metrics().source(self._src_name(src)):
+                full = src.fetch_detail(item)
+        return [(src, item, full)]
+
+    def _summarize(self, job):
+        src, item, full = job
+        if "_dup_of" in item:
+            summary = ""
+        elif item.get("need_render"):
+            with get_metrics().source(self._src_name(src)):
+                summary = summarize_text(full or item.get("abstract", ""))
+        else:
+            summary = item.get("abstract", "")
+        return [(item, summary)]
+
+    def _persist(self, job):
+        item, summary = job
+        dup_of = item.get("_dup_of", "")
+        if not dup_of and self.dedupe is not None:
+            # 入库单线程：同一次运行里并行处理的同题条目，以先入库成功的为准，后到的不再推送
+            dup_of = self.dedupe.match(item["url"], item["title"]) or ""
+        if dup_of:
+            ai_status = "重复"
+        else:
+            ai_status = "AI处理完成" if summary and summary.strip() else "AI处理失败"
+        record = {
+            "title":       item["title"],
+            "source":      item["source"],
+            "date_str":    item["date_str"],
+            "url":         item["url"],
+            "author":      item["author"],
+            "content":     summary,
+            "need_render": str(item.get("need_render", False)),
+            "ai_status":   ai_status,
+            "send_status": "重复" if dup_of else "",    # 空 = 待发送
+            "dup_of":      dup_of,
+            "updated_at":  datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        }
+        if not self.store.insert(record):
+            log(f"  ! 跳过重复URL: {item['url']}")
+            return []
+        self._count("saved")
+        if dup_of:
+            self._count("duplicate")
+            get_metrics().inc("news_duplicates_total")
+            log(f"  ≈ 已保存（近似重复 → {dup_of}）: {item['title']}")
+        else:
+            log(f"  ✓ 已保存: {item['title']}")
+        # 只有成功摘要的原文才登记为组首条；失败的原文不挡住后来的同题条目
+        if self.dedupe is not None and (dup_of or ai_status == "AI处理完成"):
+            self.dedupe.add(item["url"], item["title"], dup_of or None)
+        if self.deliver and ai_status == "AI处理完成":
+            return [record]
+        return []
+
+    def _deliver(self, row):
+        if SEND_MODE != "digest":
+            ok = deliver_row(self.store, row)
+            self._count("sent" if ok else "send_failed")
+            return []
+        # 合集模式：攒够 DIGEST_MAX_ITEMS 条或空闲 DIGEST_LINGER 秒后打包推送
+        with self._batch_lock:
+            self._batch.append(row)
+            full = len(self._batch) >= DIGEST_MAX_ITEMS
+        if full:
+            self._flush_deliver()
+        return []
+
+    def _flush_deliver(self):
+        with self._batch_lock:
+            rows, self._batch = self._batch, []
+        for batch in pack_digests(rows):
+            ok = deliver_batch(self.store, batch)
+            self._count("sent" if ok else "send_failed", len(batch))
+        return []
+
+    # —— 运行 —— #
+    def run(self) -> bool:
+        log("===== 流水线启动 =====")
+        get_metrics().begin_run()
+        if self._index is not None:
+            self.seen = self._index
+            log(f"沿用常驻 URL 索引（{len(self.seen)} 条）")
+        else:
+            self.seen = self.store.seen_urls()
+            log(f"已加载 {len(self.seen)} 条历史")
+        # 上次遗留的待发送条目（必须在新条目入库前取出，避免重复推送）
+        backlog = []
+        if self.deliver:
+            recover_outbox(self.store)
+            backlog = self.store.pending()
+
+        sources = list(self.sources if self.sources is not None else load_data_sources())
+        w = PIPELINE_WORKERS
+        stages = [
+            _Stage("list", self._list, min(w.get("list", 1), max(1, len(sources))), maxsize=0),
+            _Stage("render", self._render, w.get("render", 1), on_error=self._item_failed),
+            _Stage("summarize", self._summarize, w.get("summarize", 1), on_error=self._item_failed),
+            _Stage("persist", self._persist, 1, on_error=self._item_failed),
+        ]
+        if self.deliver:
+            digest = SEND_MODE == "digest"
+            stages.append(_Stage("deliver", self._deliver, w.get("deliver", 1), maxsize=0,
+                                 flush=self._flush_deliver if digest else None, linger=DIGEST_LINGER))
+        for up, down in zip(stages, stages[1:]):
+            up.next = down
+        for st in stages:
+            st.start()
+
+        if backlog:
+            log(f"找到 {len(backlog)} 条上次未发送的新闻，加入推送队列")
+            for row in backlog:
+                stages[-1].inbox.put(row)
+        for src in sources:
+            stages[0].inbox.put(src)
+        stages[0].close_input()
+
+        for st in stages:
+            st.join()
+
+        if EXPORT_EXCEL:
+            export_excel()
+        get_limiter().log_report()
+        if SUMMARY_CACHE_ENABLED:
+            cs = get_cache().stats()
+            log(f"  摘要缓存: 命中 {cs['hits']} 次，未命中 {cs['misses']} 次，共 {cs['entries']} 条")
+        errors = sum(st.errors for st in stages)
+        get_metrics().export_run(extra={
+            "stats": dict(self.stats),
+            "stages": {st.name: {"items": st.items, "errors": st.errors, "busy_seconds": round(st.busy, 3)}
+                       for st in stages},
+        })
+        s = self.stats
+        log(f"===== 流水线完成: 列表 {s['listed']} 条，新条目 {s['new']} 条（近似重复 {s['duplicate']} 条），"
+            f"入库 {s['saved']} 条，"
+            f"推送成功 {s['sent']} 条，失败 {s['send_failed']} 条 =====")
+        return errors == 0 and s["send_failed"] == 0 and s["source_failed"] == 0
+
+
+def run_pipeline(deliver: bool = True, sources=None) -> bool:
+    try:
+        return NewsPipeline(deliver=deliver, sources=sources).run()
+    except Exception as e:
+        log(f"× 流水线运行出错: {e}")
+        return False
@@ -0,0 +1,176 @@
+# provider_health.py
+"""
+LLM 服务商健康度跟踪与熔断。
+
+每个模型记录最近的调用结果（成功/失败、耗时），据此维护熔断器：
+  closed    正常调用
+  open      错误率过高或连续失败，冷却期内直接跳过
+  half_open 冷却结束，放一个请求试探，成功则恢复，失败则冷却时间翻倍
+            （每次 order() 只放行一个试探；试探超过 _PROBE_TTL 秒没有结果，如被对冲取消，视为作废）
+正常模型按最近延迟（EWMA）从快到慢排序。状态写入 JSON 文件，跨进程/跨次运行保留。
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from config import PROVIDER_HEALTH_FILE, LLM_BREAKER, LLM_ADAPTIVE_ORDER, LLM_TIMEOUT
+
+_EWMA_ALPHA = 0.3
+_PROBE_TTL = LLM_TIMEOUT + 30
+
+
+def log(msg):
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {msg}")
+
+
+class _Health:
+    def __init__(self, window: int):
+        self.samples = deque(maxlen=window)    # (ok, latency)
+        self.state = "closed"
+        self.opened_at = 0.0
+        self.cooldown = 0.0
+        self.consecutive_failures = 0
+        self.ewma = None
+        self.probing = 0.0      # 试探请求发出的时间，0 = 没有在途试探
+
+    def to_dict(self):
+        return {"samples": list(self.samples), "state": self.state, "opened_at": self.opened_at,
+                "cooldown": self.cooldown, "consecutive_failures": self.consecutive_failures,
+                "ewma": self.ewma}
+
+    def load(self, d: dict):
+        self.samples.extend(tuple(s) for s in d.get("samples", []))
+        self.state = d.get("state", "closed")
+        self.opened_at = d.get("opened_at", 0.0)
+        self.cooldown = d.get("cooldown", 0.0)
+        self.consecutive_failures = d.get("consecutive_failures", 0)
+        self.ewma = d.get("ewma")
+
+    @property
+    def error_rate(self) -> float:
+        if not self.samples:
+            return 0.0
+        return sum(1 for ok, _ in self.samples if not ok) / len(self.samples)
+
+
+class ProviderHealth:
+    def __init__(self, path: str = PROVIDER_HEALTH_FILE, cfg: dict = LLM_BREAKER):
+        self.path = path
+        self.cfg = cfg
+        self._lock = threading.Lock()
+        self._h = {}
+        self._load()
+
+    def _get(self, name: str) -> _Health:
+        h = self._h.get(name)
+        if h is None:
+            h = self._h[name] = _Health(self.cfg["window"])
+        return h
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            for name, d in data.items():
+                self._get(name).load(d)
+        except Exception as e:
+            log(f"  ! 读取模型健康状态失败，已忽略: {e}")
+
+    def _save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({n: h.to_dict() for n, h in self._h.items()}, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    # —— 状态 —— #
+    def _state(self, h: _Health, now: float) -> str:
+        if h.state == "open" and now - h.opened_at >= h.cooldown:
+            return "half_open"
+        return h.state
+
+    def order(self, providers: list, key: str = "model") -> list:
+        """
+        返回本次应尝试的服务商顺序：冷却结束待试探的优先，其次正常的（按延迟从快到慢），
+        熔断中的跳过；全部熔断时按原顺序兜底。
+        """
+        now = time.time()
+        with self._lock:
+            probe, closed = [], []
+            for idx, p in enumerate(providers):
+                h = self._get(p[key])
+                st = self._state(h, now)
+                if st == "half_open":
+                    # 一次只放行一个试探，其余冷却结束的留给下一次调用
+                    if not probe and now - h.probing > _PROBE_TTL:
+                        h.probing = now
+                        probe.append(p)
+                elif st == "closed":
+                    lat = h.ewma if (LLM_ADAPTIVE_ORDER and h.ewma is not None) else float("inf")
+                    closed.append((lat, idx, p))
+            closed.sort(key=lambda t: (t[0], t[1]))
+            ordered = probe + [p for _, _, p in closed]
+        if not ordered:
+            log("  ! 所有模型都处于熔断状态，按默认顺序尝试")
+            return list(providers)
+        return ordered
+
+    def record(self, name: str, ok: bool, latency: float):
+        cfg = self.cfg
+        now = time.time()
+        with self._lock:
+            h = self._get(name)
+            was = self._state(h, now)
+            h.probing = 0.0
+            h.samples.append((ok, round(latency, 3)))
+            if ok:
+                h.ewma = latency if h.ewma is None else _EWMA_ALPHA * latency + (1 - _EWMA_ALPHA) * h.ewma
+                h.consecutive_failures = 0
+                if h.state != "closed":
+                    log(f"  ✓ 模型 {name} 恢复，关闭熔断")
+                    h.state, h.cooldown = "closed", 0.0
+                    h.samples.clear()
+                    h.samples.append((ok, round(latency, 3)))
+            else:
+                h.consecutive_failures += 1
+                tripped = (h.consecutive_failures >= cfg["consecutive_failures"]
+                           or (len(h.samples) >= cfg["min_samples"] and h.error_rate >= cfg["error_rate"]))
+                if was == "half_open" or (h.state == "closed" and tripped):
+                    h.cooldown = (min(h.cooldown * 2, cfg["max_cooldown"]) if was == "half_open"
+                                  else cfg["cooldown"])
+                    h.state, h.opened_at = "open", now
+                    log(f"  ! 模型 {name} 熔断 {h.cooldown:.0f}s（错误率 {h.error_rate:.0%}）")
+            try:
+                self._save()
+            except Exception as e:
+                log(f"  ! 保存模型健康状态失败: {e}")
+
+    def latency_percentile(self, name: str, q: float):
+        """最近成功调用耗时的 q 分位（0~1），无数据时返回 None"""
+        with self._lock:
+            lats = sorted(lat for ok, lat in self._get(name).samples if ok)
+        if not lats:
+            return None
+        return lats[min(len(lats) - 1, int(q * len(lats)))]
+
+    def snapshot(self) -> dict:
+        now = time.time()
+        with self._lock:
+            return {n: {"state": self._state(h, now), "error_rate": round(h.error_rate, 3),
+                        "ewma": h.ewma and round(h.ewma, 3)}
+                    for n, h in self._h.items()}
+
+
+_health = None
+_health_lock = threading.Lock()
+
+
+def get_health() -> ProviderHealth:
+    global _health
+    with _health_lock:
+        if _health is None:
+            _health = ProviderHealth()
+        return _health
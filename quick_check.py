@@ -0,0 +1,96 @@
+# quick_check.py
+"""
+“有没有新内容”快速检查（main-once.py 在导入流水线之前调用）。
+
+数据源用 QUICK_CHECK = {"urls": [...], "pattern": 正则} 声明列表页和文章链接的特征。
+对这些列表页做一次 HTTP 条件请求，取 pattern 在页面中的全部匹配（文章链接 / ID）作为指纹：
+304 或指纹与上次成功运行时记下的相同 → 该源没有变化。
+没有声明、请求失败、或一个匹配都没有（页面结构变了 / 内容要靠浏览器渲染）的源一律视为有变化。
+指纹只在该源成功运行后才更新（commit），失败的源下次仍会被重新抓取。
+
+只依赖 requests 和 sqlite；pandas / openai / Playwright 都不会被导入。
+"""
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urlsplit
+from config import QUICK_CHECK_FILE
+from http_fetch import http_get
+
+
+def log(msg):
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {msg}")
+
+
+def fingerprint(html: str, pattern: str):
+    """页面中 pattern 全部匹配的摘要；没有匹配返回 None"""
+    found = sorted(set(re.findall(pattern, html or "")))
+    if not found:
+        return None
+    return hashlib.sha1("\n".join(map(str, found)).encode("utf-8")).hexdigest()
+
+
+class QuickCheck:
+    def __init__(self, path: str = QUICK_CHECK_FILE):
+        self.path = path
+        self._saved = {}
+        self._pending = {}      # 本次算出、等待 commit 的指纹
+        if os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self._saved = json.load(f)
+            except Exception as e:
+                log(f"  ! 读取快速检查指纹失败，已忽略: {e}")
+
+    def _check_source(self, name: str, spec: dict) -> bool:
+        prints = {}
+        for url in spec["urls"]:
+            res = http_get(url)
+            fp = fingerprint(res.html, spec["pattern"])
+            if fp is None:
+                return True
+            prints[url] = fp
+        self._pending[name] = prints
+        return prints != self._saved.get(name)
+
+    def changed(self, sources) -> list:
+        """返回可能有新内容的数据源；不同域名的列表页并发请求（同域名仍按限速依次请求）"""
+        sources = list(sources)
+        specs = {src.__name__.rsplit(".", 1)[-1]: getattr(src, "QUICK_CHECK", None) for src in sources}
+        by_domain = {}
+        for name, spec in specs.items():
+            if spec:
+                by_domain.setdefault(urlsplit(spec["urls"][0]).hostname, []).append(name)
+
+        def check_domain(names):
+            return {n: self._check_source(n, specs[n]) for n in names}
+
+        result = {name: True for name, spec in specs.items() if not spec}
+        if by_domain:
+            with ThreadPoolExecutor(max_workers=len(by_domain)) as ex:
+                for part in ex.map(check_domain, by_domain.values()):
+                    result.update(part)
+        for name, changed in result.items():
+            if not changed:
+                log(f"  → {name} 列表页没有变化")
+        return [src for src in sources if result[src.__name__.rsplit(".", 1)[-1]]]
+
+    def commit(self, names):
+        """这些源已成功运行：记下本次指纹"""
+        for name in names:
+            if name in self._pending:
+                self._saved[name] = self._pending.pop(name)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._saved, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.path)
+
+
+def has_backlog() -> bool:
+    """存储里有待发送的条目，或发件箱里有发送中断的记录"""
+    from storage import get_store
+    from outbox import get_outbox
+    return bool(get_store().pending()) or get_outbox().unapplied() > 0
@@ -0,0 +1,101 @@
+# rate_limiter.py
+"""
+按域名限速的礼貌调度器。
+
+每个域名一个令牌桶（GCRA 实现，带随机抖动），参数见 config.DOMAIN_RATE_LIMITS。
+不同域名的请求互不阻塞；同一域名的请求间隔不低于配置值。
+每个域名累计的等待时间可通过 report() 查看。
+"""
+import random
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlsplit
+from config import DOMAIN_RATE_LIMITS
+from metrics import get_metrics
+
+
+def log(msg):
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {msg}")
+
+
+def domain_of(url: str) -> str:
+    return urlsplit(url).hostname or url
+
+
+class _Bucket:
+    def __init__(self, interval: float, jitter: float, burst: int):
+        self.interval = max(0.0, interval)
+        self.jitter = max(0.0, jitter)
+        self.burst = max(1, burst)
+        self.tat = 0.0          # 理论到达时间
+        self.waited = 0.0
+        self.requests = 0
+
+
+class DomainRateLimiter:
+    def __init__(self, limits: dict = DOMAIN_RATE_LIMITS, clock=time.monotonic):
+        self.limits = limits
+        self.clock = clock      # 单调时钟（测试时注入）
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, domain: str) -> _Bucket:
+        b = self._buckets.get(domain)
+        if b is None:
+            cfg = self.limits.get(domain) or self.limits.get("*", {})
+            b = _Bucket(cfg.get("interval", 0), cfg.get("jitter", 0), cfg.get("burst", 1))
+            self._buckets[domain] = b
+        return b
+
+    def reserve(self, url: str) -> float:
+        """为一次请求预约时间片，返回需要等待的秒数（不睡眠）"""
+        domain = domain_of(url)
+        with self._lock:
+            b = self._bucket(domain)
+            now = self.clock()
+            allowed_at = b.tat - (b.burst - 1) * b.interval
+            delay = max(0.0, allowed_at - now)
+            b.tat = max(b.tat, now) + b.interval + random.uniform(0, b.jitter)
+            b.waited += delay
+            b.requests += 1
+            return delay
+
+    def wait(self, url: str) -> float:
+        """阻塞到该域名允许下一次请求，返回实际等待秒数"""
+        delay = self.reserve(url)
+        if delay > 0:
+            log(f"    等待 {delay:.1f}s（{domain_of(url)} 限速）")
+            get_metrics().inc("news_politeness_wait_seconds_total", delay, domain=domain_of(url))
+            time.sleep(delay)
+        return delay
+
+    def record_wait(self, url: str, seconds: float):
+        """记录在别处（如异步推送器）发生的限速等待"""
+        with self._lock:
+            b = self._bucket(domain_of(url))
+            b.waited += seconds
+            b.requests += 1
+        get_metrics().inc("news_politeness_wait_seconds_total", seconds, domain=domain_of(url))
+
+    def report(self) -> dict:
+        """{domain: {"requests": n, "waited": 秒}}"""
+        with self._lock:
+            return {d: {"requests": b.requests, "waited": round(b.waited, 2)}
+                    for d, b in self._buckets.items()}
+
+    def log_report(self):
+        for domain, st in sorted(self.report().items()):
+            log(f"  限速统计 {domain}: {st['requests']} 次请求，共等待 {st['waited']:.1f}s")
+
+
+_limiter = DomainRateLimiter()
+
+
+def get_limiter() -> DomainRateLimiter:
+    return _limiter
+
+
+def polite_wait(url: str) -> float:
+    """按域名限速等待（所有对外请求前调用）"""
+    return _limiter.wait(url)
@@ -0,0 +1,112 @@
+# renderer.py
+"""
+按渲染配置（config.RENDER_PROFILES）用浏览器池渲染页面。
+
+每个配置声明：屏蔽的资源类型和广告/埋点域名、等待出现的目标选择器
+（代替 networkidle 和固定 sleep）、最多滚动几次。同一配置共享一个
+BrowserContext 和路由规则，不同配置互不影响。
+"""
+import threading
+from datetime import datetime
+from config import RENDER_PROFILES
+from browser_pool import get_pool
+from rate_limiter import polite_wait
+from metrics import get_metrics
+
+
+def log(msg):
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {msg}")
+
+
+_DEFAULTS = {
+    "block": [],            # 资源类型：image / media / font / stylesheet ...
+    "block_domains": [],    # URL 中包含这些关键字的请求直接中止
+    "wait_for": None,       # 目标选择器；出现即可取内容
+    "wait_timeout": 10000,  # 等待选择器的最长毫秒数
+    "scroll": 0,            # 最多滚动次数
+    "scroll_wait": 1500,    # 每次滚动后等待新内容的最长毫秒数
+    "min_count": 0,         # 目标元素达到这么多个就不再滚动（0 = 滚满 scroll 次）
+    "timeout": 30000,       # 页面导航超时（毫秒）
+}
+
+_routes = {}
+_routes_lock = threading.Lock()
+
+
+def get_profile(name: str) -> dict:
+    profile = dict(_DEFAULTS)
+    profile.update(RENDER_PROFILES.get(name) or RENDER_PROFILES.get("default", {}))
+    return profile
+
+
+def _route_for(name: str, profile: dict):
+    """每个配置一个路由处理函数（同一对象，才能复用同一个 context）；无需屏蔽时不挂路由"""
+    if not profile["block"] and not profile["block_domains"]:
+        return None
+    with _routes_lock:
+        handler = _routes.get(name)
+        if handler is None:
+            types = frozenset(profile["block"])
+            domains = tuple(profile["block_domains"])
+
+            async def handler(route, request):
+                if request.resource_type in types or any(d in request.url for d in domains):
+                    return await route.abort()
+                return await route.continue_()
+
+            _routes[name] = handler
+        return handler
+
+
+async def _count(page, selector: str) -> int:
+    return await page.eval_on_selector_all(selector, "els => els.length")
+
+
+def render_page(url: str, profile: str = "default", context_options: dict = None,
+                timeout: int = None) -> str:
+    """按配置渲染页面并返回 HTML；失败返回空串"""
+    cfg = get_profile(profile)
+    nav_timeout = timeout or cfg["timeout"]
+    selector = cfg["wait_for"]
+    polite_wait(url)
+    log(f"  → 渲染页面 [{profile}]: {url}")
+
+    async def job(page):
+        await page.goto(url, timeout=nav_timeout, wait_until="domcontentloaded")
+        if selector:
+            try:
+                await page.wait_for_selector(selector, state="attached", timeout=cfg["wait_timeout"])
+            except Exception:
+                log(f"    ! 等待 {selector} 超时，按当前内容返回")
+                return await page.content()
+
+        # 滚动加载：有目标选择器时等到元素变多，数量够了或不再增加就停
+        for _ in range(cfg["scroll"]):
+            if selector:
+                n = await _count(page, selector)
+                if cfg["min_count"] and n >= cfg["min_count"]:
+                    break
+            await page.evaluate("window.scrollBy(0, document.body.scrollHeight)")
+            if not selector:
+                await page.wait_for_timeout(cfg["scroll_wait"])
+                continue
+            try:
+                await page.wait_for_function(
+                    "([s, n]) => document.querySelectorAll(s).length > n",
+                    arg=[selector, n], timeout=cfg["scroll_wait"])
+            except Exception:
+                break
+        return await page.content()
+
+    metrics = get_metrics()
+    with metrics.timer("news_render_seconds", profile=profile):
+        try:
+            html = get_pool().run(job, context_options=context_options,
+                                  route=_route_for(profile, cfg), context_key=profile)
+        except Exception as e:
+            log(f"  × 渲染失败 [{profile}]: {e}")
+            metrics.inc("news_render_total", profile=profile, result="error")
+            return ""
+    metrics.inc("news_render_total", profile=profile, result="ok" if html else "empty")
+    metrics.inc("news_render_bytes_total", len(html or ""), profile=profile)
+    return html
@@ -0,0 +1,169 @@
+# scheduler.py
+"""
+按数据源自适应调度。
+
+每个数据源有独立的抓取间隔：一次运行里有新条目就缩短（乘以 speedup），
+没有新条目就延长（乘以 backoff），限制在配置的 [min, max] 之间；
+源抓取失败时间隔不变。到期时间相近（coalesce 秒内）的源合并成一次流水线运行，
+同一时间只有一个流水线在跑，浏览器、各阶段线程数等资源上限不会被叠加突破。
+各源的间隔和下次运行时间写入 JSON 文件，重启后沿用。
+手动触发的运行（常驻模式的控制命令）和定时运行共用同一把锁，同样不会重叠。
+"""
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from config import SCHEDULE, SCHEDULE_SOURCES, SCHEDULE_STATE_FILE, SOURCE_ISOLATION
+from data_manager import load_data_sources
+from pipeline import NewsPipeline
+
+
+def log(msg):
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {msg}")
+
+
+def _fmt(ts: float) -> str:
+    return datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S")
+
+
+class AdaptiveScheduler:
+    def __init__(self, sources=None, path: str = SCHEDULE_STATE_FILE, deliver: bool = True,
+                 isolate: bool = SOURCE_ISOLATION, seen: set = None, clock=time.time):
+        self.sources = {s.__name__.rsplit(".", 1)[-1]: s
+                        for s in (sources if sources is not None else load_data_sources())}
+        self.path = path
+        self.deliver = deliver
+        self.isolate = isolate
+        self.seen = seen        # 常驻 URL 索引（None = 每次运行从存储加载）
+        self.clock = clock      # 墙钟（测试时注入）
+        self.running = []       # 正在运行的源
+        self.last_run = None    # 最近一次运行：{"sources", "ok", "seconds", "finished_at"}
+        self._lock = threading.Lock()
+        self._run_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._state = {}
+        self._load()
+        now = self.clock()
+        for name in self.sources:
+            st = self._state.setdefault(name, {})
+            st.setdefault("interval", self.cfg(name)["base"])
+            st.setdefault("next_at", now)
+            st["interval"] = self._clamp(name, st["interval"])
+
+    # —— 配置与状态 —— #
+    def cfg(self, name: str) -> dict:
+        c = dict(SCHEDULE)
+        c.update(SCHEDULE_SOURCES.get(name, {}))
+        return c
+
+    def _clamp(self, name: str, interval: float) -> float:
+        c = self.cfg(name)
+        return max(c["min"], min(c["max"], interval))
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self._state = json.load(f)
+        except Exception as e:
+            log(f"  ! 读取调度状态失败，已忽略: {e}")
+
+    def _save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._state, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.path)
+
+    def record(self, name: str, new: int, failed: bool = False, now: float = None):
+        """按本次结果调整间隔并安排下次运行"""
+        now = self.clock() if now is None else now
+        c = self.cfg(name)
+        with self._lock:
+            st = self._state[name]
+            old = st["interval"]
+            if not failed:
+                st["interval"] = self._clamp(name, old * (c["speedup"] if new else c["backoff"]))
+            st["next_at"] = now + st["interval"]
+            st["last_run"] = now
+            st["last_new"] = new
+            if failed:
+                st["failures"] = st.get("failures", 0) + 1
+            else:
+                st.pop("failures", None)
+        log(f"  调度 {name}: 新条目 {new} 条{'（失败）' if failed else ''}，"
+            f"间隔 {old / 60:.0f} → {st['interval'] / 60:.0f} 分钟，下次 {_fmt(st['next_at'])}")
+
+    def status(self) -> dict:
+        with self._lock:
+            return {name: dict(st) for name, st in self._state.items() if name in self.sources}
+
+    # —— 运行 —— #
+    def due(self, now: float = None) -> list:
+        """已到期的源，以及 coalesce 秒内将到期的源（合并到这一次运行）"""
+        now = self.clock() if now is None else now
+        with self._lock:
+            if not any(self._state[n]["next_at"] <= now for n in self.sources):
+                return []
+            return [n for n in self.sources if self._state[n]["next_at"] <= now + self.cfg(n)["coalesce"]]
+
+    def next_due(self):
+        """(最早到期的源, 到期时间)；没有数据源时返回 (None, base 秒后)"""
+        with self._lock:
+            return min(((n, self._state[n]["next_at"]) for n in self.sources), key=lambda t: t[1],
+                       default=(None, self.clock() + SCHEDULE["base"]))
+
+    def run_due(self, names=None) -> bool:
+        """运行到期的源（或指定的源）一次；没有要运行的源返回 True"""
+        manual = names is not None
+        with self._run_lock:
+            names = list(names) if manual else self.due()
+            if not names:
+                return True
+            log(f"===== 调度运行: {', '.join(names)} =====")
+            self.running = names
+            t0 = time.monotonic()
+            pipeline = NewsPipeline(deliver=self.deliver, sources=[self.sources[n] for n in names],
+                                    isolate=self.isolate, seen=self.seen)
+            try:
+                ok = pipeline.run()
+            except Exception as e:
+                log(f"× 流水线运行出错: {e}")
+                ok = False
+            finally:
+                self.running = []
+            if not ok and self.seen is not None:
+                # 出错的条目可能已记入索引却没入库，按存储重建索引，下次还能重新抓取
+                self.seen.clear()
+                self.seen.update(pipeline.store.seen_urls())
+            now = self.clock()
+            self.last_run = {"sources": names, "ok": ok, "seconds": round(time.monotonic() - t0, 3),
+                             "finished_at": _fmt(now)}
+            for name in names:
+                res = pipeline.by_source.get(name, {"new": 0, "failed": not ok})
+                self.record(name, res["new"], res["failed"], now)
+            try:
+                self._save()
+            except OSError as e:
+                log(f"  × 保存调度状态失败: {e}")
+        if manual:
+            # 手动运行改变了下次运行时间，让调度循环重新计算
+            self._wake.set()
+        return ok
+
+    def run_forever(self):
+        """常驻运行：到期就跑，其余时间睡到最早的下次运行时间（stop() 或手动运行会提前唤醒）"""
+        log(f"===== 自适应调度启动，共 {len(self.sources)} 个数据源 =====")
+        while not self._stop.is_set():
+            self.run_due()
+            name, wake = self.next_due()
+            if name is not None:
+                log(f"下一次计划运行时间: {_fmt(wake)}（{name}）")
+            self._wake.wait(max(0.0, wake - self.clock()))
+            self._wake.clear()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
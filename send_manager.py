@@ -1,22 +1,26 @@
-import requests
-import pandas as pd
+import json
+from concurrent.futures import Future
 from datetime import datetime
-import random
-import time
 from config import *
-from data_manager import load_excel, save_excel, log
-
-# Feishu 会话
-session = requests.Session()
-session.headers.update({
-    "User-Agent": random.choice(USER_AGENTS),
-    "Accept": "application/json"
-})
+from data_manager import log
+from storage import get_store, export_excel
+from rate_limiter import get_limiter
+from outbox import get_outbox, SENDING, SENT, FAILED, UNKNOWN
+from webhook_sender import get_sender
+
+
+def _row_item(row: dict) -> dict:
+    return {
+        "title":    row["title"],
+        "source":   row["source"],
+        "date_str": row["date_str"],
+        "url":      row["url"],
+        "author":   row["author"]
+    }
 
 
-def send_to_feishu(item: dict, summary: str) -> bool:
-    """发送单条新闻到飞书"""
-    payload = {
+def build_single_payload(item: dict, summary: str) -> dict:
+    return {
         "msg_type": "text",
         "content": {
             "title": item["title"],
@@ -28,84 +32,212 @@ def send_to_feishu(item: dict, summary: str) -> bool:
         }
     }
 
-    try:
-        resp = session.post(WEBHOOK, json=payload, timeout=10)
-        log(f"  → Feishu 返回 {resp.status_code}")
-        return 200 <= resp.status_code < 300
-    except Exception as e:
-        log(f"  × Feishu 发送异常：{e}")
-        return False
+
+def _digest_block(row: dict) -> list:
+    """一条新闻在富文本消息中的段落"""
+    return [
+        [{"tag": "a", "text": row["title"], "href": row["url"]}],
+        [{"tag": "text", "text": f"{row['source']} | {row['author']} | {row['date_str']}"}],
+        [{"tag": "text", "text": row["content"]}],
+        [{"tag": "text", "text": ""}],
+    ]
+
+
+def build_digest_payload(rows: list) -> dict:
+    """把多条新闻打包成一条飞书富文本（post）消息"""
+    content = []
+    for row in rows:
+        content.extend(_digest_block(row))
+    return {
+        "msg_type": "post",
+        "content": {"post": {"zh_cn": {
+            "title": f"新闻速递（{len(rows)} 条）",
+            "content": content,
+        }}}
+    }
+
+
+def _payload_size(payload: dict) -> int:
+    return len(json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+
+
+_MAX_TRIMS = 64     # 每个字段最多截断的次数（每次保留约 3/4）
+
+
+def _fit_row(row: dict, max_bytes: int):
+    """单条就超限时依次截断摘要、标题；截到空仍超限（如 URL 过长）返回 None"""
+    row = dict(row)
+    for field in ("content", "title"):
+        for _ in range(_MAX_TRIMS):
+            if _payload_size(build_digest_payload([row])) <= max_bytes:
+                return row
+            text = row.get(field) or ""
+            if len(text) <= 1:
+                row[field] = ""
+                break
+            # 每次至少缩短一个字符，保证循环收敛
+            row[field] = text[:min(len(text) - 2, len(text) * 3 // 4)].rstrip() + "…"
+    return row if _payload_size(build_digest_payload([row])) <= max_bytes else None
+
+
+def pack_digests(rows: list, max_items: int = DIGEST_MAX_ITEMS,
+                 max_bytes: int = FEISHU_MAX_PAYLOAD_BYTES) -> list:
+    """按条数和消息体大小上限，把待发送条目分成若干批；无法截到上限以内的条目单独成批"""
+    batches, cur = [], []
+    for row in rows:
+        if _payload_size(build_digest_payload([row])) > max_bytes:
+            fitted = _fit_row(row, max_bytes)
+            if fitted is None:
+                log(f"  ! 条目截断后仍超过消息体上限，单独发送: {row['url'][:100]}")
+                batches.append([row])
+                continue
+            row = fitted
+        if cur and (len(cur) >= max_items or _payload_size(build_digest_payload(cur + [row])) > max_bytes):
+            batches.append(cur)
+            cur = []
+        cur.append(row)
+    if cur:
+        batches.append(cur)
+    return batches
+
+
+def post_payload(payload: dict) -> bool:
+    """同步推送一条消息（经异步推送器，含限速与重试）"""
+    ok, error = get_sender().send_sync(payload)
+    if not ok:
+        log(f"  × Feishu 发送失败：{error}")
+    return ok
+
+
+def send_to_feishu(item: dict, summary: str) -> bool:
+    """发送单条新闻到飞书"""
+    return post_payload(build_single_payload(item, summary))
+
+
+def _batch_payload(rows: list) -> dict:
+    if len(rows) > 1:
+        return build_digest_payload(rows)
+    return build_single_payload(_row_item(rows[0]), rows[0]["content"])
+
+
+def _claim(store, rows: list) -> int:
+    """推送前：发件箱登记“发送中”并同步到新闻表"""
+    urls = [r["url"] for r in rows]
+    entry_id = get_outbox().claim(urls, "digest" if len(rows) > 1 else "single")
+    with store.transaction():
+        for url in urls:
+            store.update(url, send_status=SENDING)
+    return entry_id
+
+
+def _finish(store, rows: list, entry_id: int, send_ok, error: str = ""):
+    """
+    推送后：记录结果，单行更新发送状态和发送次数（失败的下次运行自动重试；
+    send_ok 为 None 即结果未知，记为“发送状态未知”，不自动重发）
+    """
+    outbox = get_outbox()
+    outbox.finish(entry_id, send_ok, error)
+    now_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    status = SENT if send_ok else (UNKNOWN if send_ok is None else FAILED)
+    with store.transaction():
+        for r in rows:
+            attempts = int(float(r.get("send_attempts") or 0)) + 1
+            store.update(r["url"], send_status=status, send_attempts=attempts, updated_at=now_str)
+    outbox.mark_applied(entry_id)
+
+    titles = rows[0]["title"] if len(rows) == 1 else f"{len(rows)} 条合集"
+    if send_ok:
+        log(f"  ✓ 发送成功: {titles}")
+    else:
+        log(f"  × 发送失败: {titles}（{error}）")
+
+
+def submit_batch(store, rows: list):
+    """
+    异步提交一批（单条或合集）推送，返回 Future[bool]。
+    发件箱在请求真正发出前登记，推送结束后写回结果，保证中断后不会重复推送。
+    两次写入都在推送器的工作线程里完成，不阻塞事件循环。
+    """
+    entry = {}
+
+    def before_send():
+        entry["id"] = _claim(store, rows)
+
+    def after_send(send_ok, error):
+        if "id" in entry:
+            _finish(store, rows, entry["id"], send_ok, error)
+
+    fut = get_sender().submit(_batch_payload(rows), before_send=before_send, after_send=after_send)
+    result = Future()
+
+    def done(f):
+        try:
+            result.set_result(bool(f.result()[0]))
+        except Exception as e:
+            result.set_exception(e)
+
+    fut.add_done_callback(done)
+    return result
+
+
+def deliver_batch(store, rows: list) -> bool:
+    """推送一批已入库的新闻并等待结果"""
+    if not rows:
+        return True
+    return submit_batch(store, rows).result()
+
+
+def deliver_row(store, row: dict) -> bool:
+    """推送一条已入库的新闻"""
+    return deliver_batch(store, [row])
+
+
+def recover_outbox(store=None) -> int:
+    """处理上次中断遗留的发件箱记录（每次发送前调用）"""
+    return get_outbox().recover(store or get_store())
 
 
 def send_news():
     log("===== 开始发送新闻 =====")
     success = True
     try:
-        df = load_excel()
-
-        # 保底初始化列
-        if '发送状态' not in df.columns:
-            df['发送状态'] = ''
-        if 'AI处理状态' not in df.columns:
-            df['AI处理状态'] = 'AI处理完成'  # 兼容旧数据
+        store = get_store()
+        recover_outbox(store)
 
         # 只处理未发送且AI处理完成的
-        ready_mask = (
-            (df['发送状态'].fillna('') == '') &
-            (df['AI处理状态'] == "AI处理完成") &
-            (df['内容'].notna()) &
-            (df['内容'].str.strip() != "")
-        )
-        ready_indexes = df[ready_mask].index.tolist()
-
-        if not ready_indexes:
+        ready_rows = store.pending()
+
+        if not ready_rows:
             log("没有准备好发送的新闻")
             return True
 
-        log(f"找到 {len(ready_indexes)} 条准备发送的新闻…")
+        log(f"找到 {len(ready_rows)} 条准备发送的新闻…")
+
+        if SEND_MODE == "digest":
+            batches = pack_digests(ready_rows)
+            log(f"合集模式：打包为 {len(batches)} 条消息")
+        else:
+            batches = [[row] for row in ready_rows]
 
         sent_count = 0
         failed_count = 0
 
-        for idx in ready_indexes:
-            row = df.loc[idx]
-            title = row["标题"]
-            log(f"发送第 {sent_count + failed_count + 1}/{len(ready_indexes)} 条: {title}")
-
-            item = {
-                "title":    title,
-                "source":   row["来源"],
-                "date_str": row["日期"],
-                "url":      row["URL"],
-                "author":   row["作者"]
-            }
-            summary = row["内容"]
-
-            send_ok = send_to_feishu(item, summary)
-            now_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            if send_ok:
-                df.at[idx, "发送状态"] = "已发送"
-                sent_count += 1
-                log("  ✓ 发送成功")
+        # 全部提交给异步推送器，按其限速和并发上限同时发送
+        futures = [(batch, submit_batch(store, batch)) for batch in batches]
+        for batch, fut in futures:
+            if fut.result():
+                sent_count += len(batch)
             else:
-                df.at[idx, "发送状态"] = "发送失败"
-                failed_count += 1
+                failed_count += len(batch)
                 success = False
-                log("  × 发送失败")
-
-            df.at[idx, "更新时间"] = now_str
-            save_excel(df)  # 每条都保存，防止脚本中断重复发送
-
-            # 随机延迟
-            if idx != ready_indexes[-1]:
-                delay = random.uniform(1, 2)
-                log(f"  等待 {delay:.1f}s…")
-                time.sleep(delay)
 
+        if EXPORT_EXCEL:
+            export_excel()
+        get_limiter().log_report()
         log(f"===== 发送完成: 成功 {sent_count} 条，失败 {failed_count} 条 =====")
 
     except Exception as e:
         log(f"× 发送过程出错: {e}")
         success = False
 
-    return success
\ No newline at end of file
+    return success
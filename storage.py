@@ -0,0 +1,319 @@
+# storage.py
+"""
+新闻存储后端。
+
+默认使用 SQLite：URL 唯一索引、按行插入/更新、事务写入，
+不再每条新闻重写整个 news.xlsx。Excel 只作为可选导出。
+"""
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from config import DB_FILE, EXCEL_FILE, STORAGE_BACKEND, SEND_MAX_ATTEMPTS
+from metrics import get_metrics
+
+
+def log(msg):
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {msg}")
+
+
+# 表格列名（中文，兼容旧 Excel） ↔ 数据库字段
+FIELDS = [
+    ("标题", "title"),
+    ("来源", "source"),
+    ("日期", "date_str"),
+    ("URL", "url"),
+    ("作者", "author"),
+    ("内容", "content"),
+    ("需要渲染", "need_render"),
+    ("AI处理状态", "ai_status"),
+    ("发送状态", "send_status"),
+    ("更新时间", "updated_at"),
+    ("发送次数", "send_attempts"),
+    ("重复于", "dup_of"),
+]
+COL_TO_FIELD = dict(FIELDS)
+FIELD_TO_COL = {f: c for c, f in FIELDS}
+FIELD_NAMES = [f for _, f in FIELDS]
+
+
+def _now() -> str:
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _clean(v) -> str:
+    """pandas 读出的 NaN/None 统一成空串"""
+    if v is None:
+        return ""
+    if isinstance(v, float) and v != v:
+        return ""
+    return str(v)
+
+
+def record_from_row(row: dict) -> dict:
+    """中文列名的行 → 数据库字段 dict"""
+    return {COL_TO_FIELD[c]: _clean(v) for c, v in row.items() if c in COL_TO_FIELD}
+
+
+def records_from_frame(df) -> list:
+    """DataFrame（中文列名）→ 记录列表；没有“AI处理状态”列的旧表按 AI 处理完成处理（兼容旧数据）"""
+    legacy = "AI处理状态" not in df.columns
+    records = []
+    for row in df.to_dict("records"):
+        rec = record_from_row(row)
+        if legacy:
+            rec["ai_status"] = "AI处理完成"
+        records.append(rec)
+    return records
+
+
+class SQLiteStore:
+    """SQLite 存储：url 唯一索引，单行写入，事务提交"""
+
+    def __init__(self, path: str = DB_FILE, excel_path: str = EXCEL_FILE):
+        self.path = path
+        self.excel_path = excel_path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+        self._migrate_excel()
+
+    def _create_schema(self):
+        cols = ",\n".join(f"{f} TEXT NOT NULL DEFAULT ''" for f in FIELD_NAMES if f != "url")
+        with self.transaction() as cur:
+            cur.execute(f"""
+                CREATE TABLE IF NOT EXISTS news (
+                    id  INTEGER PRIMARY KEY AUTOINCREMENT,
+                    url TEXT NOT NULL UNIQUE,
+                    {cols}
+                )""")
+            # 旧库补齐新增的列
+            have = {r[1] for r in cur.execute("PRAGMA table_info(news)")}
+            for f in FIELD_NAMES:
+                if f not in have:
+                    cur.execute(f"ALTER TABLE news ADD COLUMN {f} TEXT NOT NULL DEFAULT ''")
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_news_send ON news(send_status, ai_status)")
+
+    def _migrate_excel(self):
+        """首次使用时导入旧 news.xlsx 历史"""
+        if self.count() or not os.path.exists(self.excel_path):
+            return
+        import pandas as pd
+        df = pd.read_excel(self.excel_path, dtype=str)
+        n = 0
+        with self.transaction():
+            for rec in records_from_frame(df):
+                if rec.get("url") and self.insert(rec):
+                    n += 1
+        log(f"已从 {self.excel_path} 导入 {n} 条历史")
+
+    @contextmanager
+    def transaction(self):
+        """事务：块内所有写入要么全部提交，要么全部回滚；可嵌套"""
+        with self._lock:
+            cur = self._conn.cursor()
+            nested = self._conn.in_transaction
+            if not nested:
+                cur.execute("BEGIN IMMEDIATE")
+            try:
+                yield cur
+            except BaseException:
+                if not nested:
+                    cur.execute("ROLLBACK")
+                raise
+            else:
+                if not nested:
+                    cur.execute("COMMIT")
+            finally:
+                cur.close()
+
+    # —— 查询 —— #
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM news").fetchone()[0]
+
+    def has_url(self, url: str) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM news WHERE url = ?", (url,)).fetchone() is not None
+
+    def seen_urls(self) -> set:
+        with self._lock:
+            return {r[0] for r in self._conn.execute("SELECT url FROM news")}
+
+    def rows(self) -> list:
+        with self._lock:
+            cur = self._conn.execute(f"SELECT {', '.join(FIELD_NAMES)} FROM news ORDER BY id")
+            return [dict(r) for r in cur]
+
+    def pending(self) -> list:
+        """AI 处理完成、未发送或发送失败（且未超过重试次数）的记录"""
+        with get_metrics().timer("news_storage_seconds", op="pending"), self._lock:
+            cur = self._conn.execute(
+                f"SELECT {', '.join(FIELD_NAMES)} FROM news "
+                "WHERE send_status IN ('', '发送失败') AND ai_status = 'AI处理完成' AND TRIM(content) != '' "
+                "AND CAST(send_attempts AS INTEGER) < ? "
+                "ORDER BY id", (SEND_MAX_ATTEMPTS,))
+            return [dict(r) for r in cur]
+
+    # —— 写入 —— #
+    def insert(self, record: dict) -> bool:
+        """插入一行；URL 已存在时忽略并返回 False"""
+        rec = {f: _clean(record.get(f, "")) for f in FIELD_NAMES}
+        rec["updated_at"] = rec["updated_at"] or _now()
+        with get_metrics().timer("news_storage_seconds", op="insert"), self.transaction() as cur:
+            cur.execute(
+                f"INSERT OR IGNORE INTO news ({', '.join(FIELD_NAMES)}) "
+                f"VALUES ({', '.join('?' * len(FIELD_NAMES))})",
+                [rec[f] for f in FIELD_NAMES])
+            return cur.rowcount == 1
+
+    def update(self, url: str, **fields) -> bool:
+        """按 URL 更新部分字段，自动刷新更新时间"""
+        fields = {k: _clean(v) for k, v in fields.items() if k in FIELD_NAMES and k != "url"}
+        fields.setdefault("updated_at", _now())
+        sets = ", ".join(f"{k} = ?" for k in fields)
+        with get_metrics().timer("news_storage_seconds", op="update"), self.transaction() as cur:
+            cur.execute(f"UPDATE news SET {sets} WHERE url = ?", [*fields.values(), url])
+            return cur.rowcount == 1
+
+    def replace_all(self, records: list):
+        """整表覆盖（兼容 save_excel 语义）：upsert 所有行，删除不在其中的行"""
+        urls = []
+        with get_metrics().timer("news_storage_seconds", op="replace_all"), self.transaction() as cur:
+            for rec in records:
+                rec = {f: _clean(rec.get(f, "")) for f in FIELD_NAMES}
+                if not rec["url"]:
+                    continue
+                urls.append(rec["url"])
+                cur.execute(
+                    f"INSERT INTO news ({', '.join(FIELD_NAMES)}) "
+                    f"VALUES ({', '.join('?' * len(FIELD_NAMES))}) "
+                    f"ON CONFLICT(url) DO UPDATE SET "
+                    + ", ".join(f"{f} = excluded.{f}" for f in FIELD_NAMES if f != "url"),
+                    [rec[f] for f in FIELD_NAMES])
+            cur.execute("CREATE TEMP TABLE IF NOT EXISTS _keep (url TEXT PRIMARY KEY)")
+            cur.execute("DELETE FROM _keep")
+            cur.executemany("INSERT OR IGNORE INTO _keep VALUES (?)", [(u,) for u in urls])
+            cur.execute("DELETE FROM news WHERE url NOT IN (SELECT url FROM _keep)")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class ExcelStore:
+    """旧行为：整个 news.xlsx 常驻内存，每次写入重写文件"""
+
+    def __init__(self, path: str = EXCEL_FILE):
+        self.path = path
+        self._lock = threading.RLock()
+        self._rows = []
+        self._batch = 0
+        if os.path.exists(path):
+            import pandas as pd
+            df = pd.read_excel(path, dtype=str)
+            self._rows = records_from_frame(df)
+            for r in self._rows:
+                for f in FIELD_NAMES:
+                    r.setdefault(f, "")
+        self._index = {r["url"]: r for r in self._rows if r["url"]}
+
+    @contextmanager
+    def transaction(self):
+        with self._lock:
+            self._batch += 1
+            try:
+                yield None
+            finally:
+                self._batch -= 1
+                self._flush()
+
+    def _flush(self):
+        if self._batch:
+            return
+        import pandas as pd
+        with get_metrics().timer("news_storage_seconds", op="excel_flush"):
+            df = pd.DataFrame([{FIELD_TO_COL[f]: r[f] for f in FIELD_NAMES} for r in self._rows],
+                              columns=[c for c, _ in FIELDS])
+            df.to_excel(self.path, index=False)
+
+    def count(self) -> int:
+        return len(self._rows)
+
+    def has_url(self, url: str) -> bool:
+        return url in self._index
+
+    def seen_urls(self) -> set:
+        with self._lock:
+            return set(self._index)
+
+    def rows(self) -> list:
+        with self._lock:
+            return [dict(r) for r in self._rows]
+
+    def pending(self) -> list:
+        with self._lock:
+            return [dict(r) for r in self._rows
+                    if r["send_status"] in ("", "发送失败") and r["ai_status"] == "AI处理完成"
+                    and r["content"].strip() and int(float(r["send_attempts"] or 0)) < SEND_MAX_ATTEMPTS]
+
+    def insert(self, record: dict) -> bool:
+        rec = {f: _clean(record.get(f, "")) for f in FIELD_NAMES}
+        rec["updated_at"] = rec["updated_at"] or _now()
+        with self.transaction():
+            if rec["url"] in self._index:
+                return False
+            self._rows.append(rec)
+            self._index[rec["url"]] = rec
+            return True
+
+    def update(self, url: str, **fields) -> bool:
+        with self.transaction():
+            rec = self._index.get(url)
+            if rec is None:
+                return False
+            rec.update({k: _clean(v) for k, v in fields.items() if k in FIELD_NAMES and k != "url"})
+            if "updated_at" not in fields:
+                rec["updated_at"] = _now()
+            return True
+
+    def replace_all(self, records: list):
+        with self.transaction():
+            self._rows = [{f: _clean(r.get(f, "")) for f in FIELD_NAMES} for r in records if r.get("url")]
+            self._index = {r["url"]: r for r in self._rows}
+
+    def close(self):
+        pass
+
+
+BACKENDS = {
+    "sqlite": SQLiteStore,
+    "excel": ExcelStore,
+}
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """进程内共享的存储实例，按 config.STORAGE_BACKEND 选择后端"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = BACKENDS[STORAGE_BACKEND]()
+        return _store
+
+
+def export_excel(path: str = EXCEL_FILE):
+    """把当前存储导出为 Excel（可选）"""
+    import pandas as pd
+    with get_metrics().timer("news_storage_seconds", op="export_excel"):
+        rows = get_store().rows()
+        df = pd.DataFrame([{FIELD_TO_COL[f]: r[f] for f in FIELD_NAMES} for r in rows],
+                          columns=[c for c, _ in FIELDS])
+        df.to_excel(path, index=False)
+    log(f"已导出 {path} ({len(df)} 条)")
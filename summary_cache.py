@@ -0,0 +1,129 @@
+# summary_cache.py
+"""
+摘要缓存：按 规范化正文哈希 + 模型 + 提示词版本 持久化保存 LLM 摘要。
+
+内存 LRU 在前、SQLite 在后；命中内存时不访问磁盘也不发网络请求。
+按条数上限和最长保存天数淘汰，hits/misses 计数见 stats()。
+"""
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from config import SUMMARY_CACHE_FILE, SUMMARY_CACHE_MAX_ENTRIES, SUMMARY_CACHE_MAX_AGE_DAYS
+
+_MEMORY_ENTRIES = 512
+_EVICT_EVERY = 100
+
+
+def content_hash(text: str) -> str:
+    """规范化（NFKC、合并空白）后取 sha256"""
+    norm = unicodedata.normalize("NFKC", text or "")
+    norm = re.sub(r"\s+", " ", norm).strip()
+    return hashlib.sha256(norm.encode("utf-8")).hexdigest()
+
+
+class SummaryCache:
+    def __init__(self, path: str = SUMMARY_CACHE_FILE, max_entries: int = SUMMARY_CACHE_MAX_ENTRIES,
+                 max_age_days: float = SUMMARY_CACHE_MAX_AGE_DAYS, clock=time.time):
+        self.path = path
+        self.clock = clock      # 墙钟（测试时注入）
+        self.max_entries = max_entries
+        self.max_age = max_age_days * 86400
+        self.hits = 0
+        self.misses = 0
+        self._mem = OrderedDict()   # (hash, prompt_version) -> (model, summary, created_at)
+        self._lock = threading.Lock()
+        self._puts = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS summaries (
+                content_hash   TEXT NOT NULL,
+                model          TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                summary        TEXT NOT NULL,
+                created_at     REAL NOT NULL,
+                accessed_at    REAL NOT NULL,
+                PRIMARY KEY (content_hash, model, prompt_version)
+            )""")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_summaries_accessed ON summaries(accessed_at)")
+        self.evict()
+
+    def get(self, text: str, models, prompt_version: str):
+        """按模型优先级查找，返回 (model, summary)；未命中返回 None"""
+        h = content_hash(text)
+        now = self.clock()
+        with self._lock:
+            hit = self._mem.get((h, prompt_version))
+            if hit is not None and now - hit[2] > self.max_age:
+                # 内存里的条目同样按最长保存天数过期
+                del self._mem[(h, prompt_version)]
+                hit = None
+            if hit is not None and hit[0] in models:
+                self._mem.move_to_end((h, prompt_version))
+                self.hits += 1
+                return hit[:2]
+            marks = ",".join("?" * len(models))
+            rows = self._conn.execute(
+                f"SELECT model, summary, created_at FROM summaries "
+                f"WHERE content_hash = ? AND prompt_version = ? AND model IN ({marks})",
+                [h, prompt_version, *models]).fetchall()
+            rows = [r for r in rows if now - r[2] <= self.max_age]
+            if not rows:
+                self.misses += 1
+                return None
+            model, summary, created = min(rows, key=lambda r: list(models).index(r[0]))
+            self._conn.execute(
+                "UPDATE summaries SET accessed_at = ? WHERE content_hash = ? AND model = ? AND prompt_version = ?",
+                (now, h, model, prompt_version))
+            self._remember(h, prompt_version, model, summary, created)
+            self.hits += 1
+            return model, summary
+
+    def put(self, text: str, model: str, prompt_version: str, summary: str):
+        h = content_hash(text)
+        now = self.clock()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO summaries VALUES (?, ?, ?, ?, ?, ?)",
+                (h, model, prompt_version, summary, now, now))
+            self._remember(h, prompt_version, model, summary, now)
+            self._puts += 1
+            due = self._puts % _EVICT_EVERY == 0
+        if due:
+            self.evict()
+
+    def _remember(self, h, prompt_version, model, summary, created):
+        self._mem[(h, prompt_version)] = (model, summary, created)
+        self._mem.move_to_end((h, prompt_version))
+        while len(self._mem) > _MEMORY_ENTRIES:
+            self._mem.popitem(last=False)
+
+    def evict(self):
+        """删除过期条目，并把总条数压到上限以内（按最近访问时间）"""
+        with self._lock:
+            self._conn.execute("DELETE FROM summaries WHERE created_at < ?", (self.clock() - self.max_age,))
+            self._conn.execute(
+                "DELETE FROM summaries WHERE rowid IN ("
+                "SELECT rowid FROM summaries ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,))
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM summaries").fetchone()[0]
+            return {"hits": self.hits, "misses": self.misses, "entries": size}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> SummaryCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SummaryCache()
+        return _cache
@@ -0,0 +1,195 @@
+# supervisor.py
+"""
+数据源隔离运行：每个数据源在独立子进程（独立进程组）中抓取列表和详情页。
+
+主进程逐条接收子进程送回的条目，同时监控：
+  - 墙钟期限：超过 deadline 秒仍未结束
+  - 内存上限：子进程及其所有后代（包括 Chromium）的常驻内存总和超过 rss_mb
+超过任一项就杀掉整个进程组并报告；被杀之前已经送回的条目照常入库。
+期限只计子进程在干活的时间：主进程因下游队列满而暂停读取期间不计入。
+没有进程组的平台（Windows）只杀子进程本身，也不做内存检查。
+卡死的页面或泄漏的浏览器只影响这一个数据源的这一次运行，不会拖住调度循环或整个主机。
+"""
+import importlib
+import multiprocessing
+import os
+import signal
+import time
+from datetime import datetime
+from config import SOURCE_LIMITS, SOURCE_LIMITS_SOURCES, DEDUPE_ENABLED
+from metrics import get_metrics
+
+_POLL = 0.5
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+_HAS_PROC = os.path.isdir("/proc")
+_HAS_PGRP = hasattr(os, "setsid") and hasattr(os, "killpg")
+
+
+def log(msg):
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {msg}")
+
+
+class SourceKilled(Exception):
+    """数据源子进程因超时或超内存被终止"""
+
+    def __init__(self, source: str, reason: str, partial: int):
+        super().__init__(f"{source} {reason}，已终止（保留已返回的 {partial} 条）")
+        self.source = source
+        self.reason = reason
+        self.partial = partial
+
+
+def limits_for(name: str) -> dict:
+    cfg = dict(SOURCE_LIMITS)
+    cfg.update(SOURCE_LIMITS_SOURCES.get(name, {}))
+    return cfg
+
+
+# —— 进程树 —— #
+def _proc_table() -> dict:
+    """pid → (ppid, pgrp, rss 页数)，读 /proc/<pid>/stat"""
+    table = {}
+    for d in os.listdir("/proc"):
+        if not d.isdigit():
+            continue
+        try:
+            with open(f"/proc/{d}/stat", "rb") as f:
+                data = f.read()
+        except OSError:
+            continue
+        # 进程名可能含空格和括号，从最后一个 ")" 之后开始按字段切分
+        fields = data[data.rindex(b")") + 2:].split()
+        table[int(d)] = (int(fields[1]), int(fields[2]), int(fields[21]))
+    return table
+
+
+def tree_pids(root: int, table: dict = None) -> set:
+    """root 的进程组成员及其所有后代（自己另起进程组的后代也算）"""
+    table = _proc_table() if table is None else table
+    members = {pid for pid, (_, pgrp, _) in table.items() if pid == root or pgrp == root}
+    grown = True
+    while grown:
+        grown = False
+        for pid, (ppid, _, _) in table.items():
+            if ppid in members and pid not in members:
+                members.add(pid)
+                grown = True
+    return members
+
+
+def tree_rss(root: int) -> int:
+    """root 进程树的常驻内存总和（字节）；没有 /proc 时返回 0（不做内存检查）"""
+    if not _HAS_PROC:
+        return 0
+    table = _proc_table()
+    return sum(table[pid][2] for pid in tree_pids(root, table) if pid in table) * _PAGE_SIZE
+
+
+def kill_tree(root: int):
+    if not _HAS_PGRP:
+        return
+    pids = tree_pids(root) if _HAS_PROC else set()
+    try:
+        os.killpg(root, signal.SIGKILL)
+    except OSError:
+        pass
+    for pid in pids:
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except OSError:
+            pass
+
+
+# —— 子进程 —— #
+def _child_main(module: str, seen, conn):
+    """子进程入口：自成进程组，跑列表和详情，逐条送回 ("item", 条目)，最后送回本进程的指标"""
+    if _HAS_PGRP:
+        os.setsid()
+    import data_manager     # 必须先于数据源模块导入
+    src = importlib.import_module(module)
+    name = module.rsplit(".", 1)[-1]
+    metrics = get_metrics()
+    dedupe = None
+    if DEDUPE_ENABLED:
+        from dedupe import get_dedupe
+        dedupe = get_dedupe()
+    try:
+        with metrics.source(name):
+            for item in data_manager.iter_source(src, seen):
+                # 与已成功处理的新闻同题的条目不抓详情（主进程会按重复入库）
+                if (item.get("need_render") and hasattr(src, "fetch_detail")
+                        and not (dedupe and dedupe.match(item["url"], item["title"]))):
+                    try:
+                        item["_full"] = src.fetch_detail(item) or ""
+                    except Exception as e:
+                        log(f"  × 详情抓取失败 {item.get('url')}: {e}")
+                        item["_full"] = ""
+                conn.send(("item", item))
+        conn.send(("done", metrics.snapshot()))
+    except Exception as e:
+        conn.send(("error", f"{type(e).__name__}: {e}"))
+    finally:
+        conn.close()
+        # 不等浏览器池等后台线程正常退出，直接结束（残留的子进程由主进程清理）
+        os._exit(0)
+
+
+def iter_isolated(src, seen=None):
+    """
+    在子进程中运行数据源，逐条产出条目（需要渲染的条目带 "_full" 正文）。
+    超时或超内存时杀掉子进程树并抛出 SourceKilled；子进程内的异常原样转为 RuntimeError。
+    """
+    name = src.__name__.rsplit(".", 1)[-1]
+    lim = limits_for(name)
+    rss_limit = lim["rss_mb"] * 1024 * 1024 if lim.get("rss_mb") else 0
+    ctx = multiprocessing.get_context("spawn")
+    parent, child = ctx.Pipe(duplex=False)
+    proc = ctx.Process(target=_child_main, args=(src.__name__, seen, child),
+                       name=f"source-{name}", daemon=True)
+    proc.start()
+    child.close()
+    metrics = get_metrics()
+    deadline = time.monotonic() + lim["deadline"] if lim.get("deadline") else None
+    count, reason, kind = 0, None, None
+    next_check = 0.0
+    try:
+        while True:
+            if parent.poll(_POLL):
+                try:
+                    kind, payload = parent.recv()
+                except EOFError:
+                    if proc.is_alive():
+                        proc.join(_POLL)
+                    raise RuntimeError(f"子进程异常退出 (exitcode={proc.exitcode})")
+                if kind == "done":
+                    metrics.merge(payload)
+                    return
+                if kind != "item":
+                    raise RuntimeError(payload)
+                count += 1
+                paused = time.monotonic()
+                yield payload
+                # 下游处理这一条（含等待队列空位）的时间不计入期限
+                if deadline is not None:
+                    deadline += time.monotonic() - paused
+            elif not proc.is_alive() and not parent.poll():
+                raise RuntimeError(f"子进程异常退出 (exitcode={proc.exitcode})")
+            # 条目源源不断时也要检查（每 _POLL 秒最多读一次 /proc）
+            now = time.monotonic()
+            if deadline is not None and now > deadline:
+                kind, reason = "deadline", f"超过 {lim['deadline']}s 期限"
+                break
+            if rss_limit and now >= next_check:
+                next_check = now + _POLL
+                rss = tree_rss(proc.pid)
+                if rss > rss_limit:
+                    kind, reason = "rss", f"内存 {rss / 1048576:.0f}MB 超过上限 {lim['rss_mb']}MB"
+                    break
+    finally:
+        kill_tree(proc.pid)
+        if proc.is_alive():
+            proc.kill()
+        proc.join(5)
+        parent.close()
+    metrics.inc("news_source_killed_total", source=name, reason=kind)
+    raise SourceKilled(name, reason, count)
@@ -0,0 +1,35 @@
+# tests/conftest.py
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 必须在导入其他项目模块之前：所有状态文件写到临时目录，外部服务指向不存在的本地地址
+import config   # noqa: E402
+from bench.run import setup_env   # noqa: E402
+
+WORKDIR = tempfile.mkdtemp(prefix="news-tests-")
+setup_env(WORKDIR, "http://127.0.0.1:9/v1", "http://127.0.0.1:9/hook")
+config.QUICK_CHECK_FILE = os.path.join(WORKDIR, "quick_check.json")
+config.SCHEDULE_STATE_FILE = os.path.join(WORKDIR, "schedule_state.json")
+config.DAEMON_SOCKET = os.path.join(WORKDIR, "news_daemon.sock")
+
+
+@pytest.fixture
+def fresh_state(tmp_path, monkeypatch):
+    """各单例指向本测试自己的临时文件"""
+    import storage
+    import outbox
+    import dedupe
+    import summary_cache
+    import metrics
+    db = str(tmp_path / "news.db")
+    monkeypatch.setattr(storage, "_store", storage.SQLiteStore(db))
+    monkeypatch.setattr(outbox, "_outbox", outbox.Outbox(db))
+    monkeypatch.setattr(dedupe, "_index", dedupe.NearDupIndex(db))
+    monkeypatch.setattr(summary_cache, "_cache", None)
+    monkeypatch.setattr(metrics, "_metrics", metrics.Metrics())
+    return tmp_path
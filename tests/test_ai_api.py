@@ -0,0 +1,125 @@
+# tests/test_ai_api.py
+import threading
+import time
+
+import pytest
+
+import ai_api
+import provider_health
+
+TEXT = "今天，某公司正式发布了新一代大模型，推理能力大幅提升。该模型在多项基准测试中取得领先。" * 3
+
+
+@pytest.fixture
+def stub_providers(tmp_path, monkeypatch):
+    """两个桩模型：behaviour[模型名] = (耗时秒, 是否失败)；calls 记录调用顺序和发出时间"""
+    providers = [{"label": f"桩模型{m}", "vendor": "stub", "model": m, "params": {}} for m in ("a", "b")]
+    behaviour = {"a": (0.0, False), "b": (0.0, False)}
+    calls = []
+    lock = threading.Lock()
+    t0 = time.monotonic()
+
+    def call(p, text, max_tokens, timeout=None):
+        with lock:
+            calls.append((p["model"], time.monotonic() - t0))
+        delay, fail = behaviour[p["model"]]
+        time.sleep(delay)
+        if fail:
+            raise RuntimeError(f"{p['model']} 失败")
+        return f"{p['model']} 的摘要"
+
+    monkeypatch.setattr(ai_api, "PROVIDERS", providers)
+    monkeypatch.setattr(ai_api, "_call_provider", call)
+    monkeypatch.setattr(ai_api, "SUMMARY_CACHE_ENABLED", False)
+    monkeypatch.setattr(ai_api, "LLM_HEDGE_DEFAULT_DELAY", 0.2)
+    cfg = dict(provider_health.LLM_BREAKER, consecutive_failures=100)
+    monkeypatch.setattr(provider_health, "_health", provider_health.ProviderHealth(str(tmp_path / "h.json"), cfg))
+    monkeypatch.setattr(provider_health, "LLM_ADAPTIVE_ORDER", False)
+    return behaviour, calls
+
+
+def test_hedging_is_opt_in():
+    assert ai_api.summarize_text.__defaults__[-1] is None
+
+
+def test_sequential_uses_first_provider(stub_providers):
+    behaviour, calls = stub_providers
+    behaviour["a"] = (0.3, False)
+    assert ai_api.summarize_text(TEXT, deadline=None) == "a 的摘要"
+    assert [m for m, _ in calls] == ["a"]
+
+
+def test_hedge_fires_after_delay(stub_providers):
+    behaviour, calls = stub_providers
+    behaviour["a"] = (1.0, False)
+    t0 = time.monotonic()
+    assert ai_api.summarize_text(TEXT, deadline=5) == "b 的摘要"
+    assert time.monotonic() - t0 < 0.8
+    assert [m for m, _ in calls] == ["a", "b"]
+    # 对冲请求在无历史数据的默认延迟之后才发出
+    assert calls[1][1] - calls[0][1] >= 0.18
+
+
+def test_no_hedge_when_first_is_fast(stub_providers):
+    behaviour, calls = stub_providers
+    behaviour["a"] = (0.05, False)
+    assert ai_api.summarize_text(TEXT, deadline=5) == "a 的摘要"
+    time.sleep(0.3)
+    assert [m for m, _ in calls] == ["a"]
+
+
+def test_failure_hedges_immediately(stub_providers):
+    behaviour, calls = stub_providers
+    behaviour["a"] = (0.0, True)
+    assert ai_api.summarize_text(TEXT, deadline=5) == "b 的摘要"
+    assert calls[1][1] - calls[0][1] < 0.15
+
+
+def test_deadline_falls_back_to_truncation(stub_providers):
+    behaviour, calls = stub_providers
+    behaviour["a"] = behaviour["b"] = (1.0, False)
+    t0 = time.monotonic()
+    result = ai_api.summarize_text(TEXT, deadline=0.4)
+    assert time.monotonic() - t0 < 0.9
+    assert result == TEXT[:500] + ("..." if len(TEXT) > 500 else "")
+
+
+def test_all_fail_falls_back_to_truncation(stub_providers):
+    behaviour, _ = stub_providers
+    behaviour["a"] = behaviour["b"] = (0.0, True)
+    assert ai_api.summarize_text(TEXT, deadline=None) == TEXT[:500]
+
+
+def test_prepared_text_only_goes_to_the_model(stub_providers, monkeypatch):
+    behaviour, _ = stub_providers
+    sent = []
+    call = ai_api._call_provider
+
+    def spy(p, text, *a, **k):
+        sent.append(text)
+        return call(p, text, *a, **k)
+    monkeypatch.setattr(ai_api, "_call_provider", spy)
+    raw = "来源：某某网\n" + TEXT + "\n责任编辑：张三"
+    assert ai_api.summarize_text(raw, deadline=None) == "a 的摘要"
+    assert sent == [TEXT]
+    # 全部失败时兜底截断的是原文
+    behaviour["a"] = behaviour["b"] = (0.0, True)
+    short = "来源：某某网\n今天发布了新模型。"
+    assert ai_api.summarize_text(short, deadline=None) == short
+    assert ai_api.summarize_text("来源：某某网", deadline=None) == "来源：某某网"
+
+
+def test_summarize_many_keeps_order_and_dedupes(monkeypatch):
+    calls = []
+    lock = threading.Lock()
+
+    def fake(text, max_tokens=400):
+        with lock:
+            calls.append(text)
+        time.sleep(0.05 if text == "甲" else 0)     # 先提交的后完成，结果仍按输入顺序
+        return "摘要：" + text
+    monkeypatch.setattr(ai_api, "summarize_text", fake)
+    texts = ["甲", "乙", "甲", "丙", "乙"]
+    assert ai_api.summarize_many(texts, max_workers=3) == ["摘要：" + t for t in texts]
+    assert sorted(calls) == sorted(["甲", "乙", "丙"])
+    assert ai_api.summarize_many([]) == []
@@ -0,0 +1,28 @@
+# tests/test_aibot.py
+import functools
+import random
+
+import pytest
+
+import html_parser
+from bench import fixtures
+from data_sources import aibot
+
+BACKENDS = [
+    pytest.param("selectolax", marks=pytest.mark.skipif(not html_parser.HAS_SELECTOLAX, reason="未安装 selectolax")),
+    pytest.param("lxml", marks=pytest.mark.skipif(not html_parser.HAS_LXML, reason="未安装 lxml")),
+    "html.parser",
+]
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_items_attached_to_their_date(monkeypatch, backend):
+    html = fixtures._aibot_list(random.Random(0))
+    monkeypatch.setattr(aibot, "fetch_html", lambda *a, **k: html)
+    monkeypatch.setattr(aibot, "parse", functools.partial(html_parser.parse, backend=backend))
+    items = aibot.fetch_items()
+    # 只取前两个日期块，每块 15 条；条目 URL 为 /news/<日期序号>-<条目序号>
+    assert len(items) == 30
+    for it in items:
+        d = int(it["url"].rsplit("/", 1)[-1].split("-")[0])
+        assert it["date_str"].endswith(f"-06-{10 - d:02d}")
@@ -0,0 +1,47 @@
+# tests/test_daemon.py
+import socket
+
+import pytest
+
+import daemon
+
+pytestmark = pytest.mark.skipif(not daemon._HAS_UNIX, reason="需要 AF_UNIX")
+
+
+def test_address_in_use_live_socket(tmp_path):
+    path = str(tmp_path / "d.sock")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as srv:
+        srv.bind(path)
+        srv.listen(1)
+        assert daemon.address_in_use(path)
+
+
+def test_address_in_use_stale_or_missing(tmp_path):
+    path = str(tmp_path / "d.sock")
+    assert not daemon.address_in_use(path)
+    # 异常退出留下的 socket 文件：连接被拒绝
+    srv = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    srv.bind(path)
+    srv.close()
+    assert not daemon.address_in_use(path)
+
+
+def test_second_daemon_refuses_to_start(tmp_path):
+    path = str(tmp_path / "d.sock")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as srv:
+        srv.bind(path)
+        srv.listen(1)
+        second = daemon.NewsDaemon.__new__(daemon.NewsDaemon)
+        second.address = path
+        assert second.serve_forever() is False
+
+
+def test_bind_failure_stops_before_scheduling(tmp_path):
+    started = []
+    d = daemon.NewsDaemon.__new__(daemon.NewsDaemon)
+    d.address = str(tmp_path / "missing-dir" / "d.sock")     # 目录不存在，绑定失败
+    d._server = None
+    d.warm = lambda: started.append("warm")
+    d.scheduler = type("S", (), {"run_forever": lambda self: started.append("run")})()
+    assert d.serve_forever() is False
+    assert started == []
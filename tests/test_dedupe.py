@@ -0,0 +1,55 @@
+# tests/test_dedupe.py
+from dedupe import NearDupIndex
+
+
+def _index(tmp_path):
+    return NearDupIndex(str(tmp_path / "news.db"))
+
+
+def test_same_title_different_abstract_grouped(tmp_path):
+    idx = _index(tmp_path)
+    idx.add("https://36kr.com/p/1", "OpenAI 发布 GPT-5：推理能力大幅提升")
+    # 摘要不参与比较；标题只差标点和空格
+    assert idx.match("https://aibot.cn/n/2", "OpenAI发布GPT-5，推理能力大幅提升") == "https://36kr.com/p/1"
+    assert idx.match("https://autohome.com.cn/3", "小米SU7 Ultra正式上市，售价52.99万元") is None
+
+
+def test_match_does_not_register(tmp_path):
+    idx = _index(tmp_path)
+    title = "比亚迪9月销量突破41万辆，同比增长45%"
+    assert idx.match("https://a/1", title) is None
+    # 原文未登记（如摘要失败）时，后来的同题条目仍按新内容处理
+    assert idx.match("https://b/2", title) is None
+    assert len(idx) == 0
+
+
+def test_group_persists_across_instances(tmp_path):
+    idx = _index(tmp_path)
+    idx.add("https://a/1", "理想汽车宣布新一轮组织架构调整")
+    idx.add("https://b/2", "理想汽车宣布新一轮组织架构调整！", "https://a/1")
+    again = _index(tmp_path)
+    assert again.match("https://c/3", "理想汽车宣布新一轮组织架构调整") == "https://a/1"
+    assert sorted(again.group("https://b/2")) == ["https://a/1", "https://b/2"]
+
+
+def test_short_titles_ignored(tmp_path):
+    idx = _index(tmp_path)
+    idx.add("https://a/1", "快讯")
+    assert idx.match("https://b/2", "快讯") is None
+
+
+def test_expired_entries_pruned_on_add(tmp_path):
+    now = [1_700_000_000.0]
+    idx = NearDupIndex(str(tmp_path / "news.db"), window_days=1, clock=lambda: now[0])
+    idx.add("https://a/1", "蔚来发布第二品牌乐道首款车型L60")
+    idx.add("https://a/2", "华为鸿蒙智行享界S9正式开启交付")
+    now[0] += 12 * 3600
+    idx.add("https://a/3", "极氪7X上市首日大定突破一万台")
+    assert len(idx) == 3
+    now[0] += 13 * 3600
+    # 窗口外的条目不再匹配；下一次登记时从内存和数据库中移除
+    assert idx.match("https://b/1", "蔚来发布第二品牌乐道首款车型L60") is None
+    idx.add("https://a/4", "理想汽车九月交付量再创新高")
+    assert sorted(idx._entries) == ["https://a/3", "https://a/4"]
+    assert all(url in idx._entries for b in idx._buckets for urls in b.values() for url in urls)
+    assert len(NearDupIndex(str(tmp_path / "news.db"), window_days=1, clock=lambda: now[0])) == 2
@@ -0,0 +1,46 @@
+# tests/test_extractor.py
+import json
+
+import extractor
+from extractor import StrategyCache
+
+
+def _saved(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_record_writes_only_on_strategy_change(tmp_path, monkeypatch):
+    path = str(tmp_path / "strategies.json")
+    cache = StrategyCache(path)
+    writes = []
+    save = cache._save
+    monkeypatch.setattr(cache, "_save", lambda: (writes.append(1), save()))
+
+    cache.record("36kr.com/p/{n}", "div.article")
+    assert len(writes) == 1
+    for _ in range(50):
+        cache.record("36kr.com/p/{n}", "div.article")
+    assert len(writes) == 1 and _saved(path)["36kr.com/p/{n}"]["hits"] == 1
+
+    cache.record("36kr.com/p/{n}", extractor.DENSITY)
+    assert len(writes) == 2 and _saved(path)["36kr.com/p/{n}"]["strategy"] == extractor.DENSITY
+
+
+def test_hits_flushed(tmp_path):
+    path = str(tmp_path / "strategies.json")
+    cache = StrategyCache(path)
+    for _ in range(3):
+        cache.record("a.com/{n}", "article")
+    cache.flush()
+    assert _saved(path)["a.com/{n}"]["hits"] == 3
+    assert StrategyCache(path).get("a.com/{n}") == "article"
+
+
+def test_hits_saved_after_interval(tmp_path, monkeypatch):
+    path = str(tmp_path / "strategies.json")
+    cache = StrategyCache(path)
+    cache.record("a.com/{n}", "article")
+    monkeypatch.setattr(extractor, "_SAVE_INTERVAL", 0)
+    cache.record("a.com/{n}", "article")
+    assert _saved(path)["a.com/{n}"]["hits"] == 2
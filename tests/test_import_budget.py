@@ -0,0 +1,49 @@
+# tests/test_import_budget.py
+"""
+冷启动导入耗时检查：在全新的解释器里导入各启动路径，检查耗时和不该出现的重型依赖。
+
+  - quick_check：main-once.py 的快速检查路径（加载全部数据源 + 快速检查模块）
+  - pipeline：流水线模块本身（各阶段用到时才导入 pandas / openai / Playwright）
+每条路径取 3 次中最快的一次。慢机器上可设置环境变量 IMPORT_BUDGET_SCALE=2 放宽预算。
+"""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUNS = 3
+SCALE = float(os.environ.get("IMPORT_BUDGET_SCALE", "1"))
+
+HEAVY = ["pandas", "openpyxl", "openai", "playwright", "numpy"]
+
+# 名称 → (导入代码, 预算秒数, 禁止导入的模块)
+PATHS = {
+    "quick_check": ("import data_manager, quick_check; list(data_manager.load_data_sources())", 0.5, HEAVY),
+    "pipeline": ("import pipeline", 0.5, HEAVY),
+}
+
+_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+exec({code!r})
+elapsed = time.perf_counter() - t0
+print(json.dumps({{"seconds": elapsed, "modules": sorted(m for m in sys.modules if "." not in m)}}))
+"""
+
+
+def measure(code: str) -> dict:
+    out = subprocess.run([sys.executable, "-c", _PROBE.format(code=code)], cwd=ROOT,
+                         capture_output=True, text=True)
+    assert out.returncode == 0, f"导入失败\n{out.stderr}"
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+@pytest.mark.parametrize("name", list(PATHS))
+def test_import_budget(name):
+    code, budget, banned = PATHS[name]
+    best = min((measure(code) for _ in range(RUNS)), key=lambda r: r["seconds"])
+    assert [m for m in banned if m in best["modules"]] == []
+    assert best["seconds"] <= budget * SCALE, f"{name} 导入耗时 {best['seconds'] * 1000:.0f} ms，超出预算"
@@ -0,0 +1,70 @@
+# tests/test_main_once.py
+import importlib.util
+import os
+import types
+
+import pytest
+
+import data_manager
+import pipeline
+import quick_check
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _source(name, need_render=True, detail=None):
+    mod = types.ModuleType(f"data_sources.{name}")
+    mod.fetch_items = lambda seen=None: [{
+        "title": f"{name} 的一条新闻标题，用于测试", "url": f"https://{name}.example.com/1", "source": name,
+        "date_str": "2026-10-18", "author": "", "abstract": "摘要" * 10, "need_render": need_render}]
+    if detail is not None:
+        mod.fetch_detail = detail
+    return mod
+
+
+def _timeout(item):
+    raise TimeoutError("详情页渲染超时")
+
+
+@pytest.fixture
+def stub_summary(monkeypatch):
+    monkeypatch.setattr(pipeline, "summarize_text", lambda text, *a, **k: "摘要：" + text[:20])
+
+
+def test_item_failure_marks_source_failed(fresh_state, stub_summary):
+    ok_src = _source("okpipe", detail=lambda item: "正文内容" * 20)
+    bad_src = _source("badpipe", detail=_timeout)
+    p = pipeline.NewsPipeline(deliver=False, sources=[ok_src, bad_src], isolate=False)
+    assert p.run() is False
+    assert p.by_source["okpipe"]["failed"] is False
+    assert p.by_source["badpipe"]["failed"] is True
+
+
+def _load_main_once():
+    spec = importlib.util.spec_from_file_location("main_once", os.path.join(ROOT, "main-once.py"))
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def test_main_once_commits_only_clean_sources(fresh_state, stub_summary, monkeypatch):
+    ok_src = _source("okonce", detail=lambda item: "正文内容" * 20)
+    bad_src = _source("badonce", detail=_timeout)
+    committed = []
+
+    class StubCheck:
+        def changed(self, sources):
+            return list(sources)
+
+        def commit(self, names):
+            committed.extend(names)
+
+    monkeypatch.setattr(data_manager, "load_data_sources", lambda: [ok_src, bad_src])
+    monkeypatch.setattr(quick_check, "QuickCheck", StubCheck)
+    real = pipeline.NewsPipeline
+    monkeypatch.setattr(pipeline, "NewsPipeline",
+                        lambda sources=None: real(deliver=False, sources=sources, isolate=False))
+    main_once = _load_main_once()
+    assert main_once.main() is False
+    # 详情渲染失败的源不提交指纹，下次 cron 照常抓取重试
+    assert committed == ["okonce"]
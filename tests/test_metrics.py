@@ -0,0 +1,86 @@
+# tests/test_metrics.py
+import threading
+
+from metrics import Metrics
+
+
+def test_prometheus_textfile(tmp_path):
+    m = Metrics(enabled=True)
+    m.inc("news_items_total", 2, source="kr36")
+    m.inc("news_items_total", source='a"b')
+    m.observe("news_llm_seconds", 0.3, model="glm")
+    m.observe("news_llm_seconds", 7, model="glm")
+    path = str(tmp_path / "news.prom")
+    m.write_prometheus(path)
+    lines = open(path, encoding="utf-8").read().splitlines()
+    assert lines[:3] == ["# TYPE news_items_total counter",
+                         'news_items_total{source="a\\"b"} 1',
+                         'news_items_total{source="kr36"} 2']
+    assert "# TYPE news_llm_seconds histogram" in lines
+    assert 'news_llm_seconds_bucket{model="glm",le="0.25"} 0' in lines
+    assert 'news_llm_seconds_bucket{model="glm",le="0.5"} 1' in lines
+    assert 'news_llm_seconds_bucket{model="glm",le="10"} 2' in lines
+    assert 'news_llm_seconds_bucket{model="glm",le="+Inf"} 2' in lines
+    assert 'news_llm_seconds_sum{model="glm"} 7.3' in lines
+    assert 'news_llm_seconds_count{model="glm"} 2' in lines
+
+
+def test_snapshot_merge():
+    child = Metrics(enabled=True)
+    with child.source("kr36"):
+        child.inc("news_items_total", 3, stage="list")
+        child.observe("news_render_seconds", 0.02)
+    parent = Metrics(enabled=True)
+    parent.inc("news_items_total", 1, stage="list")
+    parent.merge(child.snapshot())
+    parent.merge(child.snapshot())
+    snap = parent.snapshot()
+    assert snap["counters"][("news_items_total", (("stage", "list"),))] == 7
+    counts, total, n = snap["hists"][("news_render_seconds", ())]
+    assert n == 2 and sum(counts) == 2 and abs(total - 0.04) < 1e-9
+    assert snap["by_source"]["kr36"]["news_items_total"] == 6
+
+
+def test_disabled_metrics_record_nothing():
+    m = Metrics(enabled=False)
+    m.inc("x")
+    m.merge(Metrics(enabled=True).snapshot())
+    assert m.snapshot()["counters"] == {}
+
+
+def test_source_scope_is_thread_local_and_bind_carries_it():
+    m = Metrics(enabled=True)
+
+    def plain():
+        m.inc("news_items_total")
+
+    def bound():
+        m.inc("news_bytes_total", 10)
+
+    with m.source("kr36"):
+        t = threading.Thread(target=plain)
+        t.start()
+        t.join()
+        t = threading.Thread(target=m.bind(bound))
+        t.start()
+        t.join()
+    # 没有 bind 的线程看不到作用域，只计入总数
+    assert m.snapshot()["by_source"] == {"kr36": {"news_bytes_total": 10}}
+    assert m.bind(bound) is bound
+
+
+def test_run_report_is_delta_since_begin_run():
+    m = Metrics(enabled=True)
+    m.inc("news_items_total", 5, stage="list")
+    with m.source("old"):
+        m.inc("news_items_total", stage="list")
+    m.begin_run()
+    with m.source("kr36"):
+        m.inc("news_items_total", 2, stage="list")
+        m.observe("news_render_seconds", 0.5)
+    report = m.run_report(extra={"stats": {"new": 2}})
+    assert report["metrics"] == {"news_items_total": {"stage=list": 2},
+                                 "news_render_seconds_count": {"total": 1},
+                                 "news_render_seconds_sum": {"total": 0.5}}
+    assert report["sources"] == {"kr36": {"news_items_total": 2, "news_render_seconds": 0.5}}
+    assert report["stats"] == {"new": 2}
@@ -0,0 +1,66 @@
+# tests/test_outbox.py
+from outbox import Outbox, SENDING, SENT, FAILED, UNKNOWN
+from storage import SQLiteStore
+
+
+def _store(db, urls):
+    store = SQLiteStore(db, excel_path=db + ".xlsx")
+    for url in urls:
+        store.insert({"title": url, "source": "s", "date_str": "2026-10-18", "url": url, "author": "",
+                      "content": "摘要", "need_render": "False", "ai_status": "AI处理完成", "send_status": ""})
+    return store
+
+
+def _statuses(store):
+    return {r["url"]: r["send_status"] for r in store.rows()}
+
+
+def test_crash_after_claim_is_not_resent(tmp_path):
+    db = str(tmp_path / "news.db")
+    store = _store(db, ["u1", "u2", "u3"])
+    box = Outbox(db)
+    box.claim(["u1", "u2"], "digest")
+    # 进程在推送途中被杀：重新打开发件箱（模拟下次启动）
+    box = Outbox(db)
+    assert box.unapplied() == 1
+    assert box.recover(store) == 1
+    assert _statuses(store) == {"u1": UNKNOWN, "u2": UNKNOWN, "u3": ""}
+    assert [r["url"] for r in store.pending()] == ["u3"]
+    assert box.unapplied() == 0
+    assert box.recover(store) == 0
+
+
+def test_finished_but_unapplied_result_is_synced(tmp_path):
+    db = str(tmp_path / "news.db")
+    store = _store(db, ["u1", "u2"])
+    box = Outbox(db)
+    box.finish(box.claim(["u1"], "single"), True)
+    box.finish(box.claim(["u2"], "single"), False, "HTTP 500")
+    # 推送结果已记入发件箱，但还没写回新闻表时中断
+    assert Outbox(db).recover(store) == 2
+    assert _statuses(store) == {"u1": SENT, "u2": FAILED}
+    assert [r["url"] for r in store.pending()] == ["u2"]
+
+
+def test_finish_and_mark_applied_are_idempotent(tmp_path):
+    db = str(tmp_path / "news.db")
+    store = _store(db, ["u1"])
+    box = Outbox(db)
+    entry = box.claim(["u1"], "single")
+    box.finish(entry, True)
+    box.finish(entry, True)
+    store.update("u1", send_status=SENT)
+    box.mark_applied(entry)
+    box.mark_applied(entry)
+    assert box.unapplied() == 0
+    assert box.recover(store) == 0
+    assert _statuses(store) == {"u1": SENT}
+    rows = box._conn.execute("SELECT status, applied FROM outbox").fetchall()
+    assert rows == [(SENT, 1)]
+
+
+def test_claim_persists_sending_before_push(tmp_path):
+    db = str(tmp_path / "news.db")
+    entry = Outbox(db).claim(["u1"], "single")
+    other = Outbox(db)
+    assert other._conn.execute("SELECT status FROM outbox WHERE id = ?", (entry,)).fetchone()[0] == SENDING
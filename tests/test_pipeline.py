@@ -0,0 +1,106 @@
+# tests/test_pipeline.py
+import threading
+import time
+import types
+
+import pytest
+
+import pipeline
+import storage
+
+
+def _item(name, n, need_render=True):
+    return {"title": f"{name} 新闻 {n}", "url": f"https://{name}.example.com/{n}", "source": name,
+            "date_str": "2026-10-18", "author": "", "abstract": "摘要" * 10, "need_render": need_render}
+
+
+def _source(name, count=1, detail=None, fail=False):
+    mod = types.ModuleType(f"data_sources.{name}")
+
+    def fetch_items(seen=None):
+        for n in range(count):
+            yield _item(name, n)
+        if fail:
+            raise RuntimeError("列表页结构变化")
+    mod.fetch_items = fetch_items
+    mod.fetch_detail = detail or (lambda item: "正文内容" * 20)
+    return mod
+
+
+@pytest.fixture
+def stubs(fresh_state, monkeypatch):
+    """桩摘要 + 桩发送：记录推送顺序，不访问网络"""
+    sent = []
+    monkeypatch.setattr(pipeline, "DEDUPE_ENABLED", False)
+    monkeypatch.setattr(pipeline, "SEND_MODE", "single")
+    monkeypatch.setattr(pipeline, "PIPELINE_WORKERS", {"list": 2, "render": 2, "summarize": 2, "deliver": 1})
+    monkeypatch.setattr(pipeline, "summarize_text", lambda text, *a, **k: "摘要：" + text[:20])
+
+    def deliver_row(store, row):
+        sent.append(row["url"])
+        store.update(row["url"], send_status="已发送")
+        return True
+    monkeypatch.setattr(pipeline, "deliver_row", deliver_row)
+    return sent
+
+
+def test_backlog_delivered_before_new_items(stubs):
+    storage.get_store().insert({
+        "title": "上次未发送", "source": "old", "date_str": "2026-10-17", "url": "https://old.example.com/1",
+        "author": "", "content": "旧摘要", "need_render": "True", "ai_status": "AI处理完成", "send_status": ""})
+    p = pipeline.NewsPipeline(sources=[_source("alpha", 3), _source("beta", 2)], isolate=False)
+    assert p.run() is True
+    assert stubs[0] == "https://old.example.com/1"
+    assert len(stubs) == 6 and len(set(stubs)) == 6
+    assert p.stats["saved"] == 5 and p.stats["sent"] == 6
+    assert storage.get_store().pending() == []
+
+
+def test_stage_errors_are_counted_per_source(stubs):
+    def detail(item):
+        if item["url"].endswith("/1"):
+            raise TimeoutError("详情页渲染超时")
+        return "正文内容" * 20
+    p = pipeline.NewsPipeline(sources=[_source("good", 2), _source("flaky", 2, detail=detail),
+                                       _source("broken", 1, fail=True)], isolate=False)
+    assert p.run() is False
+    assert p.by_source["good"] == {"new": 2, "failed": False}
+    assert p.by_source["flaky"]["failed"] is True
+    assert p.by_source["broken"] == {"new": 1, "failed": True}
+    assert p.stats["source_failed"] == 1
+    # 渲染失败的条目不入库，其余照常入库并推送
+    assert p.stats["saved"] == 4 and sorted(stubs) == sorted(
+        ["https://good.example.com/0", "https://good.example.com/1",
+         "https://flaky.example.com/0", "https://broken.example.com/0"])
+
+
+def test_queues_bound_how_far_listing_runs_ahead(stubs, monkeypatch):
+    gate = threading.Event()
+    produced = []
+
+    def slow_summary(text, *a, **k):
+        gate.wait(10)
+        return "摘要：" + text[:20]
+    monkeypatch.setattr(pipeline, "summarize_text", slow_summary)
+
+    src = types.ModuleType("data_sources.flood")
+
+    def fetch_items(seen=None):
+        for n in range(100):
+            produced.append(n)
+            yield _item("flood", n)
+    src.fetch_items = fetch_items
+    src.fetch_detail = lambda item: "正文内容" * 20
+
+    p = pipeline.NewsPipeline(deliver=False, sources=[src], isolate=False)
+    t = threading.Thread(target=p.run, daemon=True)
+    t.start()
+    time.sleep(0.5)
+    # 摘要阻塞时，列表最多领先：两段有界队列 + 渲染/摘要线程各自手上的条目 + 列表线程正在放入的一条
+    w = pipeline.PIPELINE_WORKERS
+    bound = 2 * pipeline.PIPELINE_QUEUE_SIZE + w["render"] + w["summarize"] + 1
+    assert len(produced) <= bound
+    gate.set()
+    t.join(30)
+    assert not t.is_alive()
+    assert p.stats["saved"] == 100
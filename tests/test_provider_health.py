@@ -0,0 +1,43 @@
+# tests/test_provider_health.py
+import provider_health
+from provider_health import ProviderHealth
+
+CFG = {"window": 20, "min_samples": 4, "error_rate": 0.5, "consecutive_failures": 1,
+       "cooldown": 60, "max_cooldown": 600}
+PROVIDERS = [{"model": "a"}, {"model": "b"}, {"model": "c"}]
+
+
+def _names(ps):
+    return [p["model"] for p in ps]
+
+
+def _tripped(tmp_path, monkeypatch, clock):
+    monkeypatch.setattr(provider_health.time, "time", lambda: clock[0])
+    health = ProviderHealth(str(tmp_path / "health.json"), CFG)
+    health.record("a", False, 1.0)
+    health.record("b", False, 1.0)
+    clock[0] += 61
+    return health
+
+
+def test_all_half_open_providers_recover(tmp_path, monkeypatch):
+    clock = [1000.0]
+    health = _tripped(tmp_path, monkeypatch, clock)
+    assert _names(health.order(PROVIDERS)) == ["a", "c"]
+    health.record("a", True, 0.5)
+    # a 恢复后，b 仍应得到试探机会
+    assert _names(health.order(PROVIDERS))[0] == "b"
+    health.record("b", True, 0.5)
+    assert sorted(_names(health.order(PROVIDERS))) == ["a", "b", "c"]
+
+
+def test_stale_probe_expires(tmp_path, monkeypatch):
+    clock = [1000.0]
+    health = _tripped(tmp_path, monkeypatch, clock)
+    assert _names(health.order(PROVIDERS)) == ["a", "c"]
+    # a 的试探在途：下一次放行 b
+    assert _names(health.order(PROVIDERS)) == ["b", "c"]
+    assert _names(health.order(PROVIDERS)) == ["c"]
+    # 试探被取消、一直没有结果：超过 _PROBE_TTL 后重新放行
+    clock[0] += provider_health._PROBE_TTL + 1
+    assert _names(health.order(PROVIDERS)) == ["a", "c"]
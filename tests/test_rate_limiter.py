@@ -0,0 +1,56 @@
+# tests/test_rate_limiter.py
+import pytest
+
+from rate_limiter import DomainRateLimiter, domain_of
+
+
+class FakeClock:
+    def __init__(self):
+        self.t = 1000.0
+
+    def __call__(self):
+        return self.t
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_same_domain_requests_are_spaced(clock):
+    lim = DomainRateLimiter({"*": {"interval": 2}}, clock=clock)
+    assert [lim.reserve("https://a.com/x") for _ in range(3)] == [0, 2, 4]
+    # 其他域名互不影响
+    assert lim.reserve("https://b.com/x") == 0
+    # 时间过去后不再需要等待
+    clock.t += 10
+    assert lim.reserve("https://a.com/y") == 0
+    assert lim.reserve("https://a.com/z") == 2
+
+
+def test_burst_allows_immediate_requests(clock):
+    lim = DomainRateLimiter({"a.com": {"interval": 1, "burst": 3}, "*": {"interval": 5}}, clock=clock)
+    assert [lim.reserve("https://a.com/") for _ in range(5)] == [0, 0, 0, 1, 2]
+    assert [lim.reserve("https://other.com/") for _ in range(2)] == [0, 5]
+
+
+def test_jitter_stays_within_bounds(clock):
+    lim = DomainRateLimiter({"*": {"interval": 1, "jitter": 0.5}}, clock=clock)
+    delays = [lim.reserve("https://a.com/") for _ in range(200)]
+    gaps = [b - a for a, b in zip(delays, delays[1:])]
+    assert all(1 <= g <= 1.5 for g in gaps)
+    assert max(gaps) - min(gaps) > 0.1     # 确实有抖动
+
+
+def test_report_counts_requests_and_waits(clock):
+    lim = DomainRateLimiter({"*": {"interval": 1.5}}, clock=clock)
+    for _ in range(3):
+        lim.reserve("https://a.com/p")
+    lim.record_wait("https://hook.example.com/x", 0.25)
+    assert lim.report() == {"a.com": {"requests": 3, "waited": 4.5},
+                            "hook.example.com": {"requests": 1, "waited": 0.25}}
+
+
+def test_domain_of():
+    assert domain_of("https://www.36kr.com/p/1?x=1") == "www.36kr.com"
+    assert domain_of("not a url") == "not a url"
@@ -0,0 +1,130 @@
+# tests/test_scheduler.py
+import types
+
+import pytest
+
+import scheduler
+from scheduler import AdaptiveScheduler
+
+BASE, MIN, MAX = 3600, 900, 4 * 3600
+
+
+class FakeClock:
+    def __init__(self, t=1_700_000_000.0):
+        self.t = t
+
+    def __call__(self):
+        return self.t
+
+
+@pytest.fixture
+def runs(monkeypatch):
+    """桩流水线：results[源名] = (新条目数, 是否失败)；runs 记录每次运行的源"""
+    results, calls = {}, []
+
+    class StubPipeline:
+        def __init__(self, deliver, sources, isolate, seen):
+            self.names = [s.__name__.rsplit(".", 1)[-1] for s in sources]
+            self.by_source = {}
+            self.store = types.SimpleNamespace(seen_urls=set)
+
+        def run(self):
+            calls.append(self.names)
+            for n in self.names:
+                new, failed = results.get(n, (0, False))
+                if failed == "raise":
+                    raise RuntimeError("流水线崩溃")
+                self.by_source[n] = {"new": new, "failed": failed}
+            return not any(r["failed"] for r in self.by_source.values())
+
+    monkeypatch.setattr(scheduler, "NewsPipeline", StubPipeline)
+    monkeypatch.setattr(scheduler, "SCHEDULE", {"base": BASE, "min": MIN, "max": MAX, "speedup": 0.5,
+                                                 "backoff": 1.5, "coalesce": 120})
+    monkeypatch.setattr(scheduler, "SCHEDULE_SOURCES", {})
+    return results, calls
+
+
+def _sources(*names):
+    return [types.ModuleType(f"data_sources.{n}") for n in names]
+
+
+def _make(tmp_path, clock, *names):
+    return AdaptiveScheduler(sources=_sources(*names), path=str(tmp_path / "state.json"), deliver=False,
+                             isolate=False, clock=clock)
+
+
+def test_speedup_backoff_and_failure(tmp_path, runs):
+    results, calls = runs
+    clock = FakeClock()
+    s = _make(tmp_path, clock, "hot", "cold", "broken")
+    results.update(hot=(3, False), cold=(0, False), broken=(0, True))
+    assert s.run_due() is False
+    assert calls == [["hot", "cold", "broken"]]
+    st = s.status()
+    assert st["hot"]["interval"] == BASE * 0.5
+    assert st["cold"]["interval"] == BASE * 1.5
+    assert st["broken"]["interval"] == BASE and st["broken"]["failures"] == 1
+    assert st["hot"]["next_at"] == clock.t + BASE * 0.5
+    # 恢复后清除失败计数
+    s.record("broken", 1, now=clock.t)
+    assert "failures" not in s.status()["broken"]
+
+
+def test_interval_is_clamped(tmp_path, runs, monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(scheduler, "SCHEDULE_SOURCES", {"slow": {"min": 1800}})
+    s = _make(tmp_path, clock, "fast", "slow", "idle")
+    for _ in range(10):
+        s.record("fast", 5, now=clock.t)
+        s.record("slow", 5, now=clock.t)
+        s.record("idle", 0, now=clock.t)
+    st = s.status()
+    assert st["fast"]["interval"] == MIN
+    assert st["slow"]["interval"] == 1800
+    assert st["idle"]["interval"] == MAX
+
+
+def test_due_sources_are_coalesced(tmp_path, runs):
+    results, calls = runs
+    clock = FakeClock()
+    s = _make(tmp_path, clock, "a", "b", "c")
+    s._state["a"]["next_at"] = clock.t + 10
+    s._state["b"]["next_at"] = clock.t + 100
+    s._state["c"]["next_at"] = clock.t + 600
+    assert s.due() == []
+    assert s.next_due() == ("a", clock.t + 10)
+    clock.t += 10
+    # a 到期；b 在 coalesce 秒内到期，合并到同一次运行；c 还早
+    assert s.due() == ["a", "b"]
+    assert s.run_due() is True
+    assert calls == [["a", "b"]]
+    assert s.next_due() == ("c", clock.t + 590)
+
+
+def test_state_persists_across_restarts(tmp_path, runs):
+    results, _ = runs
+    clock = FakeClock()
+    s = _make(tmp_path, clock, "a", "b")
+    results.update(a=(2, False), b=(0, False))
+    s.run_due()
+    saved = s.status()
+    clock.t += 30
+    again = _make(tmp_path, clock, "a", "b", "new")
+    st = again.status()
+    assert st["a"] == saved["a"] and st["b"] == saved["b"]
+    # 新增的源从 base 间隔开始，立即到期
+    assert st["new"] == {"interval": BASE, "next_at": clock.t}
+    assert again.due() == ["new"]
+
+
+def test_manual_run_and_pipeline_crash(tmp_path, runs):
+    results, calls = runs
+    clock = FakeClock()
+    s = _make(tmp_path, clock, "a", "b")
+    results["a"] = (0, "raise")
+    assert s.run_due(["a"]) is False
+    assert calls == [["a"]]
+    st = s.status()
+    assert st["a"]["interval"] == BASE and st["a"]["failures"] == 1
+    assert st["b"]["next_at"] == clock.t
+    assert s.last_run["sources"] == ["a"] and s.last_run["ok"] is False
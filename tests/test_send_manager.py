@@ -0,0 +1,30 @@
+# tests/test_send_manager.py
+from send_manager import pack_digests, build_digest_payload, _payload_size
+
+
+def _row(i, title="标题", content="摘要内容", url=None):
+    return {"title": title, "source": "36氪", "author": "作者", "date_str": "2026-10-18",
+            "url": url or f"https://example.com/{i}", "content": content}
+
+
+def test_pack_digests_splits_by_count():
+    batches = pack_digests([_row(i) for i in range(7)], max_items=3, max_bytes=18000)
+    assert [len(b) for b in batches] == [3, 3, 1]
+
+
+def test_pack_digests_oversized_title_terminates():
+    rows = [_row(0), _row(1, title="长" * 20000, content="摘" * 5000), _row(2)]
+    batches = pack_digests(rows, max_items=10, max_bytes=4000)
+    for batch in batches:
+        assert _payload_size(build_digest_payload(batch)) <= 4000
+    assert sum(len(b) for b in batches) == 3
+    trimmed = [r for b in batches for r in b if r["url"].endswith("/1")][0]
+    assert trimmed["content"] == "" and len(trimmed["title"]) < 20000
+
+
+def test_pack_digests_unfittable_row_sent_alone():
+    rows = [_row(0), _row(1, url="https://example.com/" + "x" * 5000), _row(2)]
+    batches = pack_digests(rows, max_items=10, max_bytes=2000)
+    alone = [b for b in batches if b[0]["url"].endswith("x")]
+    assert len(alone) == 1 and len(alone[0]) == 1
+    assert sum(len(b) for b in batches) == 3
@@ -0,0 +1,86 @@
+# tests/test_storage.py
+import pandas as pd
+import pytest
+
+import storage
+from storage import SQLiteStore, ExcelStore
+
+
+def _rec(n, **kw):
+    rec = {"title": f"标题{n}", "source": "36氪", "date_str": "2026-10-18", "url": f"https://example.com/{n}",
+           "author": "作者", "content": f"摘要{n}", "need_render": "False", "ai_status": "AI处理完成",
+           "send_status": ""}
+    rec.update(kw)
+    return rec
+
+
+@pytest.fixture(params=["sqlite", "excel"])
+def store(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteStore(str(tmp_path / "news.db"), excel_path=str(tmp_path / "missing.xlsx"))
+    return ExcelStore(str(tmp_path / "news.xlsx"))
+
+
+def _legacy_xlsx(path):
+    # 旧版 news.xlsx：没有“AI处理状态”“发送次数”列
+    pd.DataFrame([
+        {"标题": "旧新闻一", "来源": "36氪", "日期": "2025-06-01", "URL": "https://old/1", "作者": "",
+         "内容": "旧摘要一", "需要渲染": "False", "发送状态": "已发送", "更新时间": ""},
+        {"标题": "旧新闻二", "来源": "36氪", "日期": "2025-06-02", "URL": "https://old/2", "作者": "",
+         "内容": "旧摘要二", "需要渲染": "False", "发送状态": "", "更新时间": ""},
+    ]).to_excel(path, index=False)
+
+
+def test_migration_defaults_missing_ai_status(tmp_path):
+    xlsx = str(tmp_path / "news.xlsx")
+    _legacy_xlsx(xlsx)
+    db = SQLiteStore(str(tmp_path / "news.db"), excel_path=xlsx)
+    assert db.count() == 2
+    assert [r["url"] for r in db.pending()] == ["https://old/2"]
+    # 已有数据时不再重复导入
+    again = SQLiteStore(str(tmp_path / "news.db"), excel_path=xlsx)
+    assert again.count() == 2
+
+
+def test_migration_keeps_existing_ai_status(tmp_path):
+    xlsx = str(tmp_path / "news.xlsx")
+    pd.DataFrame([{"URL": "https://x/1", "内容": "摘要", "AI处理状态": "AI处理失败", "发送状态": ""}]).to_excel(
+        xlsx, index=False)
+    db = SQLiteStore(str(tmp_path / "news.db"), excel_path=xlsx)
+    assert db.rows()[0]["ai_status"] == "AI处理失败"
+    assert db.pending() == []
+
+
+def test_excel_store_legacy_file(tmp_path):
+    xlsx = str(tmp_path / "news.xlsx")
+    _legacy_xlsx(xlsx)
+    assert [r["url"] for r in ExcelStore(xlsx).pending()] == ["https://old/2"]
+
+
+def test_insert_ignores_duplicate_url(store):
+    assert store.insert(_rec(1))
+    assert not store.insert(_rec(1, title="另一个标题"))
+    assert store.count() == 1 and store.rows()[0]["title"] == "标题1"
+
+
+def test_replace_all_upserts_and_deletes(store):
+    for n in range(3):
+        store.insert(_rec(n))
+    store.replace_all([_rec(1, title="新标题"), _rec(5)])
+    rows = {r["url"]: r for r in store.rows()}
+    assert sorted(rows) == ["https://example.com/1", "https://example.com/5"]
+    assert rows["https://example.com/1"]["title"] == "新标题"
+
+
+def test_pending_filters_and_attempt_limit(store, monkeypatch):
+    monkeypatch.setattr(storage, "SEND_MAX_ATTEMPTS", 3)
+    store.insert(_rec(1))                                           # 待发送
+    store.insert(_rec(2, send_status="发送失败", send_attempts="2"))  # 可重试
+    store.insert(_rec(3, send_status="发送失败", send_attempts="3"))  # 达到上限，放弃
+    store.insert(_rec(4, send_status="已发送"))
+    store.insert(_rec(5, ai_status="AI处理失败"))
+    store.insert(_rec(6, content="  "))
+    store.insert(_rec(7, ai_status="重复", send_status="重复"))
+    assert [r["url"] for r in store.pending()] == ["https://example.com/1", "https://example.com/2"]
+    store.update("https://example.com/1", send_status="已发送")
+    assert [r["url"] for r in store.pending()] == ["https://example.com/2"]
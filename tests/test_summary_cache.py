@@ -0,0 +1,68 @@
+# tests/test_summary_cache.py
+import pytest
+
+from summary_cache import SummaryCache, content_hash
+
+DAY = 86400
+
+
+class FakeClock:
+    def __init__(self):
+        self.t = 1_700_000_000.0
+
+    def __call__(self):
+        return self.t
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def _cache(tmp_path, clock, **kw):
+    return SummaryCache(str(tmp_path / "cache.db"), clock=clock, **kw)
+
+
+def test_key_includes_model_and_prompt_version(tmp_path, clock):
+    c = _cache(tmp_path, clock)
+    c.put("正文", "glm", "v1:400", "摘要一")
+    assert c.get("正文", ["glm", "deepseek"], "v1:400") == ("glm", "摘要一")
+    assert c.get("正文", ["deepseek"], "v1:400") is None
+    assert c.get("正文", ["glm"], "v2:400") is None
+    assert c.get("另一篇正文", ["glm"], "v1:400") is None
+    # 新实例（内存为空）从 SQLite 读取，按模型优先级选择
+    c.put("正文", "deepseek", "v1:400", "摘要二")
+    fresh = _cache(tmp_path, clock)
+    assert fresh.get("正文", ["deepseek", "glm"], "v1:400") == ("deepseek", "摘要二")
+    assert c.stats()["hits"] == 1 and c.stats()["misses"] == 3
+
+
+def test_hash_normalizes_whitespace_and_width():
+    assert content_hash("ＡＢＣ  新闻\n正文 ") == content_hash("ABC 新闻 正文")
+
+
+def test_entries_expire_by_age_in_memory_and_on_disk(tmp_path, clock):
+    c = _cache(tmp_path, clock, max_age_days=30)
+    c.put("正文", "glm", "v1", "摘要")
+    clock.t += 29 * DAY
+    assert c.get("正文", ["glm"], "v1") == ("glm", "摘要")
+    clock.t += 2 * DAY
+    # 内存 LRU 命中也要检查年龄
+    assert c.get("正文", ["glm"], "v1") is None
+    assert _cache(tmp_path, clock, max_age_days=30).get("正文", ["glm"], "v1") is None
+    c.evict()
+    assert c.stats()["entries"] == 0
+
+
+def test_size_eviction_keeps_recently_accessed(tmp_path, clock):
+    c = _cache(tmp_path, clock, max_entries=3)
+    for n in range(5):
+        clock.t += 1
+        c.put(f"正文{n}", "glm", "v1", f"摘要{n}")
+    clock.t += 1
+    fresh = _cache(tmp_path, clock, max_entries=5)
+    assert fresh.get("正文0", ["glm"], "v1") == ("glm", "摘要0")     # 刷新访问时间
+    c.evict()
+    assert c.stats()["entries"] == 3
+    kept = _cache(tmp_path, clock, max_entries=3)
+    assert [kept.get(f"正文{n}", ["glm"], "v1") is not None for n in range(5)] == [True, False, False, True, True]
@@ -0,0 +1,44 @@
+# tests/test_supervisor.py
+import importlib
+import time
+
+import pytest
+
+import supervisor
+
+_SOURCE = '''
+import time
+
+def iter_items():
+    for i in range(3):
+        yield {"title": f"t{i}", "url": f"https://example.com/{i}"}
+        if HANG and i == 0:
+            time.sleep(60)
+
+HANG = %s
+'''
+
+
+def _source(tmp_path, monkeypatch, name, hang):
+    (tmp_path / f"{name}.py").write_text(_SOURCE % hang, encoding="utf-8")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.setattr(supervisor, "SOURCE_LIMITS", {"deadline": 1.5, "rss_mb": 0})
+    return importlib.import_module(name)
+
+
+def test_slow_consumer_does_not_use_up_deadline(tmp_path, monkeypatch):
+    src = _source(tmp_path, monkeypatch, "sup_slow_consumer", False)
+    got = []
+    for item in supervisor.iter_isolated(src, set()):
+        time.sleep(1)       # 下游慢：三条共 3 秒，超过 1.5 秒期限
+        got.append(item["url"])
+    assert len(got) == 3
+
+
+def test_hung_source_killed_keeps_partial(tmp_path, monkeypatch):
+    src = _source(tmp_path, monkeypatch, "sup_hung_source", True)
+    got = []
+    with pytest.raises(supervisor.SourceKilled) as exc:
+        for item in supervisor.iter_isolated(src, set()):
+            got.append(item["url"])
+    assert exc.value.reason.startswith("超过") and got == ["https://example.com/0"]
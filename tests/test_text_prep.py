@@ -0,0 +1,52 @@
+# tests/test_text_prep.py
+import random
+
+from text_prep import strip_boilerplate, condense, estimate_tokens
+
+
+def test_boilerplate_removed():
+    text = "\n".join([
+        "原标题：某公司发布新一代大模型",
+        "今天，某公司正式发布了新一代大模型。",
+        "本文为36氪原创，未经授权禁止转载。",
+        "免责声明：本文仅供参考，不构成投资建议。",
+        "扫码关注公众号，获取更多资讯",
+        "该模型在多项基准测试中取得领先。",
+        "相关阅读",
+        "另一篇文章的标题",
+    ])
+    assert strip_boilerplate(text) == "今天，某公司正式发布了新一代大模型。\n该模型在多项基准测试中取得领先。"
+
+
+def test_real_content_kept():
+    paras = [
+        "法院认定被告未经授权使用原告作品，判决赔偿。",
+        "平台宣布禁止转载未获授权的视频内容，违规账号将被处罚。",
+        "该作品版权所有者为一家影视公司，双方此前已签署协议。",
+        "作者：张三在发布会上表示，新车将于明年交付，" + "并覆盖全国主要城市的销售网络。" * 10,
+    ]
+    assert strip_boilerplate("\n".join(paras)) == "\n".join(paras)
+
+
+def test_condense_fills_budget_with_short_lead():
+    rng = random.Random(1)
+    chars = "的一是在不了有和人这中大为上个国我以要他时来用们生到作地于出就分对成会可主发年动同工也能下过子说产种面"
+
+    def words(k):
+        return "".join(rng.choice(chars) for _ in range(k))
+
+    lead = "GPT-5发布了。"
+    paras = [lead] + ["。".join(words(rng.randint(10, 40)) + "GPT-5发布了" + words(10) for _ in range(3)) + "。"
+                      for _ in range(800)]
+    text = "\n".join(paras)
+    out = condense(text, 1500)
+    assert 1400 <= estimate_tokens(out) <= 1500
+    assert out.startswith(lead)
+    # 保留原文顺序
+    positions = [text.index(s) for s in out.replace("\n", "。").split("。") if s]
+    assert positions == sorted(positions)
+
+
+def test_condense_without_punctuation_truncates():
+    out = condense("无标点" * 1000, 100)
+    assert estimate_tokens(out) <= 100
@@ -0,0 +1,113 @@
+# tests/test_webhook_sender.py
+import threading
+import time
+
+import pytest
+
+import send_manager
+import storage
+import webhook_sender
+from bench.fake_servers import WebhookSink
+from outbox import UNKNOWN
+from webhook_sender import AsyncWebhookSender
+
+PAYLOAD = {"msg_type": "text", "content": {"text": "测试"}}
+
+
+@pytest.fixture
+def sink_factory(monkeypatch):
+    monkeypatch.setattr(webhook_sender, "WEBHOOK_BACKOFF_BASE", 0.05)
+    monkeypatch.setattr(webhook_sender, "WEBHOOK_TIMEOUT", 2)
+    made = []
+
+    def make(rate=0, max_retries=3, **kw):
+        sink = WebhookSink(**kw).start()
+        sender = AsyncWebhookSender(sink.url + "/hook", rate=rate, concurrency=4, max_retries=max_retries)
+        made.append((sink, sender))
+        return sink, sender
+    yield make
+    for sink, sender in made:
+        sender.shutdown()
+        sink.stop()
+
+
+def test_5xx_and_429_are_retried_with_backoff(sink_factory):
+    sink, sender = sink_factory(script=[(500, {}), (429, {}), (503, {})])
+    assert sender.send_sync(PAYLOAD) == (True, "")
+    assert sink.requests == 4 and len(sink.messages) == 1
+    gaps = [b - a for a, b in zip(sink.times, sink.times[1:])]
+    # 指数退避：base * 2**attempt * [0.5, 1.5)
+    assert gaps[0] >= 0.025 and gaps[2] >= 0.1
+
+
+def test_gives_up_after_max_retries(sink_factory):
+    sink, sender = sink_factory(max_retries=2, script=[(502, {})] * 5)
+    assert sender.send_sync(PAYLOAD) == (False, "HTTP 502")
+    assert sink.requests == 3
+
+
+def test_client_error_is_not_retried(sink_factory):
+    sink, sender = sink_factory(script=[(400, {"code": 19001})])
+    assert sender.send_sync(PAYLOAD) == (False, "HTTP 400")
+    assert sink.requests == 1
+
+
+@pytest.mark.parametrize("code", [9499, 11232])
+def test_feishu_rate_limit_codes_are_retried(sink_factory, code):
+    sink, sender = sink_factory(script=[(200, {"code": code, "msg": "too many request"})])
+    assert sender.send_sync(PAYLOAD) == (True, "")
+    assert sink.requests == 2
+
+
+def test_retry_after_pauses_every_send(sink_factory):
+    sink, sender = sink_factory(script=[(429, {}, {"Retry-After": "0.6"})])
+    first = sender.submit(PAYLOAD)
+    deadline = time.monotonic() + 5
+    while sender._paused_until == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    # 暂停期间提交的新消息也要等到 Retry-After 结束
+    others = [sender.submit(PAYLOAD) for _ in range(2)]
+    assert first.result(5) == (True, "") and all(f.result(5) == (True, "") for f in others)
+    limited = sink.times[0]
+    assert len(sink.times) == 4
+    assert all(t - limited >= 0.55 for t in sink.times[1:])
+
+
+def test_read_timeout_is_not_retried(sink_factory, monkeypatch):
+    monkeypatch.setattr(webhook_sender, "WEBHOOK_TIMEOUT", 0.2)
+    sink, sender = sink_factory(latency=0.6)
+    ok, error = sender.send_sync(PAYLOAD)
+    assert ok is None and "未收到响应" in error
+    time.sleep(0.6)
+    assert sink.requests == 1
+
+
+def test_connection_refused_is_retried(monkeypatch):
+    monkeypatch.setattr(webhook_sender, "WEBHOOK_BACKOFF_BASE", 0.01)
+    sender = AsyncWebhookSender("http://127.0.0.1:9/hook", rate=0, max_retries=2)
+    try:
+        ok, error = sender.send_sync(PAYLOAD)
+    finally:
+        sender.shutdown()
+    assert ok is False and error.startswith("连接失败")
+
+
+def test_outbox_written_off_the_event_loop(fresh_state, sink_factory, monkeypatch):
+    monkeypatch.setattr(webhook_sender, "WEBHOOK_TIMEOUT", 0.2)
+    sink, sender = sink_factory(latency=0.6)
+    monkeypatch.setattr(send_manager, "get_sender", lambda: sender)
+    threads = []
+    finish = send_manager._finish
+
+    def spy(*args, **kw):
+        threads.append(threading.current_thread().name)
+        return finish(*args, **kw)
+    monkeypatch.setattr(send_manager, "_finish", spy)
+    store = storage.get_store()
+    store.insert({"title": "标题", "source": "s", "date_str": "2026-10-18", "url": "https://x/1", "author": "",
+                  "content": "摘要", "need_render": "False", "ai_status": "AI处理完成", "send_status": ""})
+    assert send_manager.deliver_batch(store, store.pending()) is False
+    assert threads and threads[0] != "webhook-sender"
+    # 请求可能已送达：记为未知，下次运行不再重发
+    assert store.rows()[0]["send_status"] == UNKNOWN
+    assert store.pending() == []
@@ -0,0 +1,141 @@
+# text_prep.py
+"""
+摘要前的正文预处理（summarize_text 调用）。
+
+  1. 去掉整段都是模板的短段落：来源/编辑/免责声明/转载说明等（TEXT_PREP_DROP），
+     以及“相关阅读”“推荐阅读”等小标题之后的全部内容（TEXT_PREP_CUTOFF）
+  2. 按本地估算的 token 数限制长度（LLM_INPUT_TOKEN_BUDGET）：超出时按句子打分挑选，
+     保留原文顺序，而不是直接截掉后半部分
+
+token 数按中文模型分词器的经验值估算：汉字约 1 个 token，英文单词约 4 个字母 1 个，
+数字约 3 位 1 个，其余标点符号各 1 个。只用于控制预算，不追求精确。
+"""
+import re
+from collections import Counter
+from datetime import datetime
+from config import (TEXT_PREP_ENABLED, LLM_INPUT_TOKEN_BUDGET, TEXT_PREP_DROP, TEXT_PREP_DROP_MAX_CHARS,
+                    TEXT_PREP_CUTOFF)
+from metrics import get_metrics
+
+_TOKEN = re.compile(r"[\u3400-\u9fff\uf900-\ufaff]|[A-Za-z]+|\d+|\S")
+_SENTENCE = re.compile(r"[^。！？!?；;]+(?:[。！？!?；;]+[”’」』）)]*|$)")
+_FEATURE = re.compile(r"[\u3400-\u9fff\uf900-\ufaff]|[a-z]+|\d+")
+_DROP = [re.compile(p) for p in TEXT_PREP_DROP]
+_CUTOFF = [re.compile(p) for p in TEXT_PREP_CUTOFF]
+_OVERLAP = 0.7      # 与已选句子二元组的 Jaccard 相似度超过这个值即视为重复
+_SHORT_TOKENS = 15  # 短于这个 token 数的句子按比例降低分数
+
+
+def log(msg):
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {msg}")
+
+
+def estimate_tokens(text: str) -> int:
+    n = 0
+    for tok in _TOKEN.findall(text or ""):
+        if tok.isascii() and tok.isalpha():
+            n += (len(tok) + 3) // 4
+        elif tok.isdigit():
+            n += (len(tok) + 2) // 3
+        else:
+            n += 1
+    return n
+
+
+# —— 去模板 —— #
+def strip_boilerplate(text: str) -> str:
+    """去掉整段都是模板的短段落；遇到“相关阅读”等小标题（不在开头）时丢弃其后全部内容"""
+    kept = []
+    for para in (p.strip() for p in (text or "").splitlines()):
+        if not para:
+            continue
+        if kept and any(p.search(para) for p in _CUTOFF):
+            break
+        if len(para) <= TEXT_PREP_DROP_MAX_CHARS and any(p.fullmatch(para) for p in _DROP):
+            continue
+        kept.append(para)
+    return "\n".join(kept)
+
+
+# —— 按预算压缩 —— #
+def _features(sentence: str) -> list:
+    chars = _FEATURE.findall(sentence.lower())
+    return [a + b for a, b in zip(chars, chars[1:])] or chars
+
+
+def condense(text: str, budget: int) -> str:
+    """
+    句子打分：句内二元组出现在多少个句子里（归一化后取平均，越贴近全文主题越高），
+    加上位置权重（全文首句最高，各段首句和靠前的段落其次），再按长度折减，短句不会占优。
+    按分数从高到低选入，跳过与某个已选句子高度重合（Jaccard）的句子，直到用完预算；
+    预算还有剩余时，再按分数把被跳过的句子补进来。最后按原文顺序输出。
+    """
+    sentences = []      # (段号, 句号, 句子, token 数)
+    paras = text.splitlines()
+    for pi, para in enumerate(paras):
+        for si, s in enumerate(m.group().strip() for m in _SENTENCE.finditer(para)):
+            if s:
+                sentences.append((pi, si, s, estimate_tokens(s)))
+    feats = {e: set(_features(e[2])) for e in sentences}
+    df = Counter(f for fs in feats.values() for f in fs)
+    n = max(1, len(sentences))
+
+    def score(entry):
+        pi, si, _, tokens = entry
+        fs = feats[entry]
+        base = sum(df[f] for f in fs) / len(fs) / n if fs else 0
+        if pi == 0 and si == 0:
+            base += 1
+        else:
+            base += (0.2 if si == 0 else 0) + 0.3 * (1 - pi / len(paras))
+        return base * min(1.0, tokens / _SHORT_TOKENS)
+
+    def overlaps(fs, other):
+        union = len(fs | other)
+        return union and len(fs & other) / union > _OVERLAP
+
+    chosen, skipped, used = [], [], 0
+    for entry in sorted(sentences, key=score, reverse=True):
+        if used + entry[3] > budget:
+            continue
+        if any(overlaps(feats[entry], feats[c]) for c in chosen):
+            skipped.append(entry)
+            continue
+        chosen.append(entry)
+        used += entry[3]
+    for entry in skipped:
+        if used + entry[3] <= budget:
+            chosen.append(entry)
+            used += entry[3]
+    if not chosen:
+        # 没有能放下的句子（整段没有标点）：退回按估算比例截断
+        return text[:max(1, len(text) * budget // max(1, estimate_tokens(text)))]
+    chosen.sort()
+    out, last = [], None
+    for pi, _, s, _ in chosen:
+        if last is not None:
+            out.append("\n" if pi != last else "")
+        out.append(s)
+        last = pi
+    return "".join(out)
+
+
+def prepare(text: str, budget: int = LLM_INPUT_TOKEN_BUDGET) -> str:
+    """去模板并压缩到预算以内；前后 token 数计入指标 news_llm_input_tokens_total"""
+    if not TEXT_PREP_ENABLED or not text:
+        return text
+    metrics = get_metrics()
+    raw = estimate_tokens(text)
+    out = strip_boilerplate(text)
+    tokens = estimate_tokens(out)
+    result = "stripped" if tokens < raw else "unchanged"
+    if budget and tokens > budget:
+        out = condense(out, budget)
+        result = "condensed"
+        new = estimate_tokens(out)
+        log(f"  → 正文约 {tokens} tokens，超出预算 {budget}，按句子压缩为 {new} tokens")
+        tokens = new
+    metrics.inc("news_llm_input_tokens_total", raw, stage="raw")
+    metrics.inc("news_llm_input_tokens_total", tokens, stage="prepared")
+    metrics.inc("news_text_prep_total", result=result)
+    return out
@@ -0,0 +1,218 @@
+# webhook_sender.py
+"""
+异步 webhook 推送引擎。
+
+后台线程跑一个 asyncio 事件循环：按 WEBHOOK_RATE_PER_SEC 限速、最多
+WEBHOOK_CONCURRENCY 个请求并发；遇到 5xx / 429 / 连接失败按指数退避 + 抖动重试，
+服务端返回 Retry-After（或飞书限频错误码）时整个发送器暂停相应时间。
+请求体可能已经发出后才出错（读超时、连接被断开）时不重试，结果记为“未知”：
+飞书没有幂等键，重试可能重复推送（与发件箱“宁可漏发，不可重复”一致）。
+HTTP 请求复用 requests 连接池，在线程中执行，不额外引入依赖。
+"""
+import asyncio
+import atexit
+import json
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+from datetime import datetime
+from config import (WEBHOOK, USER_AGENTS, WEBHOOK_TIMEOUT, WEBHOOK_RATE_PER_SEC, WEBHOOK_CONCURRENCY,
+                    WEBHOOK_MAX_RETRIES, WEBHOOK_BACKOFF_BASE, WEBHOOK_BACKOFF_MAX)
+from rate_limiter import get_limiter
+from metrics import get_metrics
+
+# 飞书自定义机器人 HTTP 200 但请求被限频时的错误码
+_FEISHU_RATE_LIMIT_CODES = {9499, 11232}
+
+
+def log(msg):
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {msg}")
+
+
+class _Transient(Exception):
+    def __init__(self, msg, retry_after=None):
+        super().__init__(msg)
+        self.retry_after = retry_after
+
+
+class _Unknown(Exception):
+    """请求可能已送达但没拿到响应"""
+
+
+def _not_sent(exc) -> bool:
+    """连接阶段就失败了（请求体肯定没发出），可以安全重试"""
+    if isinstance(exc, requests.ConnectTimeout):
+        return True
+    reason = getattr(exc.args[0], "reason", None) if exc.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+def _retry_after(resp) -> float:
+    value = resp.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        from email.utils import parsedate_to_datetime
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except Exception:
+            return None
+
+
+class AsyncWebhookSender:
+    def __init__(self, url: str = WEBHOOK, rate: float = WEBHOOK_RATE_PER_SEC,
+                 concurrency: int = WEBHOOK_CONCURRENCY, max_retries: int = WEBHOOK_MAX_RETRIES):
+        self.url = url
+        self.interval = 1.0 / rate if rate else 0.0
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+        self.session = requests.Session()
+        self.session.headers.update({
+            "User-Agent": random.choice(USER_AGENTS),
+            "Accept": "application/json"
+        })
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._next_slot = 0.0       # 下一次允许发出请求的时间
+        self._paused_until = 0.0    # Retry-After 导致的全局暂停
+
+    # —— 事件循环 —— #
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            ready = threading.Event()
+
+            def _loop_main():
+                self._loop = asyncio.new_event_loop()
+                asyncio.set_event_loop(self._loop)
+                self._sem = asyncio.Semaphore(self.concurrency)
+                self._throttle_lock = asyncio.Lock()
+                ready.set()
+                self._loop.run_forever()
+
+            self._thread = threading.Thread(target=_loop_main, name="webhook-sender", daemon=True)
+            self._thread.start()
+            ready.wait()
+
+    def shutdown(self):
+        with self._lock:
+            if self._thread is None:
+                return
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=10)
+            self._thread = None
+        self.session.close()
+
+    # —— 发送 —— #
+    async def _throttle(self):
+        async with self._throttle_lock:
+            now = time.monotonic()
+            start = max(now, self._next_slot, self._paused_until)
+            self._next_slot = start + self.interval
+        if start > now:
+            get_limiter().record_wait(self.url, start - now)
+            await asyncio.sleep(start - now)
+
+    async def _post_once(self, payload: dict):
+        async with self._sem:
+            try:
+                resp = await asyncio.to_thread(self.session.post, self.url, json=payload,
+                                               timeout=WEBHOOK_TIMEOUT)
+            except (requests.Timeout, requests.ConnectionError) as e:
+                if _not_sent(e):
+                    raise _Transient(f"连接失败: {e}")
+                raise _Unknown(f"请求已发出但未收到响应: {e}")
+        log(f"  → Feishu 返回 {resp.status_code}")
+        if resp.status_code == 429 or resp.status_code >= 500:
+            raise _Transient(f"HTTP {resp.status_code}", _retry_after(resp))
+        if not 200 <= resp.status_code < 300:
+            return False, f"HTTP {resp.status_code}"
+        try:
+            code = resp.json().get("code")
+        except Exception:
+            code = None
+        if code in _FEISHU_RATE_LIMIT_CODES:
+            raise _Transient(f"飞书限频 (code={code})", _retry_after(resp))
+        return True, ""
+
+    async def send(self, payload: dict, before_send=None, after_send=None):
+        """
+        推送一条消息（含重试），返回 (是否成功, 错误信息)；是否成功为 None 表示结果未知（不重试）。
+        before_send 在第一次真正发出请求前、after_send(是否成功, 错误信息) 在得到最终结果后
+        各于线程中调用一次（用于发件箱登记和写回，SQLite 写入不占用事件循环）。
+        """
+        result = await self._send(payload, before_send)
+        if after_send is not None:
+            await asyncio.to_thread(after_send, *result)
+        return result
+
+    async def _send(self, payload: dict, before_send):
+        error = ""
+        metrics = get_metrics()
+        size = len(json.dumps(payload).encode())
+        for attempt in range(self.max_retries + 1):
+            await self._throttle()
+            if attempt == 0 and before_send is not None:
+                await asyncio.to_thread(before_send)
+            metrics.inc("news_webhook_bytes_total", size)
+            t0 = time.monotonic()
+            try:
+                result = await self._post_once(payload)
+                outcome = "ok" if result[0] else "rejected"
+                metrics.observe("news_webhook_seconds", time.monotonic() - t0, result=outcome)
+                metrics.inc("news_webhook_total", result=outcome)
+                return result
+            except _Transient as e:
+                metrics.observe("news_webhook_seconds", time.monotonic() - t0, result="transient")
+                metrics.inc("news_webhook_total", result="transient")
+                error = str(e)
+                if attempt == self.max_retries:
+                    break
+                if e.retry_after is not None:
+                    delay = e.retry_after
+                    # 服务端要求暂停：所有请求一起让路
+                    self._paused_until = max(self._paused_until, time.monotonic() + delay)
+                else:
+                    delay = min(WEBHOOK_BACKOFF_MAX, WEBHOOK_BACKOFF_BASE * 2 ** attempt)
+                    delay *= random.uniform(0.5, 1.5)
+                log(f"  ! Feishu 推送暂时失败（{error}），{delay:.1f}s 后第 {attempt + 1} 次重试")
+                await asyncio.sleep(delay)
+            except _Unknown as e:
+                metrics.observe("news_webhook_seconds", time.monotonic() - t0, result="unknown")
+                metrics.inc("news_webhook_total", result="unknown")
+                return None, str(e)
+            except Exception as e:
+                metrics.inc("news_webhook_total", result="error")
+                return False, f"发送异常: {e}"
+        return False, error
+
+    def submit(self, payload: dict, before_send=None, after_send=None):
+        """从任意线程提交，返回 concurrent.futures.Future[(ok, error)]"""
+        self._ensure_started()
+        return asyncio.run_coroutine_threadsafe(self.send(payload, before_send, after_send), self._loop)
+
+    def send_sync(self, payload: dict, before_send=None, after_send=None):
+        return self.submit(payload, before_send, after_send).result()
+
+
+_sender = None
+_sender_lock = threading.Lock()
+
+
+def get_sender() -> AsyncWebhookSender:
+    global _sender
+    with _sender_lock:
+        if _sender is None:
+            _sender = AsyncWebhookSender()
+            atexit.register(_sender.shutdown)
+        return _sender